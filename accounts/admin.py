@@ -17,4 +17,5 @@ class PersonalAccountAdmin(ImportExportModelAdmin):
 
     list_display = ('name', 'account_type', 'description')  # Display in admin list view
     search_fields = ('name', 'account_type')  # Enable search by name and account type
-    list_filter = ('account_type',)  # Add filtering by account type
\ No newline at end of file
+    list_filter = ('account_type',)  # Add filtering by account type
+    ordering = ('name',)  # Stable pages for the transaction admin's account autocomplete
\ No newline at end of file
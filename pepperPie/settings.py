@@ -34,9 +34,96 @@ ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', default=[])
 
 SHELL_PLUS = "ipython"
 
+# Share lookup-cache invalidations (category/account names) between workers
+# through a version key in the default cache. Needs a shared cache backend.
+LOOKUP_CACHE_SHARED_VERSION = env.bool('LOOKUP_CACHE_SHARED_VERSION', default=False)
+
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# Rows read, validated and inserted per step of a streaming statement upload
+UPLOAD_CHUNK_SIZE = env.int('UPLOAD_CHUNK_SIZE', default=5000)
+
+# Threads in the in-process pool that runs ?async=true uploads
+UPLOAD_JOB_WORKERS = env.int('UPLOAD_JOB_WORKERS', default=2)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Cached report results. LocMem is per process; point this at a shared
+    # backend, e.g. FileBasedCache with a common directory, when several
+    # workers serve requests so invalidations reach all of them.
+    'reports': {
+        'BACKEND': env('REPORT_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': env('REPORT_CACHE_LOCATION', default='pepper-pie-reports'),
+        'TIMEOUT': env.int('REPORT_CACHE_TIMEOUT', default=60 * 60),
+        'OPTIONS': {'MAX_ENTRIES': env.int('REPORT_CACHE_MAX_ENTRIES', default=1000)},
+    },
+    # Live progress of background uploads. It must be shared by every worker
+    # process, since the status API may be served by another process than the
+    # one running the job; the default directory works for workers on one host.
+    'upload_progress': {
+        'BACKEND': env('UPLOAD_PROGRESS_CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': env('UPLOAD_PROGRESS_CACHE_LOCATION', default=os.path.join(MEDIA_ROOT, 'upload_progress')),
+    },
+}
+
+# Generated xlsx reports stay in memory up to this many bytes, then spill to a temp file
+REPORT_SPOOL_MAX_SIZE = env.int('REPORT_SPOOL_MAX_SIZE', default=8 * 1024 * 1024)
+
+# Threads fetching the sections of a complete report concurrently; 1 runs them in turn.
+# Concurrent sections read on separate connections, without a shared snapshot.
+REPORT_SECTION_WORKERS = env.int('REPORT_SECTION_WORKERS', default=4)
+
+# Most months a period report (workbook or account summary range) may cover
+REPORT_MAX_PERIOD_MONTHS = env.int('REPORT_MAX_PERIOD_MONTHS', default=24)
+
+# Default and largest page size of the cursor-paginated transactions API
+TRANSACTIONS_PAGE_SIZE = env.int('TRANSACTIONS_PAGE_SIZE', default=100)
+TRANSACTIONS_MAX_PAGE_SIZE = env.int('TRANSACTIONS_MAX_PAGE_SIZE', default=1000)
+# Deepest page of the ranked narration search; its offset must also fit in a 64-bit integer
+TRANSACTIONS_SEARCH_MAX_PAGE = env.int('TRANSACTIONS_SEARCH_MAX_PAGE', default=1000)
+
+# Rows read per round trip and written per response chunk by the streaming ledger export
+LEDGER_EXPORT_CHUNK_SIZE = env.int('LEDGER_EXPORT_CHUNK_SIZE', default=5000)
+
+# Per-view latency, SQL and response size metrics, served at /api/metrics
+REQUEST_METRICS_ENABLED = env.bool('REQUEST_METRICS_ENABLED', default=True)
+# Also record each request's peak Python memory; tracemalloc slows every request down
+REQUEST_METRICS_TRACE_MEMORY = env.bool('REQUEST_METRICS_TRACE_MEMORY', default=False)
+
+# Requests slower than this are logged with their slowest SQL statements
+SLOW_REQUEST_THRESHOLD_MS = env.int('SLOW_REQUEST_THRESHOLD_MS', default=1000)
+SLOW_REQUEST_TOP_QUERIES = env.int('SLOW_REQUEST_TOP_QUERIES', default=5)
+
+# Let staff users profile a request with an X-Profile header or ?profile=1|cprofile|sampling
+REQUEST_PROFILING_ENABLED = env.bool('REQUEST_PROFILING_ENABLED', default=False)
+# Profiler used for X-Profile: 1; 'cprofile' or 'sampling'
+REQUEST_PROFILER = env('REQUEST_PROFILER', default='cprofile')
+PROFILE_SAMPLE_INTERVAL_MS = env.int('PROFILE_SAMPLE_INTERVAL_MS', default=5)
+# Where captured profiles are written, and how many of the newest are kept
+PROFILES_DIR = env('PROFILES_DIR', default=os.path.join(MEDIA_ROOT, 'profiles'))
+PROFILE_CAPTURES_KEEP = env.int('PROFILE_CAPTURES_KEEP', default=50)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # Report section timings, upload job failures
+        'transactions': {'handlers': ['console'], 'level': env('TRANSACTIONS_LOG_LEVEL', default='INFO')},
+    },
+}
+
+REST_FRAMEWORK = {
+    # Report views read ?format=json|excel|csv themselves; don't let DRF
+    # treat it as a renderer override and 404 the file formats
+    'URL_FORMAT_OVERRIDE': None,
+}
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -54,6 +141,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so the metrics cover the time spent in every other middleware
+    'transactions.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,6 +150,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # After authentication, which it needs to tell staff users apart
+    'transactions.middleware.RequestProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'pepperPie.urls'
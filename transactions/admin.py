@@ -1,14 +1,184 @@
+import os
+
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.db import transaction
+from django.db.models import Min, Q
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html_join
 from import_export import resources
 from import_export.admin import ImportExportModelAdmin
-from .models import Transaction, Category, SubCategory
+from .models import Transaction, Category, SubCategory, UploadJob, CategorizationRule, ProfileCapture
+from .services.narration_search_service import narration_match
+from .services.report_cache_service import invalidate_report_months
+from .services.running_balance_service import materialize_running_balances
+from utils.admin_utils import EstimatedCountPaginator, IndexedDatesQuerySet
+
+
+class AutocompleteListFilter(admin.RelatedFieldListFilter):
+    """
+    Related-field filter picked through the admin's autocomplete search
+    instead of a list of every row; only the selected value is loaded.
+    The related model's admin needs ``search_fields``.
+    """
+    template = 'admin/transactions/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.admin_site = model_admin.admin_site
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+    def field_choices(self, field, request, model_admin):
+        return []
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        form_field = forms.ModelChoiceField(
+            queryset=self.field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(self.field, self.admin_site),
+            required=False,
+        )
+        selected = self.lookup_val[0] if self.lookup_val else None
+        yield {
+            'selected': selected is not None,
+            'all_url': changelist.get_query_string(remove=[self.lookup_kwarg, self.lookup_kwarg_isnull]),
+            'widget': form_field.widget.render(self.lookup_kwarg, selected, attrs={
+                'data-filter-url': changelist.get_query_string(
+                    {self.lookup_kwarg: '__value__'}, [self.lookup_kwarg_isnull]
+                ),
+            }),
+        }
 
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ('date', 'narration', 'category', 'sub_category', 'debit_amount', 'credit_amount', 'running_balance', 'nominal_account', 'personal_account')
+    # sub_category's __str__ shows its category's name too
+    list_select_related = ('category', 'sub_category__category', 'personal_account')
     search_fields = ('narration', 'category__name', 'sub_category__name', 'nominal_account')
-    list_filter = ('category', 'sub_category', 'nominal_account', 'personal_account')
+    list_filter = (
+        ('category', AutocompleteListFilter),
+        ('sub_category', AutocompleteListFilter),
+        'nominal_account',
+        ('personal_account', AutocompleteListFilter),
+    )
+    autocomplete_fields = ('category', 'sub_category', 'personal_account')
+    # Drill down by year, month and day over the (date, id) index
+    date_hierarchy = 'date'
+    ordering = ('-date', '-id')
+    # No COUNT(*) of the whole table next to every filtered count, and no
+    # per-choice counts in the filters
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    actions = ['recalculate_balances']
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return IndexedDatesQuerySet(model=queryset.model, query=queryset.query, using=queryset._db)
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        # Rows are counted only a few pages past the one shown
+        return self.paginator(queryset, per_page, orphans, allow_empty_first_page,
+                              current_page=request.GET.get(PAGE_VAR, 1))
+
+    @property
+    def media(self):
+        # The filters' autocomplete widgets and the script applying their choice
+        widget = AutocompleteSelect(Transaction._meta.get_field('category'), self.admin_site)
+        return super().media + widget.media + forms.Media(js=['transactions/admin/autocomplete_filter.js'])
+
+    @admin.action(description="Recalculate running balances of the selected transactions' accounts")
+    def recalculate_balances(self, request, queryset):
+        """
+        Re-balance each account of the selected transactions once, from its
+        earliest selected date onwards, rather than once per row.
+        """
+        earliest = dict(
+            queryset.order_by().values('personal_account_id').annotate(first_date=Min('date'))
+            .values_list('personal_account_id', 'first_date')
+        )
+        with transaction.atomic():
+            updated = materialize_running_balances(earliest)
+            invalidate_report_months(earliest.values())
+        self.message_user(request, f"Recalculated {len(earliest)} accounts; {updated} running balances changed.")
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Match narrations through the full-text index instead of an icontains
+        scan; category, sub category and nominal account names are matched
+        in their small tables and applied as id filters.
+        """
+        if not search_term.strip():
+            return queryset, False
+
+        term = search_term.strip()
+        condition = (
+            narration_match(search_term)
+            | Q(category__in=Category.objects.filter(name__icontains=term))
+            | Q(sub_category__in=SubCategory.objects.filter(name__icontains=term))
+            | Q(nominal_account__in=[
+                value for value, label in Transaction.NOMINAL_ACCOUNT_CHOICES
+                if term.lower() in value.lower() or term.lower() in label.lower()
+            ])
+        )
+        return queryset.filter(condition), False
+
+
+@admin.register(UploadJob)
+class UploadJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'file_name', 'status', 'rows_parsed', 'rows_inserted', 'rows_with_errors', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = [field.name for field in UploadJob._meta.fields]
+
+
+@admin.register(CategorizationRule)
+class CategorizationRuleAdmin(admin.ModelAdmin):
+    list_display = ('priority', 'name', 'match_type', 'pattern', 'min_amount', 'max_amount', 'category', 'sub_category', 'nominal_account', 'is_active')
+    list_display_links = ('name',)
+    list_editable = ('priority', 'is_active')
+    list_filter = ('is_active', 'match_type', 'category')
+    search_fields = ('name', 'pattern')
+
+
+@admin.register(ProfileCapture)
+class ProfileCaptureAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'view_name', 'user', 'status_code', 'duration_ms', 'profiler', 'files')
+    list_filter = ('profiler', 'view_name')
+    search_fields = ('path',)
+    readonly_fields = [field.name for field in ProfileCapture._meta.fields] + ['files']
+
+    def has_add_permission(self, request):
+        # Captures come from profiled requests only
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:capture_id>/download/<str:kind>/', self.admin_site.admin_view(self.download),
+                 name='transactions_profilecapture_download'),
+        ] + super().get_urls()
+
+    def download(self, request, capture_id, kind):
+        capture = get_object_or_404(ProfileCapture, pk=capture_id)
+        file_path = {'profile': capture.profile_file, 'collapsed': capture.collapsed_file}.get(kind)
+        if not file_path or not os.path.exists(file_path):
+            raise Http404("Profile file not found.")
+        return FileResponse(open(file_path, 'rb'), as_attachment=True, filename=os.path.basename(file_path))
+
+    @admin.display(description='Files')
+    def files(self, obj):
+        kinds = [(kind, label) for kind, label, file_path in (
+            ('profile', '.prof', obj.profile_file),
+            ('collapsed', '.collapsed', obj.collapsed_file),
+        ) if file_path]
+        return format_html_join(' ', '<a href="{}">{}</a>', (
+            (reverse('admin:transactions_profilecapture_download', args=[obj.pk, kind]), label) for kind, label in kinds
+        ))
 
 
 # Resource for Category import/export
@@ -24,6 +194,7 @@ class CategoryAdmin(ImportExportModelAdmin):
     resource_class = CategoryResource
     list_display = ('id', 'name')
     search_fields = ('name',)
+    ordering = ('name',)
 
 
 # Resource for SubCategory import/export
@@ -47,4 +218,9 @@ class SubCategoryAdmin(ImportExportModelAdmin):
     resource_class = SubCategoryResource
     list_display = ('id', 'name', 'category')
     search_fields = ('name', 'category__name')
-    list_filter = ('category',)
\ No newline at end of file
+    list_filter = ('category',)
+    ordering = ('name',)
+
+    def get_queryset(self, request):
+        # __str__ shows the category's name, here and in autocomplete results
+        return super().get_queryset(request).select_related('category')
\ No newline at end of file
@@ -0,0 +1,241 @@
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+import weakref
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.urls import reverse
+
+from accounts.models import PersonalAccount
+from transactions.benchmarks.synthetic_ledger import SyntheticLedger
+from transactions.models import Transaction
+from transactions.services.account_summary_service import (
+    get_account_summary_range_report,
+    get_account_summary_report,
+)
+from transactions.services.categorised_expense_report_service import categorised_expense_summary_data
+from transactions.services.expense_summary_service import expense_summary_report
+from transactions.services.monthly_report_workbook_service import build_period_report_workbook
+from transactions.services.report_cache_service import REPORT_CACHE_ALIAS
+from transactions.services.running_balance_service import recalculate_running_balance
+from transactions.services.statement_ingest_service import StatementSource, ingest_statement
+from transactions.services.transactions_report_service import transaction_report
+
+# Relative slowdown (and memory growth) tolerated before a case counts as a regression.
+DEFAULT_TOLERANCE = 0.2
+
+# Differences below these are noise, whatever the tolerance says.
+MIN_SECONDS_DELTA = 0.05
+MIN_PEAK_MB_DELTA = 1.0
+
+
+# Every connection opened since the suite was imported, whatever the thread;
+# Django only lists the calling thread's, and pool threads keep theirs open.
+_opened_connections = weakref.WeakSet()
+
+
+def _remember_connection(sender, connection, **kwargs):
+    _opened_connections.add(connection)
+
+
+connection_created.connect(_remember_connection)
+
+
+class QueryCounter:
+    """
+    Counts the SQL statements run while it is installed, on the calling
+    thread's connection and on every other connection opened since this
+    module was imported or opened meanwhile, e.g. by the report section
+    workers.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def _attach(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+            self._connections.append(connection)
+
+    def __enter__(self):
+        connection_created.connect(self._attach, weak=False)
+        for opened in [connection, *_opened_connections]:
+            self._attach(None, opened)
+        return self
+
+    def __exit__(self, *exc_info):
+        connection_created.disconnect(self._attach)
+        for opened in self._connections:
+            if self in opened.execute_wrappers:
+                opened.execute_wrappers.remove(self)
+        self._connections = []
+
+
+class Measurement:
+    """Wall time, SQL statement count and peak traced memory of one case."""
+
+    def __init__(self, seconds: float, queries: int, peak_mb: Optional[float]):
+        self.seconds = seconds
+        self.queries = queries
+        self.peak_mb = peak_mb
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"seconds": round(self.seconds, 4), "queries": self.queries,
+                "peak_mb": None if self.peak_mb is None else round(self.peak_mb, 2)}
+
+
+def measure(run: Callable[[], Any], memory: bool = True) -> Measurement:
+    """
+    Run ``run`` once and measure it. Peak memory is what tracemalloc saw
+    allocated on top of what was live when the case started, across all
+    threads; tracing slows Python code down, so it can be turned off for
+    timing-only runs.
+    """
+    if memory:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        with QueryCounter() as counter:
+            started = time.perf_counter()
+            run()
+            seconds = time.perf_counter() - started
+        peak_mb = (tracemalloc.get_traced_memory()[1] - baseline) / (1024 * 1024) if memory else None
+    finally:
+        if memory:
+            tracemalloc.stop()
+    return Measurement(seconds, counter.count, peak_mb)
+
+
+def _drain(response) -> int:
+    """Read a response to the end, as a client would, and return its size."""
+    assert response.status_code == 200, response.status_code
+    if response.streaming:
+        size = sum(len(chunk) for chunk in response.streaming_content)
+    else:
+        size = len(response.content)
+    response.close()
+    return size
+
+
+class BenchmarkCase:
+    """A named operation; ``prepare`` runs before it, outside the measurement."""
+
+    def __init__(self, name: str, run: Callable[[], Any], prepare: Optional[Callable[[], Any]] = None):
+        self.name = name
+        self.run = run
+        self.prepare = prepare
+
+
+def benchmark_cases(ledger: SyntheticLedger, statement_path: str) -> List[BenchmarkCase]:
+    """
+    The benchmarked operations, in the order they run: the upload first, as
+    it loads the ledger every later case reads. The upload runs the ingest the
+    view runs once Django has spooled the file, so that building a multipart
+    body in the test client is not measured; the workbook, listing, search
+    and export cases go through their views and read the whole response.
+    """
+    # The middle month of the ledger, a typical month for the monthly reports
+    middle = ledger.start + (ledger.end - ledger.start) / 2
+    month, year = middle.month, middle.year
+    year_start, year_end = date(year, 1, 1), date(year, 12, 1)
+    client = Client()
+
+    def upload():
+        with open(statement_path, "rb") as statement:
+            result = ingest_statement(StatementSource(statement, statement_path, chunk_size=settings.UPLOAD_CHUNK_SIZE))
+        assert not result.errors, list(result.errors.items())[:5]
+
+    def forget_balances():
+        Transaction.objects.update(running_balance=None)
+
+    def recalculate_balances():
+        for account in PersonalAccount.objects.all():
+            recalculate_running_balance(account)
+
+    def get(name: str, **params):
+        return lambda: _drain(client.get(reverse(name), params))
+
+    return [
+        BenchmarkCase("upload_transactions", upload),
+        BenchmarkCase("recalculate_running_balance", recalculate_balances, prepare=forget_balances),
+        BenchmarkCase("transaction_report", lambda: transaction_report(month, year)),
+        BenchmarkCase("account_summary_report", lambda: get_account_summary_report(month, year)),
+        BenchmarkCase("account_summary_range_report",
+                      lambda: get_account_summary_range_report(ledger.start, ledger.end)),
+        BenchmarkCase("expense_summary_report", lambda: expense_summary_report(month, year)),
+        BenchmarkCase("categorised_expense_summary", lambda: categorised_expense_summary_data(month, year)),
+        BenchmarkCase("monthly_reports_excel", get("monthly-reports-excel", month=month, year=year)),
+        BenchmarkCase("period_report_workbook", lambda: build_period_report_workbook(year_start, year_end).close()),
+        BenchmarkCase("transactions_page", get("monthly_transactions", page_size=settings.TRANSACTIONS_PAGE_SIZE)),
+        BenchmarkCase("transaction_search", get("transaction-search", q="swiggy")),
+        BenchmarkCase("ledger_export", get("ledger-export", format="csv")),
+    ]
+
+
+def run_suite(size: int, accounts: int = 5, categories: int = 12, seed: int = 42, memory: bool = True,
+              on_case: Optional[Callable[[str, Measurement], None]] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Load a synthetic ledger of ``size`` rows into the current (empty)
+    database and measure every case of ``benchmark_cases`` on it. The report
+    cache is cleared before each case, so every report is built from the
+    database. Returns case name -> measurement.
+    """
+    ledger = SyntheticLedger(size, accounts=accounts, categories=categories, seed=seed)
+    ledger.create_accounts()
+    handle, statement_path = tempfile.mkstemp(suffix=".csv", prefix="benchmark_ledger_")
+    os.close(handle)
+
+    results = {}
+    try:
+        ledger.write_csv(statement_path)
+        for case in benchmark_cases(ledger, statement_path):
+            caches[REPORT_CACHE_ALIAS].clear()
+            if case.prepare:
+                case.prepare()
+            measurement = measure(case.run, memory=memory)
+            results[case.name] = measurement.as_dict()
+            if on_case:
+                on_case(case.name, measurement)
+    finally:
+        os.remove(statement_path)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """
+    Describe every case of ``results`` that regressed against ``baseline``:
+    slower or using more peak memory by more than ``tolerance`` (and by more
+    than the noise floor), or running more queries at all.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if (current["seconds"] > previous["seconds"] * (1 + tolerance)
+                and current["seconds"] - previous["seconds"] > MIN_SECONDS_DELTA):
+            regressions.append(f"{name}: {previous['seconds']:.3f}s -> {current['seconds']:.3f}s")
+        if current["queries"] > previous["queries"]:
+            regressions.append(f"{name}: {previous['queries']} -> {current['queries']} queries")
+        if (current.get("peak_mb") is not None and previous.get("peak_mb") is not None
+                and current["peak_mb"] > previous["peak_mb"] * (1 + tolerance)
+                and current["peak_mb"] - previous["peak_mb"] > MIN_PEAK_MB_DELTA):
+            regressions.append(f"{name}: {previous['peak_mb']:.1f}MB -> {current['peak_mb']:.1f}MB peak")
+    return regressions
@@ -0,0 +1,128 @@
+import csv
+import random
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+from accounts.models import PersonalAccount
+from transactions.services.lookup_cache_service import personal_account_lookup
+from utils.datetime_utils import DEFAULT_DATE_FORMAT
+
+STATEMENT_COLUMNS = [
+    "Date", "Narration", "Debit Amount", "Credit Amount", "Category",
+    "Sub Category", "Personal Account", "Nominal Account",
+]
+
+# Category -> (sub categories, merchants, typical amount)
+CATEGORY_PROFILES: List[Tuple[str, List[str], List[str], float]] = [
+    ("Food", ["Delivery", "Dining"], ["SWIGGY", "ZOMATO", "DOMINOS", "STARBUCKS", "HALDIRAMS"], 450),
+    ("Groceries", ["Supermarket", "Daily Needs"], ["BIGBASKET", "DMART", "BLINKIT", "ZEPTO"], 1200),
+    ("Travel", ["Cab", "Flights", "Rail"], ["UBER", "OLA", "INDIGO", "IRCTC", "RAPIDO"], 900),
+    ("Shopping", ["Online", "Apparel"], ["AMAZON", "FLIPKART", "MYNTRA", "AJIO"], 2500),
+    ("Utilities", ["Electricity", "Mobile", "Internet"], ["BESCOM", "AIRTEL", "JIO", "ACTFIBERNET"], 1500),
+    ("Health", ["Pharmacy", "Consultation"], ["APOLLO PHARMACY", "PRACTO", "MEDPLUS"], 800),
+    ("Entertainment", ["Streaming", "Movies"], ["NETFLIX", "SPOTIFY", "BOOKMYSHOW", "HOTSTAR"], 500),
+    ("Fuel", ["Petrol"], ["HPCL", "IOCL", "BPCL", "SHELL"], 2000),
+    ("Rent", ["House Rent"], ["NOBROKER", "LANDLORD"], 25000),
+    ("Insurance", ["Life", "Health Cover"], ["LIC", "HDFC ERGO", "STAR HEALTH"], 6000),
+    ("Education", ["Courses", "Books"], ["UDEMY", "COURSERA", "BYJUS"], 3000),
+    ("Investment", ["Mutual Funds", "Stocks"], ["ZERODHA", "GROWW", "KUVERA"], 10000),
+]
+CITIES = ["BANGALORE", "MUMBAI", "DELHI", "PUNE", "CHENNAI", "HYDERABAD", "KOLKATA"]
+BANKS = ["HDFC", "ICICI", "SBI", "AXIS", "KOTAK"]
+EMPLOYERS = ["ACME TECH", "GLOBEX", "INITECH", "UMBRELLA CORP"]
+
+
+class SyntheticLedger:
+    """
+    A deterministic statement of ``size`` transactions over ``accounts``
+    personal accounts and ``categories`` categories, spread over ``days``
+    days from ``start``: card, UPI, NEFT and ACH narrations with references,
+    amounts scattered around each category's typical spend, a monthly salary
+    credit per account and about one row in ten left uncategorized. The same
+    arguments always give the same rows.
+    """
+
+    def __init__(self, size: int, accounts: int = 5, categories: int = 12, seed: int = 42,
+                 start: date = date(2023, 1, 1), days: int = 730):
+        self.size = size
+        self.seed = seed
+        self.start = start
+        self.days = days
+        self.account_names = [f"Account {index + 1:02d}" for index in range(accounts)]
+        self.profiles = [
+            (name if index < len(CATEGORY_PROFILES) else f"{name} {index // len(CATEGORY_PROFILES) + 1}",
+             sub_categories, merchants, amount)
+            for index, (name, sub_categories, merchants, amount) in (
+                (index, CATEGORY_PROFILES[index % len(CATEGORY_PROFILES)]) for index in range(categories)
+            )
+        ]
+
+    @property
+    def end(self) -> date:
+        return self.start + timedelta(days=self.days - 1)
+
+    def create_accounts(self) -> None:
+        """
+        Create the personal accounts the statement names; categories and sub
+        categories are created by the upload itself, as for a first statement.
+        """
+        PersonalAccount.objects.bulk_create([PersonalAccount(name=name) for name in self.account_names])
+        personal_account_lookup.invalidate()
+
+    def rows(self) -> Iterator[Dict[str, object]]:
+        rng = random.Random(self.seed)
+        salaries = self._salary_dates()
+        for index in range(self.size):
+            if index < len(salaries):
+                day, account = salaries[index]
+                yield self._row(day, f"SALARY CREDIT {rng.choice(EMPLOYERS)} REF{self.seed}{index:09d}",
+                                None, round(rng.uniform(60000, 150000), 2), None, None, account, "Salary")
+                continue
+
+            name, sub_categories, merchants, typical = rng.choice(self.profiles)
+            merchant = rng.choice(merchants)
+            reference = f"{self.seed}{index:09d}"
+            narration = rng.choice([
+                f"UPI/{reference}/{merchant}/{merchant.lower().replace(' ', '')}@ok{rng.choice(BANKS).lower()}",
+                f"POS {rng.randint(1000, 9999)}XXXX {merchant} {rng.choice(CITIES)} {reference}",
+                f"NEFT/{rng.choice(BANKS)}N{reference}/{merchant}",
+                f"ACH D- {merchant}-{reference}",
+            ])
+            amount = round(min(rng.lognormvariate(0, 0.7), 20) * typical, 2) or 1.0
+            uncategorized = rng.random() < 0.1
+            yield self._row(
+                self.start + timedelta(days=rng.randrange(self.days)),
+                narration, amount, None,
+                None if uncategorized else name,
+                None if uncategorized or rng.random() < 0.3 else f"{rng.choice(sub_categories)} ({name})",
+                rng.choice(self.account_names),
+                "Investment" if name.startswith("Investment") else "Expense",
+            )
+
+    def write_csv(self, path: str) -> None:
+        with open(path, "w", newline="") as handle:
+            writer = csv.DictWriter(handle, fieldnames=STATEMENT_COLUMNS)
+            writer.writeheader()
+            writer.writerows(self.rows())
+
+    def _salary_dates(self) -> List[Tuple[date, str]]:
+        salaries = []
+        month = self.start.replace(day=1)
+        while month <= self.end and len(salaries) < self.size // 20:
+            if month >= self.start:
+                salaries.extend((month, account) for account in self.account_names)
+            month = (month + timedelta(days=32)).replace(day=1)
+        return salaries[:self.size // 20]
+
+    @staticmethod
+    def _row(day, narration, debit, credit, category, sub_category, account, nominal) -> Dict[str, object]:
+        return {
+            "Date": day.strftime(DEFAULT_DATE_FORMAT),
+            "Narration": narration,
+            "Debit Amount": debit,
+            "Credit Amount": credit,
+            "Category": category,
+            "Sub Category": sub_category,
+            "Personal Account": account,
+            "Nominal Account": nominal,
+        }
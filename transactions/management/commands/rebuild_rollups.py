@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from transactions.services.monthly_rollup_service import rebuild_rollups, refresh_rollups
+from transactions.services.report_cache_service import invalidate_all_reports
+
+
+class Command(BaseCommand):
+    help = "Rebuild the monthly rollup table from the transactions table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, help="Only rebuild this year.")
+        parser.add_argument("--month", type=int, help="Only rebuild this month of --year.")
+
+    def handle(self, *args, **options):
+        year, month = options["year"], options["month"]
+        if month is not None and year is None:
+            raise CommandError("--month needs --year.")
+        if month is not None and not 1 <= month <= 12:
+            raise CommandError("--month must be between 1 and 12.")
+
+        with transaction.atomic():
+            if year is None:
+                written = rebuild_rollups()
+            else:
+                months = [month] if month is not None else range(1, 13)
+                written = refresh_rollups((year, m) for m in months)
+            invalidate_all_reports()
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} rollup rows."))
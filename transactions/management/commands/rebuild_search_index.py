@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from transactions.services.narration_search_service import rebuild_narration_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text narration search index from the transactions table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Database to rebuild the index of.")
+
+    def handle(self, *args, **options):
+        rebuild_narration_search_index(options["database"])
+        self.stdout.write(self.style.SUCCESS("Rebuilt the narration search index."))
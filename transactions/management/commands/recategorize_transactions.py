@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from transactions.services.categorization_service import RECATEGORIZE_BATCH_SIZE, recategorize_uncategorized
+
+
+class Command(BaseCommand):
+    help = "Apply the categorization rules to every stored transaction that has no category."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=RECATEGORIZE_BATCH_SIZE,
+                            help="Transactions read and updated per round trip.")
+        parser.add_argument("--dry-run", action="store_true", help="Count the matches without saving them.")
+
+    def handle(self, *args, **options):
+        checked, categorized = recategorize_uncategorized(options["batch_size"], dry_run=options["dry_run"])
+        verb = "Would categorize" if options["dry_run"] else "Categorized"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {categorized} of {checked} uncategorized transactions."))
@@ -0,0 +1,90 @@
+import json
+import platform
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from transactions.benchmarks.suite import DEFAULT_TOLERANCE, compare, run_suite
+
+
+class Command(BaseCommand):
+    help = (
+        "Load synthetic ledgers into a throwaway test database and time the upload, running balance "
+        "and report code paths, optionally comparing against a saved baseline. Runs on the database "
+        "DATABASE_URL points at, e.g. PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[10_000],
+                            help="Ledger sizes in rows, e.g. --sizes 10000 100000 1000000.")
+        parser.add_argument("--accounts", type=int, default=5, help="Personal accounts in the ledger.")
+        parser.add_argument("--categories", type=int, default=12, help="Categories in the ledger.")
+        parser.add_argument("--seed", type=int, default=42, help="Seed of the ledger generator.")
+        parser.add_argument("--no-memory", action="store_true",
+                            help="Skip peak memory tracing, which slows Python-heavy cases down.")
+        parser.add_argument("--output", help="Write the results as JSON to this file, e.g. to save a baseline.")
+        parser.add_argument("--baseline", help="Compare against results previously written with --output.")
+        parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                            help="Relative slowdown or memory growth tolerated against the baseline.")
+        parser.add_argument("--fail-on-regression", action="store_true",
+                            help="Exit with an error when a case regressed against the baseline.")
+
+    def handle(self, *args, **options):
+        baseline = {}
+        if options["baseline"]:
+            with open(options["baseline"]) as handle:
+                baseline = json.load(handle)
+
+        vendor = connection.vendor
+        results = {
+            "vendor": vendor,
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sizes": {},
+        }
+        regressions = []
+        for size in options["sizes"]:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{vendor}, {size} rows"))
+            self.stdout.write(f"{'case':<32}{'seconds':>10}{'queries':>10}{'peak MB':>10}")
+            size_results = self._run_size(size, options)
+            results["sizes"][str(size)] = size_results
+
+            if baseline.get("vendor") == vendor and str(size) in baseline.get("sizes", {}):
+                regressions += [f"{size} rows, {regression}"
+                                for regression in compare(size_results, baseline["sizes"][str(size)], options["tolerance"])]
+
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}.")
+
+        if baseline and baseline.get("vendor") != vendor:
+            self.stdout.write(self.style.WARNING(f"Baseline was recorded on {baseline.get('vendor')}; not compared."))
+        for regression in regressions:
+            self.stdout.write(self.style.ERROR(f"Regression: {regression}"))
+        if regressions and options["fail_on_regression"]:
+            raise CommandError(f"{len(regressions)} benchmark regressions against {options['baseline']}.")
+        if baseline and not regressions:
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+
+    def _run_size(self, size, options):
+        # A fresh test database per size, so every run starts from an empty ledger
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            return run_suite(
+                size,
+                accounts=options["accounts"],
+                categories=options["categories"],
+                seed=options["seed"],
+                memory=not options["no_memory"],
+                on_case=lambda name, measurement: self.stdout.write(
+                    f"{name:<32}{measurement.seconds:>10.3f}{measurement.queries:>10}"
+                    + (f"{measurement.peak_mb:>10.1f}" if measurement.peak_mb is not None else f"{'-':>10}")
+                ),
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from transactions.services.balance_checkpoint_service import rebuild_checkpoints, verify_checkpoints
+from transactions.services.report_cache_service import invalidate_all_reports
+
+
+class Command(BaseCommand):
+    help = "Compare the month-end balance checkpoints against a full recompute from the transactions table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--account", type=int, action="append", dest="accounts",
+                            help="Only check this personal account id; repeat for more.")
+        parser.add_argument("--fix", action="store_true", help="Rebuild every checkpoint when a mismatch is found.")
+
+    def handle(self, *args, **options):
+        mismatches = verify_checkpoints(options["accounts"])
+        for mismatch in mismatches:
+            self.stdout.write(
+                f"account {mismatch['personal_account_id']} {mismatch['month']:%Y-%m}: "
+                f"stored {mismatch['stored']}, expected {mismatch['expected']}"
+            )
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("All balance checkpoints match."))
+            return
+
+        if options["fix"]:
+            with transaction.atomic():
+                written = rebuild_checkpoints()
+                invalidate_all_reports()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} balance checkpoints."))
+            return
+
+        raise CommandError(f"{len(mismatches)} balance checkpoints are wrong or missing; rerun with --fix.")
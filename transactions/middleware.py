@@ -0,0 +1,60 @@
+import tracemalloc
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from transactions.services.request_metrics_service import MeasuredContent, RequestRecorder
+from transactions.services.request_profiling_service import profile_request, requested_profiler
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency, SQL statement count and time, response size and,
+    with ``REQUEST_METRICS_TRACE_MEMORY``, peak Python memory of every
+    request per URL name, served at ``/api/metrics``. Streaming responses
+    (workbooks, exports) are measured until their body has been sent, as
+    that is where their queries run.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if settings.REQUEST_METRICS_TRACE_MEMORY and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def __call__(self, request):
+        recorder = RequestRecorder(request)
+        recorder.start()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            recorder.abandon()
+            raise
+
+        if response.streaming:
+            response.streaming_content = MeasuredContent(response.streaming_content, recorder, response)
+        else:
+            recorder.finish(response, len(response.content))
+        return response
+
+
+class RequestProfilingMiddleware:
+    """
+    Profiles a request when a staff user asks for it with an ``X-Profile``
+    header or ``?profile=`` parameter (``1``, ``cprofile`` or ``sampling``),
+    saving the result as a ``ProfileCapture`` listed in the admin. Needs
+    ``REQUEST_PROFILING_ENABLED``; without it the middleware is not loaded
+    at all, and with it other requests only pay for the flag check.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profiler = requested_profiler(request)
+        if profiler is None:
+            return self.get_response(request)
+        return profile_request(request, self.get_response, profiler)
@@ -1,2 +1,8 @@
 from .transaction_model import *
-from .category_model import *
\ No newline at end of file
+from .category_model import *
+from .upload_job_model import *
+from .monthly_rollup_model import *
+from .balance_checkpoint_model import *
+from .narration_search_model import *
+from .categorization_rule_model import *
+from .profile_capture_model import *
\ No newline at end of file
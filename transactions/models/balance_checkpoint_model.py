@@ -0,0 +1,25 @@
+from django.db import models
+from accounts.models import PersonalAccount
+
+
+class AccountBalanceCheckpoint(models.Model):
+    """
+    Closing balance of a personal account at the end of a month.
+
+    Rows exist for the months an account has transactions in; a month without
+    one carries the closing balance of the latest month before it. Derived
+    from Transaction and kept up to date by signals and the upload pipeline,
+    and built on first use for a ledger that has none yet; check it with
+    ``manage.py verify_balance_checkpoints``.
+    """
+    personal_account = models.ForeignKey(PersonalAccount, on_delete=models.CASCADE)
+    month = models.DateField()  # First day of the month
+    closing_balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['personal_account', 'month'], name='unique_account_month_checkpoint'),
+        ]
+
+    def __str__(self):
+        return f"{self.personal_account_id} {self.month:%Y-%m}: {self.closing_balance}"
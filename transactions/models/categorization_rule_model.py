@@ -0,0 +1,57 @@
+import re
+
+from django.core.exceptions import ValidationError
+from django.db import models
+from transactions.models.category_model import Category, SubCategory
+from transactions.models.transaction_model import Transaction
+
+
+class CategorizationRule(models.Model):
+    """
+    Fills in the category, sub category and nominal account of uploaded
+    transactions that have no category, when the narration matches
+    ``pattern`` and the amount lies within the optional range.
+
+    Rules are tried by ascending ``priority``; the first that matches wins.
+    See ``categorization_service`` for how they are compiled and applied.
+    """
+    KEYWORD = 'KEYWORD'
+    REGEX = 'REGEX'
+    MATCH_TYPE_CHOICES = [
+        (KEYWORD, 'Keyword'),  # Case-insensitive substring of the narration
+        (REGEX, 'Regular expression'),  # Case-insensitive re.search on the narration
+    ]
+
+    name = models.CharField(max_length=255)
+    match_type = models.CharField(max_length=10, choices=MATCH_TYPE_CHOICES, default=KEYWORD)
+    pattern = models.CharField(max_length=500, blank=True)  # Blank matches every narration
+
+    # Debit or credit amount, whichever the transaction has; both bounds included
+    min_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
+    sub_category = models.ForeignKey(SubCategory, on_delete=models.CASCADE, null=True, blank=True)
+    nominal_account = models.CharField(max_length=50, choices=Transaction.NOMINAL_ACCOUNT_CHOICES, blank=True)
+
+    priority = models.PositiveIntegerField(default=100)  # Lower runs first
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ['priority', 'id']
+
+    def clean(self):
+        if self.match_type == self.REGEX and self.pattern:
+            try:
+                re.compile(self.pattern)
+            except re.error as exc:
+                raise ValidationError({'pattern': f"Invalid regular expression: {exc}"})
+        if self.min_amount is not None and self.max_amount is not None and self.min_amount > self.max_amount:
+            raise ValidationError({'max_amount': "Must not be less than the minimum amount."})
+        if self.sub_category_id and self.category_id and self.sub_category.category_id != self.category_id:
+            raise ValidationError({'sub_category': "Sub category belongs to another category."})
+        if not (self.category_id or self.sub_category_id or self.nominal_account):
+            raise ValidationError("Set a category, sub category or nominal account to assign.")
+
+    def __str__(self):
+        return f"{self.name} ({self.get_match_type_display()}: {self.pattern or '*'})"
@@ -0,0 +1,42 @@
+from django.db import models
+from django.db.models.functions import Coalesce
+from accounts.models import PersonalAccount
+from transactions.models.category_model import Category, SubCategory
+
+
+class MonthlyRollup(models.Model):
+    """
+    Debit/credit totals of the transactions sharing one
+    (year, month, personal_account, nominal_account, category, sub_category).
+
+    Derived from Transaction and kept up to date by signals and the upload
+    pipeline; rebuild it with ``manage.py rebuild_rollups``.
+    """
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    personal_account = models.ForeignKey(PersonalAccount, on_delete=models.CASCADE)
+    nominal_account = models.CharField(max_length=50)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True)
+    sub_category = models.ForeignKey(SubCategory, on_delete=models.CASCADE, null=True, blank=True)
+
+    debit_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    credit_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    transaction_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['year', 'month', 'nominal_account'], name='rollup_period_nominal_idx'),
+        ]
+        constraints = [
+            # One row per rollup key. NULL categories are coalesced because
+            # unique indexes treat NULLs as distinct and nulls_distinct=False
+            # is PostgreSQL-only.
+            models.UniqueConstraint(
+                'year', 'month', 'personal_account', 'nominal_account',
+                Coalesce('category', 0), Coalesce('sub_category', 0),
+                name='rollup_key_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.year}-{self.month:02d} {self.nominal_account}"
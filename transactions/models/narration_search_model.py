@@ -0,0 +1,30 @@
+from django.db import models
+from transactions.models.transaction_model import Transaction
+
+
+class NarrationSearchEntry(models.Model):
+    """
+    A row of the SQLite FTS5 index over ``Transaction.narration``, joined to
+    its transaction on rowid = id so searches can be filtered and ranked in
+    one query. ``rank`` is FTS5's bm25 score for the current MATCH (lower is
+    better).
+
+    The virtual table and the triggers that keep it in sync are created by
+    ``narration_search_service.ensure_narration_search_index`` after migrate,
+    not by a migration; PostgreSQL uses an expression index instead and has
+    no such table.
+    """
+    transaction = models.OneToOneField(
+        Transaction,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name='narration_search',
+    )
+    narration = models.TextField()
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'transactions_narration_fts'
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.db import models
+
+
+class ProfileCapture(models.Model):
+    """
+    A profile of one request, captured on demand by a staff user; see
+    ``RequestProfilingMiddleware``. The files live under ``PROFILES_DIR``.
+    """
+    CPROFILE = 'cprofile'
+    SAMPLING = 'sampling'
+
+    PROFILER_CHOICES = [
+        (CPROFILE, 'cProfile'),  # Deterministic; every call, with some overhead
+        (SAMPLING, 'Sampling'),  # Stack samples at PROFILE_SAMPLE_INTERVAL_MS; low overhead
+    ]
+
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=2000)  # Including the query string
+    view_name = models.CharField(max_length=255, blank=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    duration_ms = models.FloatField()
+    profiler = models.CharField(max_length=20, choices=PROFILER_CHOICES)
+
+    profile_file = models.CharField(max_length=500, blank=True)  # pstats dump, cProfile only
+    collapsed_file = models.CharField(max_length=500)  # "frame;frame;frame count" lines for flamegraph tools
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
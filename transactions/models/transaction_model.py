@@ -46,6 +46,16 @@ class Transaction(models.Model):
                 name='unique_narration_nominal_date_except_transfer'
             )
         ]
+        indexes = [
+            # Running balances and per-account ledgers walk (date, id) within an account
+            models.Index(fields=['personal_account', 'date', 'id'], name='txn_account_date_id_idx'),
+            # Expense and other per-nominal-account reports over a date range
+            models.Index(fields=['nominal_account', 'date'], name='txn_nominal_date_idx'),
+            # Monthly listings and the (date, id) keyset pages of the transactions API
+            models.Index(fields=['date', 'id'], name='txn_date_idx'),
+            # Transactions API pages filtered by category
+            models.Index(fields=['category', 'date', 'id'], name='txn_category_date_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.date} - {self.narration}"
\ No newline at end of file
@@ -0,0 +1,50 @@
+from django.db import models
+
+
+class UploadJob(models.Model):
+    """
+    A statement upload run in the background worker pool.
+    """
+    PENDING = 'PENDING'
+    RUNNING = 'RUNNING'
+    COMPLETED = 'COMPLETED'
+    INVALID = 'INVALID'
+    FAILED = 'FAILED'
+    INTERRUPTED = 'INTERRUPTED'
+
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (COMPLETED, 'Completed'),
+        (INVALID, 'Invalid rows'),  # Rolled back, see the error file
+        (FAILED, 'Failed'),
+        (INTERRUPTED, 'Interrupted'),  # The worker process died mid-run
+    ]
+    ACTIVE_STATUSES = (PENDING, RUNNING)
+
+    file_name = models.CharField(max_length=255)
+    file_path = models.CharField(max_length=500)  # Stored copy of the upload, removed when the job ends
+    validation = models.CharField(max_length=20, default='columnar')
+    on_duplicate = models.CharField(max_length=20, default='skip')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    worker = models.CharField(max_length=255, blank=True)  # "hostname:pid" of the process running the job
+
+    rows_parsed = models.PositiveIntegerField(default=0)
+    rows_validated = models.PositiveIntegerField(default=0)
+    rows_inserted = models.PositiveIntegerField(default=0)
+    rows_skipped = models.PositiveIntegerField(default=0)
+    rows_updated = models.PositiveIntegerField(default=0)
+    rows_with_errors = models.PositiveIntegerField(default=0)
+
+    error_file = models.CharField(max_length=500, blank=True)
+    message = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.file_name} ({self.status})"
@@ -1 +1,5 @@
-from .transaction_serializer import *
\ No newline at end of file
+from .transaction_serializer import *
+from .transaction_frame_serializer import *
+from .transaction_list_serializer import *
+
+from .upload_job_serializer import *
\ No newline at end of file
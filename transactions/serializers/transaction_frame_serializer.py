@@ -0,0 +1,241 @@
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from transactions.models import Category, SubCategory, Transaction
+from transactions.serializers.transaction_serializer import NOMINAL_ACCOUNT_MAP
+from transactions.services.lookup_cache_service import (
+    category_lookup,
+    personal_account_lookup,
+    sub_category_lookup,
+)
+from utils import datetime_utils
+from utils.string_utils import snake_case
+
+NULL_ERROR = "This field may not be null."
+BLANK_ERROR = "This field may not be blank."
+MAX_DIGITS = 10
+MAX_NARRATION_LENGTH = 255
+
+
+class TransactionFrameSerializer:
+    """
+    Columnar counterpart of ``TransactionSerializer`` for statement uploads.
+
+    Applies the same rules to whole DataFrame columns at once instead of one
+    serializer per row: dates are parsed with ``DEFAULT_DATE_FORMAT``,
+    debit/credit exclusivity and positivity are checked with vectorized masks,
+    nominal accounts are normalized through ``NOMINAL_ACCOUNT_MAP`` and related
+    names are resolved through the cached name maps of each model. Categories and
+    sub categories that do not exist yet are created with one bulk insert each.
+
+    Usage mirrors a DRF serializer::
+
+        serializer = TransactionFrameSerializer(data=df)
+        if serializer.is_valid():
+            serializer.validated_data  # DataFrame of resolved rows
+        else:
+            serializer.errors  # Series of {field: [messages]} per invalid row
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        self.initial_data = data
+        self._field_errors: Dict[str, List[pd.Series]] = {}
+        self._validated_data: Optional[pd.DataFrame] = None
+        self._errors: Optional[pd.Series] = None
+
+    def is_valid(self) -> bool:
+        frame = self.initial_data.rename(columns=snake_case)
+        self._field_errors = {}
+
+        dates = self._validate_date(self._column(frame, "date"))
+        narrations = self._validate_narration(self._column(frame, "narration"))
+        debits = self._validate_amount(self._column(frame, "debit_amount"), "debit_amount")
+        credits = self._validate_amount(self._column(frame, "credit_amount"), "credit_amount")
+        nominal_accounts = self._validate_nominal_account(self._column(frame, "nominal_account"))
+        account_ids = self._validate_personal_account(self._column(frame, "personal_account"))
+        category_ids, sub_category_ids = self._validate_categories(
+            self._column(frame, "category"), self._column(frame, "sub_category")
+        )
+
+        # Object-level rules only run for rows whose fields are valid, like ``validate()``.
+        field_valid = ~self._error_mask(frame.index)
+        has_debit = debits.notna() & debits.ne(0)
+        has_credit = credits.notna() & credits.ne(0)
+        self._add_error(field_valid & has_debit & has_credit, "non_field_errors",
+                        "Only one of Debit Amount or Credit Amount should have a value.")
+        self._add_error(field_valid & ~has_debit & ~has_credit, "non_field_errors",
+                        "Either Debit Amount or Credit Amount must have a value.")
+        self._add_error(field_valid & has_debit & debits.lt(0), "non_field_errors",
+                        "Debit Amount must be positive.")
+        self._add_error(field_valid & has_credit & credits.lt(0), "non_field_errors",
+                        "Credit Amount must be positive.")
+
+        invalid = self._error_mask(frame.index)
+        self._errors = self._collect_errors(invalid)
+
+        valid = ~invalid
+        self._validated_data = pd.DataFrame({
+            "date": dates[valid].dt.date,
+            "narration": narrations[valid],
+            "debit_amount": debits[valid].map(_to_decimal),
+            "credit_amount": credits[valid].map(_to_decimal),
+            "category_id": category_ids[valid],
+            "sub_category_id": sub_category_ids[valid],
+            "personal_account_id": account_ids[valid],
+            "nominal_account": nominal_accounts[valid],
+        })
+        return not invalid.any()
+
+    @property
+    def errors(self) -> pd.Series:
+        assert self._errors is not None, "You must call `.is_valid()` before accessing `.errors`."
+        return self._errors
+
+    @property
+    def validated_data(self) -> pd.DataFrame:
+        assert self._validated_data is not None, "You must call `.is_valid()` before accessing `.validated_data`."
+        return self._validated_data
+
+    def _column(self, frame: pd.DataFrame, name: str) -> pd.Series:
+        """Fetch a column with NaN turned into None and strings stripped."""
+        if name not in frame.columns:
+            return pd.Series(None, index=frame.index, dtype=object)
+        column = frame[name].astype(object).where(frame[name].notna(), None)
+        return column.map(lambda value: value.strip() if isinstance(value, str) else value)
+
+    def _add_error(self, mask: pd.Series, field: str, message) -> None:
+        """Attach ``message`` (a string or a per-row Series) to ``field`` on masked rows."""
+        if not mask.any():
+            return
+        messages = message[mask] if isinstance(message, pd.Series) else pd.Series(message, index=mask.index[mask])
+        self._field_errors.setdefault(field, []).append(messages)
+
+    def _error_mask(self, index: pd.Index) -> pd.Series:
+        mask = pd.Series(False, index=index)
+        for messages in self._field_errors.values():
+            for batch in messages:
+                mask[batch.index] = True
+        return mask
+
+    def _collect_errors(self, invalid: pd.Series) -> pd.Series:
+        """Build one ``{field: [messages]}`` dict per invalid row for the error file."""
+        errors: Dict = {idx: {} for idx in invalid.index[invalid]}
+        for field, batches in self._field_errors.items():
+            for batch in batches:
+                for idx, text in batch.items():
+                    errors[idx].setdefault(field, []).append(text)
+        return pd.Series(errors, dtype=object)
+
+    def _validate_date(self, raw: pd.Series) -> pd.Series:
+        is_text = raw.map(lambda value: isinstance(value, str))
+        parsed_text = pd.to_datetime(raw.where(is_text), format=datetime_utils.DEFAULT_DATE_FORMAT, errors="coerce")
+        parsed_dates = pd.to_datetime(raw.where(~is_text), errors="coerce")
+        dates = parsed_text.fillna(parsed_dates)
+
+        self._add_error(raw.isna(), "date", NULL_ERROR)
+        self._add_error(raw.notna() & dates.isna(), "date",
+                        "Date has wrong format. Use one of these formats instead: DD-MM-YYYY.")
+        return dates
+
+    def _validate_narration(self, raw: pd.Series) -> pd.Series:
+        narrations = raw.where(raw.isna(), raw.astype(str))
+        self._add_error(raw.isna(), "narration", NULL_ERROR)
+        self._add_error(narrations.eq(""), "narration", BLANK_ERROR)
+        self._add_error(narrations.str.len().gt(MAX_NARRATION_LENGTH), "narration",
+                        f"Ensure this field has no more than {MAX_NARRATION_LENGTH} characters.")
+        return narrations
+
+    def _validate_amount(self, raw: pd.Series, field: str) -> pd.Series:
+        # Only numeric cells are amounts; any other cell, even text such as
+        # "12.50", counts as empty, as in ``TransactionSerializer.to_internal_value``.
+        if not pd.api.types.is_numeric_dtype(raw):
+            raw = raw.where(raw.map(lambda value: isinstance(value, (int, float))))
+        amounts = pd.to_numeric(raw, errors="coerce").round(2)
+        self._add_error(amounts.abs().ge(10 ** (MAX_DIGITS - 2)), field,
+                        f"Ensure that there are no more than {MAX_DIGITS} digits in total.")
+        return amounts
+
+    def _validate_nominal_account(self, raw: pd.Series) -> pd.Series:
+        resolved = raw.map(lambda value: NOMINAL_ACCOUNT_MAP.get(str(value).lower()) if value is not None else None)
+        self._add_error(raw.isna(), "nominal_account", NULL_ERROR)
+        self._add_error(raw.notna() & resolved.isna(), "nominal_account",
+                        raw.map(lambda value: f"Invalid nominal account: {value}."))
+        return resolved
+
+    def _validate_personal_account(self, raw: pd.Series) -> pd.Series:
+        resolved = raw.map(personal_account_lookup.ids())
+        self._add_error(raw.isna(), "personal_account", NULL_ERROR)
+        self._add_error(raw.notna() & resolved.isna(), "personal_account",
+                        raw.map(lambda value: f"Object with name={value} does not exist."))
+        return resolved
+
+    def _validate_categories(self, category_names: pd.Series, sub_category_names: pd.Series):
+        """
+        Resolve category and sub category names, creating the missing ones in bulk.
+
+        As with ``get_or_create`` in the row serializer, a sub category is only
+        created when its category is given; a lone sub category must exist.
+        """
+        category_names = category_names.where(category_names.ne(""), None)
+        sub_category_names = sub_category_names.where(sub_category_names.ne(""), None)
+
+        missing = set(category_names.dropna().unique()) - set(category_lookup.ids())
+        if missing:
+            # bulk_create sends no post_save, so drop the cached names by hand
+            Category.objects.bulk_create([Category(name=name) for name in sorted(missing)], ignore_conflicts=True)
+            category_lookup.invalidate()
+        category_ids = category_lookup.ids()
+        resolved_categories = category_names.map(category_ids)
+
+        pairs = pd.DataFrame({"name": sub_category_names, "category_id": resolved_categories}).dropna()
+        new_pairs = pairs[~pairs["name"].isin(sub_category_lookup.ids())].drop_duplicates("name")
+        if not new_pairs.empty:
+            SubCategory.objects.bulk_create(
+                [SubCategory(name=row.name, category_id=int(row.category_id)) for row in new_pairs.itertuples()],
+                ignore_conflicts=True,
+            )
+            sub_category_lookup.invalidate()
+
+        resolved_subs = sub_category_names.map(sub_category_lookup.ids())
+        sub_parent_ids = resolved_subs.map(lambda pk: sub_category_lookup.extras_for(pk).get("category_id"))
+
+        self._add_error(sub_category_names.notna() & resolved_subs.isna(), "sub_category",
+                        sub_category_names.map(lambda value: f"Object with name={value} does not exist."))
+        category_names_by_id = {pk: name for name, pk in category_ids.items()}
+        mismatch = resolved_subs.notna() & resolved_categories.notna() & sub_parent_ids.ne(resolved_categories)
+        self._add_error(mismatch, "sub_category", pd.Series([
+            f"Sub category {name} belongs to category {category_names_by_id.get(parent_id)}."
+            for name, parent_id in zip(sub_category_names, sub_parent_ids)
+        ], index=sub_category_names.index, dtype=object))
+
+        return resolved_categories, resolved_subs
+
+
+def _to_decimal(value) -> Optional[Decimal]:
+    return None if pd.isna(value) else Decimal(str(value)).quantize(Decimal("0.01"))
+
+
+def build_transactions(validated_data: pd.DataFrame) -> List[Transaction]:
+    """
+    Turn the rows validated by ``TransactionFrameSerializer`` into unsaved
+    ``Transaction`` objects ready for ``bulk_create``.
+    """
+    def fk(value) -> Optional[int]:
+        return None if pd.isna(value) else int(value)
+
+    return [
+        Transaction(
+            date=row.date,
+            narration=row.narration,
+            debit_amount=row.debit_amount or Decimal("0.00"),
+            credit_amount=row.credit_amount or Decimal("0.00"),
+            category_id=fk(row.category_id),
+            sub_category_id=fk(row.sub_category_id),
+            personal_account_id=int(row.personal_account_id),
+            nominal_account=row.nominal_account,
+            running_balance=Decimal("0.00"),
+        )
+        for row in validated_data.itertuples(index=False)
+    ]
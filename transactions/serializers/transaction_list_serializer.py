@@ -0,0 +1,59 @@
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db.models import QuerySet
+
+# Rendered fields -> the values() column each is read from, in output order
+LISTING_COLUMNS = {
+    "date": "date",
+    "narration": "narration",
+    "debit_amount": "debit_amount",
+    "credit_amount": "credit_amount",
+    "running_balance": "running_balance",
+    "category": "category__name",
+    "sub_category": "sub_category__name",
+    "personal_account": "personal_account__name",
+    "nominal_account": "nominal_account",
+}
+DECIMAL_FIELDS = ("debit_amount", "credit_amount", "running_balance")
+TWO_PLACES = Decimal("0.01")
+
+
+def _decimal(value: Optional[Decimal]) -> Optional[str]:
+    # Same text as DRF's DecimalField(decimal_places=2) renders
+    return None if value is None else format(Decimal(value).quantize(TWO_PLACES), "f")
+
+
+class TransactionListSerializer:
+    """
+    Read-only counterpart of ``TransactionSerializer`` for transaction
+    listings, producing the same output.
+
+    ``select`` turns a Transaction queryset into a ``values()`` query that
+    joins in the related names, so a listing is one query however many rows
+    it has; rows are then rendered with plain dict building instead of a DRF
+    field per value::
+
+        rows = TransactionListSerializer.select(Transaction.objects.filter(...))
+        TransactionListSerializer(rows).data  # [{"date": "2024-03-01", ...}, ...]
+    """
+
+    @staticmethod
+    def select(queryset: QuerySet, *extra: str) -> QuerySet:
+        """The listing columns of ``queryset``, plus ``id`` for cursors and any ``extra`` ones."""
+        return queryset.values("id", *extra, *LISTING_COLUMNS.values())
+
+    def __init__(self, rows: Iterable[Dict[str, Any]]):
+        self.rows = rows
+
+    @staticmethod
+    def to_representation(row: Dict[str, Any]) -> Dict[str, Any]:
+        data = {field: row[column] for field, column in LISTING_COLUMNS.items()}
+        data["date"] = data["date"].isoformat()
+        for field in DECIMAL_FIELDS:
+            data[field] = _decimal(data[field])
+        return data
+
+    @property
+    def data(self) -> List[Dict[str, Any]]:
+        return [self.to_representation(row) for row in self.rows]
@@ -1,53 +1,84 @@
 from decimal import Decimal
 import pandas as pd
-from rest_framework import serializers
-from transactions.models import Category, SubCategory
-from accounts.models import PersonalAccount
-
-
+from django.db import models
+from django.utils.encoding import smart_str
 from rest_framework import serializers
 from transactions.models import Category, SubCategory
 from accounts.models import PersonalAccount
 
 
 from transactions.models import Transaction
+from transactions.services.lookup_cache_service import (
+    category_lookup,
+    personal_account_lookup,
+    sub_category_lookup,
+)
 from utils import datetime_utils
 
+# Normalized display name -> stored value, e.g. "credit card" -> "CREDIT_CARD"
+NOMINAL_ACCOUNT_MAP = {display.lower(): internal for internal, display in Transaction.NOMINAL_ACCOUNT_CHOICES}
+
+
+class CachedSlugRelatedField(serializers.SlugRelatedField):
+    """
+    SlugRelatedField matched by 'name' through a NameLookup cache instead of
+    one query per value, both when reading a name and when rendering one.
+    """
+
+    def __init__(self, lookup, **kwargs):
+        self.lookup = lookup
+        super().__init__(slug_field="name", **kwargs)
+
+    def to_internal_value(self, data):
+        instance = self.lookup.instance_for(smart_str(data))
+        if instance is None:
+            self.fail('does_not_exist', slug_name=self.slug_field, value=smart_str(data))
+        return instance
+
+    def get_attribute(self, instance):
+        # Read the raw foreign key id so rendering never loads the related row
+        if isinstance(instance, models.Model) and len(self.source_attrs) == 1:
+            return getattr(instance, instance._meta.get_field(self.source_attrs[0]).attname)
+        return super().get_attribute(instance)
+
+    def to_representation(self, obj):
+        if isinstance(obj, models.Model):
+            return super().to_representation(obj)
+        return self.lookup.name_for(obj)
+
+
 class TransactionSerializer(serializers.Serializer):
     date = serializers.DateField(input_formats=["%d-%m-%Y"])
     narration = serializers.CharField(max_length=255)
     debit_amount = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, allow_null=True)
     credit_amount = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, allow_null=True)
     running_balance = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, allow_null=True)
-    category = serializers.SlugRelatedField(
+    category = CachedSlugRelatedField(
+        category_lookup,
         queryset=Category.objects.all(),
-        slug_field="name",  # Match by 'name'
         required=False,  # Assume this field is mandatory,
         allow_null=True
     )
-    sub_category = serializers.SlugRelatedField(
+    sub_category = CachedSlugRelatedField(
+        sub_category_lookup,
         queryset=SubCategory.objects.all(),
-        slug_field="name",  # Match by 'name'
         required=False, # Assume this field is mandatory
         allow_null=True
     )
-    personal_account = serializers.SlugRelatedField(
+    personal_account = CachedSlugRelatedField(
+        personal_account_lookup,
         queryset=PersonalAccount.objects.all(),
-        slug_field="name",  # Match by 'name'
         required=True  # Assume this field is mandatory
     )
     nominal_account = serializers.CharField()
 
     def validate_nominal_account(self, value):
         """Normalize nominal_account to match the database choices."""
-        # Dynamically generate the map from NOMINAL_ACCOUNT_CHOICES
-        nominal_account_map = {display.lower(): internal for internal, display in Transaction.NOMINAL_ACCOUNT_CHOICES}
-
         # Normalize input: strip whitespace and convert to lowercase
         normalized_value = value.strip().lower()
 
-        # Resolve the value from the map
-        resolved_value = nominal_account_map.get(normalized_value)
+        # Resolve the value from the map built once from NOMINAL_ACCOUNT_CHOICES
+        resolved_value = NOMINAL_ACCOUNT_MAP.get(normalized_value)
 
         if not resolved_value:
             raise serializers.ValidationError(f"Invalid nominal account: {value}.")
@@ -81,18 +112,21 @@ class TransactionSerializer(serializers.Serializer):
         category_name = data.get('category')
         sub_category_name = data.get('sub_category')
 
-        # Get or create category
+        # Get or create category, skipping the query when the name is cached
         if category_name:
-            category, _ = Category.objects.get_or_create(name=category_name.strip())
-            data['category'] = category.name
+            category_name = category_name.strip()
+            category_id = category_lookup.id_for(category_name)
+            if category_id is None:
+                category_id = Category.objects.get_or_create(name=category_name)[0].pk
+            data['category'] = category_name
 
         # Get or create subcategory
         if sub_category_name and category_name:
-            sub_category, _ = SubCategory.objects.get_or_create(
-                name=sub_category_name.strip(),
-                category=category
-            )
-            data['sub_category'] = sub_category.name
+            sub_category_name = sub_category_name.strip()
+            sub_category_id = sub_category_lookup.id_for(sub_category_name)
+            if sub_category_id is None or sub_category_lookup.extras_for(sub_category_id)["category_id"] != category_id:
+                SubCategory.objects.get_or_create(name=sub_category_name, category_id=category_id)
+            data['sub_category'] = sub_category_name
         
         data['credit_amount'] = round(data['credit_amount'], 2) if isinstance(data['credit_amount'], (int, float)) else None
         data['debit_amount'] = round(data['debit_amount'], 2) if isinstance(data['debit_amount'], (int, float)) else None
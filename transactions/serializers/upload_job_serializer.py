@@ -0,0 +1,42 @@
+from django.urls import reverse
+from rest_framework import serializers
+from transactions.models import UploadJob
+
+
+class UploadJobSerializer(serializers.ModelSerializer):
+    status_url = serializers.SerializerMethodField()
+    error_file_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadJob
+        fields = [
+            "id",
+            "file_name",
+            "validation",
+            "on_duplicate",
+            "status",
+            "rows_parsed",
+            "rows_validated",
+            "rows_inserted",
+            "rows_skipped",
+            "rows_updated",
+            "rows_with_errors",
+            "message",
+            "created_at",
+            "started_at",
+            "finished_at",
+            "status_url",
+            "error_file_url",
+        ]
+
+    def _absolute(self, path):
+        request = self.context.get("request")
+        return request.build_absolute_uri(path) if request else path
+
+    def get_status_url(self, job):
+        return self._absolute(reverse("upload-job-detail", args=[job.pk]))
+
+    def get_error_file_url(self, job):
+        if not job.error_file:
+            return None
+        return self._absolute(reverse("upload-job-errors", args=[job.pk]))
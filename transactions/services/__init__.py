@@ -1,4 +1,11 @@
 from .account_summary_service import *
 from .transactions_report_service import *
 from .expense_summary_service import *
-from .categorised_expense_report_service import *
\ No newline at end of file
+from .categorised_expense_report_service import *
+from .running_balance_service import *
+from .lookup_cache_service import *
+from .monthly_rollup_service import *
+from .balance_checkpoint_service import *
+from .report_cache_service import *
+from .transaction_page_service import *
+from .narration_search_service import *
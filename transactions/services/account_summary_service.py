@@ -1,82 +1,93 @@
+from datetime import date
 from decimal import Decimal
-from typing import List, Dict, Any
-from django.db.models import Sum, F, DecimalField, QuerySet
-from django.db.models.functions import Coalesce
-from accounts.models import PersonalAccount
-from transactions.models import Transaction
-from datetime import datetime, timedelta
+from typing import List, Dict, Any, Tuple
+from django.db.models import Sum
+from transactions.models import MonthlyRollup
+from transactions.services.balance_checkpoint_service import opening_balances
+from transactions.services.lookup_cache_service import personal_account_lookup
+from transactions.services.monthly_rollup_service import rollup_period_filter
+from transactions.services.report_cache_service import cached_report
+from utils.datetime_utils import MONTH_FORMAT, iter_months
 import pandas as pd
 
 
-def get_account_summary_report_data(month: int, year: int) -> List[Dict[str, Any]]:
+@cached_report("account_summary", period=lambda start, end: (start, end), balance_dependent=True)
+def get_account_summary_range_data(start: date, end: date) -> List[Dict[str, Any]]:
     """
-    Generate a monthly report of transactions for each account.
+    Generate a report of transactions for each account for every month from
+    ``start`` to ``end``.
+
+    Opening balances of the first month come from the balance checkpoints and
+    the debits and credits of every month from one grouped query on the
+    monthly rollup; each month's closing balance is carried into the next.
 
     Args:
-        month (int): The month for the report.
-        year (int): The year for the report.
+        start (date): Any day of the first month.
+        end (date): Any day of the last month.
 
     Returns:
-        List[Dict[str, Any]]: List of account summaries.
+        List[Dict[str, Any]]: One ``{"month": "YYYY-MM", "accounts": [...]}``
+        entry per month, holding the account summaries of that month.
     """
-    first_day: datetime = datetime(year, month, 1)
-    last_day: datetime = (first_day + timedelta(days=31)).replace(day=1) - timedelta(days=1)
-
-    # Query for opening balances
-    opening_balances = Transaction.objects.filter(date__lt=first_day).values(
-        "personal_account__name"
-    ).annotate(
-        opening_balance=Coalesce(
-            Sum(F("credit_amount"), output_field=DecimalField(max_digits=10, decimal_places=2)) 
-            - Sum(F("debit_amount"), output_field=DecimalField(max_digits=10, decimal_places=2)),
-            Decimal("0.00"),
-        )
-    )
+    start, end = start.replace(day=1), end.replace(day=1)
+    balances: Dict[int, Decimal] = opening_balances(start)
 
-    # Query for transactions within the month
-    transactions_in_month = Transaction.objects.filter(date__range=(first_day, last_day)).values(
-        "personal_account__name"
-    ).annotate(
-        total_debit=Coalesce(
-            Sum(F("debit_amount")), Decimal("0.00"), output_field=DecimalField(max_digits=10, decimal_places=2)
-        ),
-        total_credit=Coalesce(
-            Sum(F("credit_amount")), Decimal("0.00"), output_field=DecimalField(max_digits=10, decimal_places=2)
-        ),
+    movements = (
+        MonthlyRollup.objects.filter(rollup_period_filter(start, end))
+        .values("personal_account_id", "year", "month")
+        .annotate(debit=Sum("debit_total", default=0), credit=Sum("credit_total", default=0))
+        .order_by()
     )
+    movements_by_month: Dict[Tuple[int, int], Dict[int, Tuple[Decimal, Decimal]]] = {}
+    for row in movements:
+        movements_by_month.setdefault((row["year"], row["month"]), {})[row["personal_account_id"]] = (
+            row["debit"], row["credit"]
+        )
+
+    accounts = sorted(personal_account_lookup.names().items(), key=lambda item: item[1])
+    no_movement = (Decimal("0.00"), Decimal("0.00"))
 
-    # Generate report
     report: List[Dict[str, Any]] = []
-    accounts: QuerySet[PersonalAccount] = PersonalAccount.objects.all().order_by("name")
+    for month in iter_months(start, end):
+        month_movements = movements_by_month.get((month.year, month.month), {})
+        summaries: List[Dict[str, Any]] = []
 
-    for account in accounts:
-        account_name: str = account.name
-        opening_balance: Decimal = next(
-            (item["opening_balance"] for item in opening_balances if item["personal_account__name"] == account_name),
-            Decimal("0.00"),
-        )
-        transaction_data: Dict[str, Any] = next(
-            (item for item in transactions_in_month if item["personal_account__name"] == account_name), {}
-        )
-        total_debit: Decimal = transaction_data.get("total_debit", Decimal("0.00"))
-        total_credit: Decimal = transaction_data.get("total_credit", Decimal("0.00"))
-        closing_balance: Decimal = opening_balance + total_credit - total_debit
-
-        if (round(opening_balance, 2) != 0 or round(total_debit, 2) != 0 or round(total_credit, 2) != 0):
-            report.append({
-                "account_name": account_name,
-                "opening_balance": round(opening_balance, 2),
-                "debit": round(total_debit, 2),
-                "credit": round(total_credit, 2),
-                "closing_balance": round(closing_balance, 2),
-            })
+        for account_id, account_name in accounts:
+            opening_balance: Decimal = balances.get(account_id, Decimal("0.00"))
+            total_debit, total_credit = month_movements.get(account_id, no_movement)
+            closing_balance: Decimal = opening_balance + total_credit - total_debit
+            balances[account_id] = closing_balance
+
+            if (round(opening_balance, 2) != 0 or round(total_debit, 2) != 0 or round(total_credit, 2) != 0):
+                summaries.append({
+                    "account_name": account_name,
+                    "opening_balance": round(opening_balance, 2),
+                    "debit": round(total_debit, 2),
+                    "credit": round(total_credit, 2),
+                    "closing_balance": round(closing_balance, 2),
+                })
+
+        report.append({"month": month.strftime(MONTH_FORMAT), "accounts": summaries})
 
     return report
 
 
-def get_account_summary_report(month: int, year: int) -> pd.DataFrame:
-    report_data = get_account_summary_report_data(month, year)
-    
+def get_account_summary_report_data(month: int, year: int) -> List[Dict[str, Any]]:
+    """
+    Generate a monthly report of transactions for each account.
+
+    Args:
+        month (int): The month for the report.
+        year (int): The year for the report.
+
+    Returns:
+        List[Dict[str, Any]]: List of account summaries.
+    """
+    first_day = date(year, month, 1)
+    return get_account_summary_range_data(first_day, first_day)[0]["accounts"]
+
+
+def account_summary_frame(report_data: List[Dict[str, Any]]) -> pd.DataFrame:
     formatted_data = [
         {
             "Account Summary": row["account_name"],
@@ -94,4 +105,22 @@ def get_account_summary_report(month: int, year: int) -> pd.DataFrame:
         "Credit": "",
         "Closing Balance": sum(x["Closing Balance"] for x in formatted_data),
     })
-    return pd.DataFrame(formatted_data)
\ No newline at end of file
+    return pd.DataFrame(formatted_data)
+
+
+def get_account_summary_report(month: int, year: int) -> pd.DataFrame:
+    report_data = get_account_summary_report_data(month, year)
+    return account_summary_frame(report_data)
+
+
+def get_account_summary_range_report(start: date, end: date) -> pd.DataFrame:
+    """
+    The account summaries of every month from ``start`` to ``end`` stacked in
+    one frame, with a Month column and a Total row per month.
+    """
+    frames = []
+    for period in get_account_summary_range_data(start, end):
+        frame = account_summary_frame(period["accounts"])
+        frame.insert(0, "Month", period["month"])
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
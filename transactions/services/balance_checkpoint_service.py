@@ -0,0 +1,265 @@
+from bisect import bisect_right
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import TruncMonth
+
+from accounts.models import PersonalAccount
+from transactions.models import AccountBalanceCheckpoint, Transaction
+from transactions.services.report_cache_service import invalidate_all_reports
+
+# Set once this process has seen checkpoints in place; see ``ensure_checkpoints``.
+_checkpoints_ready = False
+
+
+def ensure_checkpoints() -> bool:
+    """
+    Build every checkpoint on first use when there are transactions but no
+    checkpoint at all, e.g. on a ledger that predates them, so opening
+    balances are never read as zero for want of a manual rebuild.
+
+    The check stops once it has been committed; a rolled back build is
+    tried again.
+
+    Returns:
+        bool: Whether the checkpoints were built by this call.
+    """
+    if _checkpoints_ready:
+        return False
+    built = False
+    if not AccountBalanceCheckpoint.objects.exists() and Transaction.objects.exists():
+        try:
+            with transaction.atomic():
+                rebuild_checkpoints()
+                invalidate_all_reports()
+            built = True
+        except IntegrityError:
+            pass  # Another process built them first
+    transaction.on_commit(_mark_checkpoints_ready)
+    return built
+
+
+def _mark_checkpoints_ready() -> None:
+    global _checkpoints_ready
+    _checkpoints_ready = True
+
+
+def month_start(value) -> date:
+    """
+    First day of the month ``value`` falls in.
+    """
+    return Transaction._meta.get_field("date").to_python(value).replace(day=1)
+
+
+def transaction_amount(values: Dict) -> Decimal:
+    """
+    Effect of a transaction on its account's balance: credit minus debit.
+    """
+    return Decimal(str(values["credit_amount"] or 0)) - Decimal(str(values["debit_amount"] or 0))
+
+
+def closing_balance_before(account_id: int, month: date) -> Decimal:
+    """
+    Balance of an account at the start of ``month``: the closing balance of
+    the latest checkpoint before it.
+    """
+    balance = (
+        AccountBalanceCheckpoint.objects.filter(personal_account_id=account_id, month__lt=month)
+        .order_by("-month")
+        .values_list("closing_balance", flat=True)
+        .first()
+    )
+    return balance or Decimal(0)
+
+
+def opening_balances(month: date) -> Dict[int, Decimal]:
+    """
+    Balance of every personal account at the start of ``month``, in one query.
+    """
+    ensure_checkpoints()
+    latest = (
+        AccountBalanceCheckpoint.objects.filter(personal_account_id=OuterRef("pk"), month__lt=month)
+        .order_by("-month")
+        .values("closing_balance")[:1]
+    )
+    rows = PersonalAccount.objects.annotate(balance=Subquery(latest)).values_list("pk", "balance")
+    return {account_id: balance or Decimal(0) for account_id, balance in rows}
+
+
+def balance_as_of(account_id: int, day) -> Decimal:
+    """
+    Balance of an account at the end of ``day``: the checkpoint before its
+    month plus the transactions from the first of the month up to ``day``.
+    """
+    ensure_checkpoints()
+    day = Transaction._meta.get_field("date").to_python(day)
+    first_day = day.replace(day=1)
+    in_month = Transaction.objects.filter(
+        personal_account_id=account_id, date__gte=first_day, date__lte=day
+    ).aggregate(debit=Sum("debit_amount", default=0), credit=Sum("credit_amount", default=0))
+    return closing_balance_before(account_id, first_day) + in_month["credit"] - in_month["debit"]
+
+
+def apply_checkpoint_delta(account_id: int, day, amount: Decimal, create: bool = True) -> None:
+    """
+    Shift the checkpoints of an account from ``day``'s month onwards by ``amount``.
+
+    With ``create`` the checkpoint of that month is added first when missing,
+    even for a zero amount, since every month with transactions has one.
+    Removing a transaction passes ``create=False``: its month already has a
+    checkpoint, unless a cascade has deleted the account's checkpoints, in
+    which case there is nothing left to shift. When a concurrent writer adds
+    the missing checkpoint first, the unique constraint rejects the second
+    insert and the amount is added to the winner's checkpoint.
+
+    Runs after the transaction has been written, so when this is the first
+    use and every checkpoint gets built, the write is already included.
+    """
+    if ensure_checkpoints():
+        return
+    month = month_start(day)
+    checkpoints = AccountBalanceCheckpoint.objects.filter(personal_account_id=account_id)
+
+    if create and not checkpoints.filter(month=month).exists():
+        opening = closing_balance_before(account_id, month)
+        try:
+            with transaction.atomic():
+                AccountBalanceCheckpoint.objects.create(
+                    personal_account_id=account_id, month=month, closing_balance=opening
+                )
+        except IntegrityError:
+            pass  # Created by a concurrent writer; shift theirs below
+    if amount:
+        checkpoints.filter(month__gte=month).update(closing_balance=F("closing_balance") + amount)
+
+
+def apply_checkpoint_update(old_values: Dict, new_values: Dict) -> None:
+    """
+    Move an edited transaction's amount from its old account and month to its new ones.
+    """
+    old = (old_values["personal_account_id"], month_start(old_values["date"]), transaction_amount(old_values))
+    new = (new_values["personal_account_id"], month_start(new_values["date"]), transaction_amount(new_values))
+    if old == new or ensure_checkpoints():
+        return
+    apply_checkpoint_delta(old[0], old[1], -old[2], create=False)
+    apply_checkpoint_delta(new[0], new[1], new[2])
+
+
+def _monthly_totals(transactions) -> Dict[int, List[Tuple[date, Decimal]]]:
+    """
+    Net amount per account and month, months in order, from one grouped query.
+    """
+    rows = (
+        transactions.annotate(month=TruncMonth("date"))
+        .values("personal_account_id", "month")
+        .annotate(debit=Sum("debit_amount", default=0), credit=Sum("credit_amount", default=0))
+        .order_by("personal_account_id", "month")
+    )
+    totals: Dict[int, List[Tuple[date, Decimal]]] = {}
+    for row in rows:
+        totals.setdefault(row["personal_account_id"], []).append((row["month"], row["credit"] - row["debit"]))
+    return totals
+
+
+def _carry_forward(account_id: int, totals: List[Tuple[date, Decimal]], balance: Decimal) -> List[AccountBalanceCheckpoint]:
+    checkpoints = []
+    for month, amount in totals:
+        balance += amount
+        checkpoints.append(AccountBalanceCheckpoint(personal_account_id=account_id, month=month, closing_balance=balance))
+    return checkpoints
+
+
+def refresh_checkpoints(earliest: Dict[int, date]) -> int:
+    """
+    Recompute the checkpoints of each account from the month of its earliest
+    touched date onwards, after a bulk insert that sent no signals.
+
+    Args:
+        earliest (Dict[int, date]): Earliest touched date per personal account id.
+
+    Returns:
+        int: Number of checkpoints written.
+    """
+    if ensure_checkpoints():
+        return AccountBalanceCheckpoint.objects.count()
+    written = 0
+    for account_id, day in earliest.items():
+        month = month_start(day)
+        totals = _monthly_totals(Transaction.objects.filter(personal_account_id=account_id, date__gte=month))
+        checkpoints = _carry_forward(account_id, totals.get(account_id, []), closing_balance_before(account_id, month))
+
+        AccountBalanceCheckpoint.objects.filter(personal_account_id=account_id, month__gte=month).delete()
+        AccountBalanceCheckpoint.objects.bulk_create(checkpoints, batch_size=1000)
+        written += len(checkpoints)
+    return written
+
+
+def rebuild_checkpoints() -> int:
+    """
+    Rebuild every checkpoint from the transactions table.
+    """
+    checkpoints = [
+        checkpoint
+        for account_id, totals in _monthly_totals(Transaction.objects.all()).items()
+        for checkpoint in _carry_forward(account_id, totals, Decimal(0))
+    ]
+    AccountBalanceCheckpoint.objects.all().delete()
+    AccountBalanceCheckpoint.objects.bulk_create(checkpoints, batch_size=1000)
+    return len(checkpoints)
+
+
+def verify_checkpoints(account_ids: Optional[Iterable[int]] = None) -> List[Dict]:
+    """
+    Compare stored checkpoints against a full recompute.
+
+    Returns:
+        List[Dict]: One entry per wrong or missing checkpoint, with the
+        account id, month, stored and expected closing balance.
+    """
+    transactions = Transaction.objects.all()
+    checkpoints = AccountBalanceCheckpoint.objects.all()
+    if account_ids is not None:
+        transactions = transactions.filter(personal_account_id__in=account_ids)
+        checkpoints = checkpoints.filter(personal_account_id__in=account_ids)
+
+    expected = {
+        account_id: _carry_forward(account_id, totals, Decimal(0))
+        for account_id, totals in _monthly_totals(transactions).items()
+    }
+    stored = {
+        (account_id, month): balance
+        for account_id, month, balance in checkpoints.values_list("personal_account_id", "month", "closing_balance")
+    }
+
+    mismatches = []
+
+    def report(account_id, month, stored_balance, expected_balance):
+        if stored_balance is None or round(stored_balance, 2) != round(expected_balance, 2):
+            mismatches.append({
+                "personal_account_id": account_id,
+                "month": month,
+                "stored": stored_balance,
+                "expected": expected_balance,
+            })
+
+    # Every month with transactions needs a checkpoint
+    for account_id, account_checkpoints in expected.items():
+        for checkpoint in account_checkpoints:
+            report(account_id, checkpoint.month, stored.get((account_id, checkpoint.month)), checkpoint.closing_balance)
+
+    # Checkpoints of months without transactions carry the balance before them
+    expected_months = {
+        account_id: [checkpoint.month for checkpoint in account_checkpoints]
+        for account_id, account_checkpoints in expected.items()
+    }
+    for (account_id, month), balance in stored.items():
+        months = expected_months.get(account_id, [])
+        position = bisect_right(months, month)
+        if position and months[position - 1] == month:
+            continue
+        report(account_id, month, balance, expected[account_id][position - 1].closing_balance if position else Decimal(0))
+
+    return mismatches
@@ -1,17 +1,52 @@
-from transactions.models import Transaction
+from datetime import date
+from typing import Any, Dict, List, Tuple
+
+from transactions.models import MonthlyRollup
+from transactions.services.lookup_cache_service import category_lookup, sub_category_lookup
+from transactions.services.monthly_rollup_service import rollup_period_filter
+from transactions.services.report_cache_service import cached_report, month_period
 from django.db.models import Sum
+from utils.datetime_utils import iter_months
 
-def categorised_expense_summary_data(month: int, year: int):
-     # Fetch grouped data by category and subcategory
-    expense_data = (
-        Transaction.objects.filter(nominal_account="EXPENSE")
-        .values("category__name", "sub_category__name")
+
+def categorised_expense_summary_range_data(start: date, end: date) -> Dict[Tuple[int, int], Dict[str, Any]]:
+    """
+    Categorised expense summary of every month from ``start`` to ``end`` from
+    one grouped rollup query, keyed by (year, month).
+    """
+    # Fetch grouped data by month, category and subcategory
+    grouped = (
+        MonthlyRollup.objects.filter(rollup_period_filter(start, end), nominal_account="EXPENSE")
+        .values("year", "month", "category_id", "sub_category_id")
         .annotate(
-            debit=Sum("debit_amount", default=0),
-            credit=Sum("credit_amount", default=0),
+            debit=Sum("debit_total", default=0),
+            credit=Sum("credit_total", default=0),
         )
-        .filter(date__year=year, date__month=month)
-        .order_by("category__name", "sub_category__name")
+        .order_by()
+    )
+
+    # Resolve names from the lookup cache instead of joining both tables
+    category_names = category_lookup.names()
+    sub_category_names = sub_category_lookup.names()
+    by_month: Dict[Tuple[int, int], List[Dict[str, Any]]] = {}
+    for row in grouped:
+        by_month.setdefault((row["year"], row["month"]), []).append({
+            "category__name": category_names.get(row["category_id"]),
+            "sub_category__name": sub_category_names.get(row["sub_category_id"]),
+            "debit": row["debit"],
+            "credit": row["credit"],
+        })
+    return {
+        (month.year, month.month): _format_expense_data(by_month.get((month.year, month.month), []))
+        for month in iter_months(start, end)
+    }
+
+
+def _format_expense_data(expense_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    expense_data = sorted(
+        expense_data,
+        key=lambda row: (row["category__name"] is None, row["category__name"] or "",
+                         row["sub_category__name"] is None, row["sub_category__name"] or ""),
     )
 
     # Format the response for easy front-end consumption
@@ -39,4 +74,10 @@ def categorised_expense_summary_data(month: int, year: int):
         "credit": sum(row["credit"] for row in expense_data),
     }
     
-    return {"data": formatted_data, "grand_total": grand_total}
\ No newline at end of file
+    return {"data": formatted_data, "grand_total": grand_total}
+
+
+@cached_report("categorised_expense_summary", period=lambda month, year: month_period(year, month))
+def categorised_expense_summary_data(month: int, year: int):
+    first_day = date(year, month, 1)
+    return categorised_expense_summary_range_data(first_day, first_day)[(year, month)]
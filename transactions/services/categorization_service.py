@@ -0,0 +1,268 @@
+import re
+import threading
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from transactions.models import CategorizationRule, Transaction
+from transactions.services.monthly_rollup_service import months_touched, refresh_rollups
+from transactions.services.report_cache_service import invalidate_report_months
+
+# Uncategorized transactions read and updated per round trip by ``recategorize_uncategorized``.
+RECATEGORIZE_BATCH_SIZE = 5000
+
+
+class CompiledRule:
+    """A rule's match conditions and what it assigns, detached from the ORM."""
+
+    def __init__(self, pk: int, position: int, match_type: str, pattern: str,
+                 min_amount: Optional[Decimal], max_amount: Optional[Decimal],
+                 category_id: Optional[int], sub_category_id: Optional[int], nominal_account: str):
+        self.pk = pk
+        self.position = position
+        self.keyword = pattern.lower() if match_type == CategorizationRule.KEYWORD and pattern else None
+        self.regex = re.compile(pattern, re.IGNORECASE) if match_type == CategorizationRule.REGEX and pattern else None
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        self.category_id = category_id
+        self.sub_category_id = sub_category_id
+        self.nominal_account = nominal_account
+
+    def accepts(self, amount) -> bool:
+        if self.min_amount is not None and (amount is None or amount < self.min_amount):
+            return False
+        if self.max_amount is not None and (amount is None or amount > self.max_amount):
+            return False
+        return True
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """
+    One regex alternation over ``keywords`` shaped as a prefix trie, so the
+    engine follows a single branch per character instead of trying every
+    keyword at every position; at each position it matches the longest
+    keyword starting there.
+    """
+    trie: Dict[str, dict] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class RuleMatcher:
+    """
+    The active rules compiled into one multi-keyword matcher.
+
+    Keyword rules are found with a single pass of a trie-shaped regex over
+    the lowercased narration, zero-width so that overlapping keywords are
+    all seen; regex and blank-pattern rules are checked one by one, but only
+    until a better-ranked rule has matched.
+    """
+
+    def __init__(self, rules: Sequence[CompiledRule]):
+        self.rules = list(rules)
+        self._keywords: Dict[str, List[int]] = {}
+        others = []
+        for rule in self.rules:
+            if rule.keyword is not None:
+                self._keywords.setdefault(rule.keyword, []).append(rule.position)
+            else:
+                others.append(rule.position)
+        self._others = frozenset(others)
+        self._lengths = sorted({len(keyword) for keyword in self._keywords})
+        self._keyword_regex = re.compile(f"(?=({_trie_pattern(self._keywords)}))") if self._keywords else None
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def match(self, narration: str, amount=None) -> Optional[CompiledRule]:
+        """The first rule, by priority, matching ``narration`` and ``amount``."""
+        candidates: Set[int] = set(self._others)
+        if self._keyword_regex is not None:
+            for found in self._keyword_regex.finditer(narration.lower()):
+                # Every keyword that is a prefix of the longest one matched here
+                text = found.group(1)
+                for length in self._lengths:
+                    if length > len(text):
+                        break
+                    positions = self._keywords.get(text[:length])
+                    if positions:
+                        candidates.update(positions)
+
+        for position in sorted(candidates):
+            rule = self.rules[position]
+            if rule.regex is not None and not rule.regex.search(narration):
+                continue
+            if rule.accepts(amount):
+                return rule
+        return None
+
+    def match_many(self, narrations: Sequence[str], amounts: Sequence) -> List[Optional[CompiledRule]]:
+        return [self.match(narration or "", amount) for narration, amount in zip(narrations, amounts)]
+
+
+class RuleMatcherCache:
+    """
+    The compiled matcher of the active rules, built on first use and rebuilt
+    after ``invalidate()``, which the rule model's save/delete signals call.
+    With ``LOOKUP_CACHE_SHARED_VERSION`` on, other workers pick the change up
+    through a version key in the default cache, as the name lookups do.
+    """
+
+    version_key = "categorization-rules:version"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._matcher: Optional[RuleMatcher] = None
+        self._version: Optional[int] = None
+
+    def get(self) -> RuleMatcher:
+        version = cache.get(self.version_key, 0) if self._shared_version() else None
+        matcher = self._matcher
+        if matcher is not None and version == self._version:
+            return matcher
+
+        with self._lock:
+            if self._matcher is None or version != self._version:
+                self._matcher = compile_rules()
+                self._version = version
+            return self._matcher
+
+    @staticmethod
+    def _shared_version() -> bool:
+        return getattr(settings, "LOOKUP_CACHE_SHARED_VERSION", False)
+
+    def invalidate(self) -> None:
+        self._clear()
+        transaction.on_commit(self._publish)
+
+    def _clear(self) -> None:
+        with self._lock:
+            self._matcher = None
+
+    def _publish(self) -> None:
+        self._clear()
+        if self._shared_version():
+            try:
+                cache.incr(self.version_key)
+            except ValueError:
+                cache.add(self.version_key, 1, timeout=None)
+
+
+def compile_rules() -> RuleMatcher:
+    rows = CategorizationRule.objects.filter(is_active=True).order_by("priority", "id").values_list(
+        "id", "match_type", "pattern", "min_amount", "max_amount",
+        "category_id", "sub_category_id", "sub_category__category_id", "nominal_account",
+    )
+    rules = []
+    for pk, match_type, pattern, min_amount, max_amount, category_id, sub_category_id, parent_id, nominal in rows:
+        rules.append(CompiledRule(
+            pk, len(rules), match_type, pattern, min_amount, max_amount,
+            # A sub category on its own implies its category
+            category_id or parent_id, sub_category_id, nominal,
+        ))
+    return RuleMatcher(rules)
+
+
+rule_matcher = RuleMatcherCache()
+
+
+def _amount(debit, credit):
+    return debit if debit else credit
+
+
+def categorize_transactions(transactions: Sequence[Transaction]) -> int:
+    """
+    Apply the rules to the uncategorized ``transactions`` in place, e.g. an
+    upload chunk before it is inserted. Returns how many were categorized.
+    """
+    matcher = rule_matcher.get()
+    if not matcher:
+        return 0
+
+    pending = [row for row in transactions if row.category_id is None]
+    matches = matcher.match_many(
+        [row.narration for row in pending],
+        [_amount(row.debit_amount, row.credit_amount) for row in pending],
+    )
+    categorized = 0
+    for row, rule in zip(pending, matches):
+        if rule is not None:
+            _assign(row, rule)
+            categorized += 1
+    return categorized
+
+
+def _assign(row: Transaction, rule: CompiledRule) -> None:
+    if rule.category_id is not None:
+        row.category_id = rule.category_id
+        row.sub_category_id = rule.sub_category_id
+    if rule.nominal_account:
+        row.nominal_account = rule.nominal_account
+
+
+def recategorize_uncategorized(batch_size: int = RECATEGORIZE_BATCH_SIZE, dry_run: bool = False) -> Tuple[int, int]:
+    """
+    Apply the rules to every uncategorized transaction already stored.
+
+    Reads the history in id order ``batch_size`` rows at a time and commits
+    each batch on its own: its matches are written with one ``bulk_update``
+    and the monthly rollups and cached reports of the months it touched are
+    refreshed in the same transaction, so an interrupted run keeps what it
+    has done and never holds the write lock for the whole history. Amounts
+    don't change, so running balances are left alone. Returns (rows checked,
+    rows categorized).
+    """
+    matcher = rule_matcher.get()
+    checked = categorized = 0
+    last_id = 0
+
+    while matcher:
+        batch = list(
+            Transaction.objects.filter(category__isnull=True, id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "date", "narration", "debit_amount", "credit_amount",
+                         "sub_category_id", "nominal_account")[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        checked += len(batch)
+
+        changed = []
+        now = timezone.now()
+        matches = matcher.match_many([row[2] for row in batch], [_amount(row[3], row[4]) for row in batch])
+        for (pk, day, _, _, _, sub_category_id, nominal), rule in zip(batch, matches):
+            if rule is None:
+                continue
+            row = Transaction(id=pk, date=day, sub_category_id=sub_category_id, nominal_account=nominal, updated_at=now)
+            _assign(row, rule)
+            # A rule assigning only a nominal account may already have been applied
+            if row.category_id is not None or row.nominal_account != nominal:
+                changed.append(row)
+
+        categorized += len(changed)
+        if changed and not dry_run:
+            months = months_touched(changed)
+            with transaction.atomic():
+                Transaction.objects.bulk_update(changed, ["category", "sub_category", "nominal_account", "updated_at"])
+                refresh_rollups(months)
+                invalidate_report_months(date(year, month, 1) for year, month in months)
+
+    return checked, categorized
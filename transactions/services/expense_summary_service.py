@@ -1,38 +1,57 @@
 
 import pandas as pd
-from typing import List, Dict, Any
-from django.db.models import Sum, F
+from datetime import date
+from typing import List, Dict, Any, Tuple
+from django.db.models import Sum
 from pandas import DataFrame
-from transactions.models import Transaction
+from transactions.models import MonthlyRollup
+from transactions.services.lookup_cache_service import personal_account_lookup
+from transactions.services.monthly_rollup_service import rollup_period_filter
+from transactions.services.report_cache_service import cached_report, month_period
+from utils.datetime_utils import iter_months
 
-def expense_summary_data(month: int, year: int) -> List[Dict[str, Any]]:
 
+def expense_summary_range_data(start: date, end: date) -> Dict[Tuple[int, int], List[Dict[str, Any]]]:
+    """
+    Expense summary of every month from ``start`` to ``end`` from one grouped
+    rollup query, keyed by (year, month).
+    """
+    # Pre-aggregated per month, so this reads a handful of rollup rows
+    # instead of scanning the months' transactions
     expense_data = (
-        Transaction.objects.filter(nominal_account="EXPENSE").values("personal_account__name")
+        MonthlyRollup.objects.filter(rollup_period_filter(start, end), nominal_account="EXPENSE")
+        .values("year", "month", "personal_account_id")
         .annotate(
-            debit=Sum("debit_amount", default=0),
-            credit=Sum("credit_amount", default=0),
-            total=Sum(F("debit_amount") - F("credit_amount"), default=0),
+            debit=Sum("debit_total", default=0),
+            credit=Sum("credit_total", default=0),
         )
-        .filter(date__year=year, date__month=month)
-        .order_by("personal_account__name")
+        .order_by()
     )
 
-    data = [
-        {
-            "account_name": row["personal_account__name"],
+    account_names = personal_account_lookup.names()
+    by_month: Dict[Tuple[int, int], List[Dict[str, Any]]] = {
+        (month.year, month.month): [] for month in iter_months(start, end)
+    }
+    for row in expense_data:
+        by_month[(row["year"], row["month"])].append({
+            "account_name": account_names.get(row["personal_account_id"]),
             "debit": row["debit"],
             "credit": row["credit"],
-            "total": row["total"],
-        }
-        for row in expense_data
-    ]
-    
-    return data
+            "total": row["debit"] - row["credit"],
+        })
 
+    for data in by_month.values():
+        data.sort(key=lambda row: row["account_name"] or "")
+    return by_month
 
-def expense_summary_report(month: int, year: int) -> DataFrame:
-    data = expense_summary_data(month, year)
+
+@cached_report("expense_summary", period=lambda month, year: month_period(year, month))
+def expense_summary_data(month: int, year: int) -> List[Dict[str, Any]]:
+    first_day = date(year, month, 1)
+    return expense_summary_range_data(first_day, first_day)[(year, month)]
+
+
+def expense_summary_frame(data: List[Dict[str, Any]]) -> DataFrame:
     formatted_data = [
         {
             "Account Name": row['account_name'],
@@ -48,4 +67,9 @@ def expense_summary_report(month: int, year: int) -> DataFrame:
             "Credit": sum(x["Credit"] for x in formatted_data),
             "Total": sum(x["Debit"] for x in formatted_data) - sum(x["Credit"] for x in formatted_data)
         })
-    return pd.DataFrame(formatted_data)
\ No newline at end of file
+    return pd.DataFrame(formatted_data)
+
+
+def expense_summary_report(month: int, year: int) -> DataFrame:
+    data = expense_summary_data(month, year)
+    return expense_summary_frame(data)
@@ -0,0 +1,92 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date
+from decimal import Decimal
+from itertools import islice
+from typing import Any, Iterable, Iterator, Optional, Sequence
+
+from django.conf import settings
+from django.db.models import QuerySet
+
+from transactions.models import Transaction
+from transactions.serializers.transaction_list_serializer import LISTING_COLUMNS
+
+# Exported field -> the values_list() column it is read from, in output order
+LEDGER_EXPORT_COLUMNS = {"id": "id", **LISTING_COLUMNS}
+
+LEDGER_EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+
+def ledger_queryset(start: Optional[date] = None, end: Optional[date] = None,
+                    account_ids: Optional[Sequence[int]] = None) -> QuerySet:
+    """Transactions from ``start`` to ``end`` (both included, either open) of ``account_ids`` or all accounts."""
+    queryset = Transaction.objects.all()
+    if start:
+        queryset = queryset.filter(date__gte=start)
+    if end:
+        queryset = queryset.filter(date__lte=end)
+    if account_ids:
+        queryset = queryset.filter(personal_account_id__in=account_ids)
+    return queryset.order_by("date", "id")
+
+
+def ledger_rows(queryset: QuerySet) -> Iterator[tuple]:
+    """
+    The export columns of ``queryset``, names joined in, read through a
+    server-side cursor ``LEDGER_EXPORT_CHUNK_SIZE`` rows at a time.
+    """
+    return queryset.values_list(*LEDGER_EXPORT_COLUMNS.values()).iterator(
+        chunk_size=settings.LEDGER_EXPORT_CHUNK_SIZE
+    )
+
+
+def _batches(rows: Iterable[tuple]) -> Iterator[list]:
+    # Text is handed to the response a batch at a time, not a line at a time
+    rows = iter(rows)
+    while batch := list(islice(rows, settings.LEDGER_EXPORT_CHUNK_SIZE)):
+        yield batch
+
+
+def csv_chunks(rows: Iterable[tuple]) -> Iterator[str]:
+    """A header line, then ``rows`` as CSV text."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(LEDGER_EXPORT_COLUMNS)
+    for batch in _batches(rows):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, Decimal):
+        # Amounts as exact strings, as in the transactions API
+        return format(value, "f")
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def ndjson_chunks(rows: Iterable[tuple]) -> Iterator[str]:
+    """``rows`` as newline-delimited JSON objects keyed by the export columns."""
+    encoder = json.JSONEncoder(default=_json_default, separators=(",", ":"), ensure_ascii=False)
+    fields = list(LEDGER_EXPORT_COLUMNS)
+    for batch in _batches(rows):
+        yield "".join(encoder.encode(dict(zip(fields, row))) + "\n" for row in batch)
+
+
+def gzip_chunks(chunks: Iterable[str]) -> Iterator[bytes]:
+    """Compress a text stream into one gzip member as it is produced."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode())
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,151 @@
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, models, transaction
+
+from accounts.models import PersonalAccount
+from transactions.models import Category, SubCategory
+
+Maps = Tuple[Dict[str, int], Dict[int, str], Dict[int, Dict[str, Any]]]
+
+
+class NameLookup:
+    """
+    Lazily loaded name -> id and id -> name maps for a small lookup table.
+
+    The maps are process-local and dropped by ``invalidate()``, which the
+    model's save/delete signals call. When ``LOOKUP_CACHE_SHARED_VERSION`` is
+    on, every invalidation also bumps a version key in Django's default cache
+    and each access compares against it, so an admin rename handled by one
+    worker is picked up by the others on their next lookup.
+
+    After an invalidation inside a transaction, lookups on that thread see
+    the transaction's own rows through maps kept apart from the shared ones
+    until it commits; a rollback discards them with the transaction, so ids
+    of rows that were never committed are not cached.
+    """
+
+    def __init__(self, model: type[models.Model], extra_fields: Sequence[str] = ()):
+        self.model = model
+        self.extra_fields = tuple(extra_fields)
+        self.version_key = f"lookup-cache:{model._meta.label_lower}:version"
+        self._lock = threading.Lock()
+        # (name -> id, id -> name, id -> extra fields), or None until loaded
+        self._maps: Optional[Maps] = None
+        self._version: Optional[int] = None
+        self._uncommitted = threading.local()
+
+    def __deepcopy__(self, memo):
+        # Serializer fields are deep-copied per instance; the cache must stay shared
+        return self
+
+    def ids(self) -> Dict[str, int]:
+        """Mapping of name -> id. Treat it as read-only."""
+        return self._load()[0]
+
+    def names(self) -> Dict[int, str]:
+        """Mapping of id -> name. Treat it as read-only."""
+        return self._load()[1]
+
+    def id_for(self, name: Optional[str]) -> Optional[int]:
+        return self.ids().get(name) if name is not None else None
+
+    def name_for(self, pk: Optional[int]) -> Optional[str]:
+        return self.names().get(pk) if pk is not None else None
+
+    def extras_for(self, pk: Optional[int]) -> Dict[str, Any]:
+        """Values of ``extra_fields`` for ``pk``, e.g. a sub category's ``category_id``."""
+        return self._load()[2].get(pk, {})
+
+    def instance_for(self, name: str) -> Optional[models.Model]:
+        """
+        An unsaved-looking instance carrying the pk, name and extra fields,
+        good enough to assign to a foreign key without a query.
+        """
+        pk = self.id_for(name)
+        if pk is None:
+            return None
+        return self.model(pk=pk, name=name, **self.extras_for(pk))
+
+    def invalidate(self) -> None:
+        """
+        Drop the local maps now and, once the surrounding transaction commits,
+        again plus in every other worker through the shared version key.
+        """
+        self._clear()
+        transaction.on_commit(self._publish)
+
+    def _clear(self) -> None:
+        with self._lock:
+            self._maps = None
+
+    def _publish(self) -> None:
+        self._clear()
+        self._uncommitted.maps = None
+        if _shared_version_enabled():
+            try:
+                cache.incr(self.version_key)
+            except ValueError:
+                cache.add(self.version_key, 1, timeout=None)
+
+    def _pending_publish(self):
+        """
+        The latest ``_publish`` still queued by this thread's open transaction,
+        if it has invalidated the maps; rolling back drops the entries queued
+        since the savepoint, so they no longer count.
+        """
+        if not connection.in_atomic_block:
+            return None
+        publish = self._publish
+        for entry in reversed(connection.run_on_commit):
+            if entry[1] == publish:
+                return entry
+        return None
+
+    def _load(self) -> Maps:
+        pending = self._pending_publish()
+        if pending is not None:
+            # Maps read after an earlier, since rolled back, invalidation are stale
+            loaded = getattr(self._uncommitted, "maps", None)
+            if loaded is None or loaded[0] is not pending:
+                loaded = self._uncommitted.maps = (pending, self._read())
+            return loaded[1]
+        self._uncommitted.maps = None
+
+        version = cache.get(self.version_key, 0) if _shared_version_enabled() else None
+        maps = self._maps
+        if maps is not None and version == self._version:
+            return maps
+
+        with self._lock:
+            if self._maps is None or version != self._version:
+                self._maps = self._read()
+                self._version = version
+            return self._maps
+
+    def _read(self) -> Maps:
+        rows = self.model.objects.values_list("id", "name", *self.extra_fields)
+        names: Dict[int, str] = {}
+        extras: Dict[int, Dict[str, Any]] = {}
+        for pk, name, *extra in rows:
+            names[pk] = name
+            if self.extra_fields:
+                extras[pk] = dict(zip(self.extra_fields, extra))
+        return {name: pk for pk, name in names.items()}, names, extras
+
+
+def _shared_version_enabled() -> bool:
+    return getattr(settings, "LOOKUP_CACHE_SHARED_VERSION", False)
+
+
+category_lookup = NameLookup(Category)
+sub_category_lookup = NameLookup(SubCategory, extra_fields=("category_id",))
+personal_account_lookup = NameLookup(PersonalAccount)
+
+LOOKUPS_BY_MODEL = {
+    Category: category_lookup,
+    SubCategory: sub_category_lookup,
+    PersonalAccount: personal_account_lookup,
+}
@@ -0,0 +1,497 @@
+import heapq
+import logging
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+from itertools import groupby
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import xlsxwriter
+from django.conf import settings
+from django.db import connection
+
+from transactions.services.account_summary_service import (
+    account_summary_frame,
+    get_account_summary_range_data,
+    get_account_summary_report,
+)
+from transactions.services.categorised_expense_report_service import (
+    categorised_expense_summary_data,
+    categorised_expense_summary_range_data,
+)
+from transactions.services.expense_summary_service import (
+    expense_summary_frame,
+    expense_summary_range_data,
+    expense_summary_report,
+)
+from transactions.services.transactions_report_service import (
+    TRANSACTION_REPORT_COLUMNS,
+    transaction_counts_by_month,
+    transaction_report_period_rows,
+    transaction_report_rows,
+)
+from utils.datetime_utils import MONTH_FORMAT, iter_months
+
+logger = logging.getLogger(__name__)
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+CURRENCY_COLUMNS = [
+    'Debit Amount', 'Credit Amount', 'Running Balance', 'Opening Balance', 'Debit', 'Credit', 'Total', 'Closing Balance',
+    'Expense Debit', 'Expense Credit', 'Expense Total',
+]
+
+# (columns, width) of the monthly report sheet, applied over the table column formats.
+MONTHLY_REPORT_COLUMN_WIDTHS = [("B:B", 100), ("E:H", 18), ("J:J", 20), ("K:K", 16), ("P:P", 18)]
+
+DATE_COLUMNS = ['Date']
+
+# Colours of the Excel table styles the report tables are drawn in: header
+# fill, fill of every other data row (None for unbanded) and cell borders.
+TABLE_STYLES = {
+    "Table Style Light 9": {"header": "#4472C4", "band": None, "border": "#8EA9DB"},
+    "Table Style Medium 16": {"header": "#4472C4", "band": "#D9E1F2", "border": "#8EA9DB"},
+}
+
+PERIOD_SUMMARY_COLUMNS = [
+    "Month", "Transactions", "Expense Debit", "Expense Credit", "Expense Total", "Opening Balance", "Closing Balance",
+]
+
+
+class SheetTable:
+    """
+    A block of rows under a formatted header row, at a fixed position on a sheet.
+
+    ``rows`` may be a one-pass iterator. Constant-memory mode cannot write
+    Excel tables, so the block is drawn in the colours of the table style
+    ``style`` names, and ``autofilter`` puts the sheet's filter drop-downs on
+    it; the filter is sized once the rows have been written.
+    """
+
+    def __init__(self, columns: Sequence[str], rows: Iterable[Sequence[Any]], startrow: int, startcol: int,
+                 autofilter: bool = False, style: str = "Table Style Medium 16"):
+        self.columns = list(columns)
+        self.rows = rows
+        self.startrow = startrow
+        self.startcol = startcol
+        self.autofilter = autofilter
+        self.style = style
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, startrow: int, startcol: int, **kwargs) -> "SheetTable":
+        return cls([str(column) for column in df.columns], df.itertuples(index=False), startrow, startcol, **kwargs)
+
+    def positioned_rows(self) -> Iterator[Tuple[int, int, Sequence[Any]]]:
+        """(row number, table index, values) for the header and then each data row."""
+        yield self.startrow, 0, self.columns
+        for offset, values in enumerate(self.rows, start=1):
+            yield self.startrow + offset, offset, values
+
+
+class MonthlyReportSections:
+    """
+    The four sections of the monthly report sheet.
+
+    ``transactions`` is a one-pass iterator of ``TRANSACTION_REPORT_COLUMNS``
+    rows; the summaries are small and held in memory.
+    """
+
+    def __init__(self, transactions: Iterable[Sequence[Any]], expense_summary: pd.DataFrame,
+                 expense_pivot: Dict[str, Any], account_summary: pd.DataFrame):
+        self.transactions = transactions
+        self.expense_summary = expense_summary
+        self.expense_pivot = expense_pivot
+        self.account_summary = account_summary
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.REPORT_SECTION_WORKERS, thread_name_prefix="report-section"
+            )
+        return _executor
+
+
+def _timed(report: str, section: str, fetch: Callable[[], Any]) -> Any:
+    started = time.perf_counter()
+    try:
+        return fetch()
+    finally:
+        logger.info("%s: %s took %.1f ms", report, section, (time.perf_counter() - started) * 1000)
+
+
+def _fetch_in_worker(report: str, section: str, fetch: Callable[[], Any], wrappers: List[Callable]) -> Any:
+    # Run the caller's execute wrappers here too, e.g. the request metrics
+    # recorder, unless they are installed on this connection already
+    installed = connection.execute_wrappers
+    connection.execute_wrappers = installed + [wrapper for wrapper in wrappers if wrapper not in installed]
+    try:
+        return _timed(report, section, fetch)
+    finally:
+        connection.execute_wrappers = installed
+        # Pool threads own their connection; don't leave it open between tasks
+        connection.close()
+
+
+def fetch_sections(report: str, fetchers: Dict[str, Callable[[], Any]]) -> Dict[str, Any]:
+    """
+    Run independent read-only section queries concurrently on a bounded
+    thread pool, each on its own database connection with the calling
+    thread's execute wrappers installed, and log how long each
+    one and the whole fetch took. With ``REPORT_SECTION_WORKERS`` at 1 or
+    less the sections run one after another on the calling thread.
+
+    The sections do not share a snapshot: each connection reads whatever is
+    committed when its query runs, so a write landing mid-fetch can show up
+    in one section and not in another. Where a report must match to the
+    row, set ``REPORT_SECTION_WORKERS`` to 1 and wrap the fetch in
+    ``transaction.atomic()``, which on PostgreSQL also needs the
+    REPEATABLE READ isolation level.
+    """
+    started = time.perf_counter()
+    if settings.REPORT_SECTION_WORKERS <= 1:
+        results = {section: _timed(report, section, fetch) for section, fetch in fetchers.items()}
+    else:
+        wrappers = list(connection.execute_wrappers)
+        futures = {
+            section: _get_executor().submit(_fetch_in_worker, report, section, fetch, wrappers)
+            for section, fetch in fetchers.items()
+        }
+        results = {section: future.result() for section, future in futures.items()}
+    logger.info("%s: fetched %d sections in %.1f ms", report, len(fetchers), (time.perf_counter() - started) * 1000)
+    return results
+
+
+def fetch_monthly_report_sections(month: int, year: int) -> MonthlyReportSections:
+    """
+    Fetch the sections of one month's report concurrently; the transactions
+    themselves are only read while the sheet is written.
+    """
+    sections = fetch_sections(f"Monthly report {year}-{month:02d}", {
+        "expense_summary": lambda: expense_summary_report(month, year),
+        "expense_pivot": lambda: categorised_expense_summary_data(month=month, year=year),
+        "account_summary": lambda: get_account_summary_report(month=month, year=year),
+    })
+    return MonthlyReportSections(transactions=transaction_report_rows(month, year), **sections)
+
+
+def expense_pivot_frame(expense_pivot: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Flatten ``categorised_expense_summary_data`` into category rows, each
+    followed by its indented sub category rows, and a Grand Total row.
+    """
+    expense_pivot_data = []
+    for category, data in expense_pivot["data"].items():
+        expense_pivot_data.append(
+            {"Category": category, "Credit": data["credit"], "Debit": data["debit"]}
+        )
+        for sub_category in data["sub_categories"]:
+            expense_pivot_data.append(
+                {"Category": f"  {sub_category['sub_category']}", "Credit": sub_category["credit"], "Debit": sub_category["debit"]}
+            )
+    expense_pivot_data.append(
+        {"Category": "Grand Total", "Credit": expense_pivot["grand_total"]["credit"], "Debit": expense_pivot["grand_total"]["debit"]}
+    )
+    return pd.DataFrame(expense_pivot_data, columns=["Category", "Credit", "Debit"])
+
+
+class ReportWorkbook:
+    """
+    An xlsx report written in xlsxwriter's constant-memory mode.
+
+    Every row is flushed to disk as soon as the next one starts, so sheets
+    must be written top to bottom; ``add_sheet`` merges the rows of all
+    tables on a sheet in row order. The workbook goes to a spooled temporary
+    file that stays in memory up to ``REPORT_SPOOL_MAX_SIZE`` bytes, so
+    concurrent requests never share a file.
+    """
+
+    def __init__(self):
+        self.output = tempfile.SpooledTemporaryFile(max_size=settings.REPORT_SPOOL_MAX_SIZE, suffix=".xlsx")
+        self.workbook = xlsxwriter.Workbook(self.output, {
+            "constant_memory": True,
+            "default_date_format": "dd-mm-yyyy",
+        })
+        self.currency_format = self.workbook.add_format({"num_format": '₹ #,##0.00', "align": "right"})
+        # Right-aligned format for the Date column
+        self.date_format = self.workbook.add_format({
+            "align": "right",
+            "num_format": "dd-mm-yyyy",
+            "border": 1,
+        })
+        self._header_formats: Dict[str, Any] = {}
+        self._cell_formats: Dict[Tuple[str, bool, str], Any] = {}
+
+    def header_format(self, style: str):
+        if style not in self._header_formats:
+            colours = TABLE_STYLES[style]
+            self._header_formats[style] = self.workbook.add_format({
+                "bold": True,
+                "align": "left",
+                "text_wrap": True,
+                "valign": "middle",
+                "fg_color": colours["header"],
+                "border": 1,
+                "border_color": colours["border"],
+                "font_color": "#FFFFFF",
+            })
+        return self._header_formats[style]
+
+    def cell_format(self, style: str, banded: bool, column: str):
+        """
+        The format of a data cell in ``column``: the table style's borders and
+        band fill, and the column's number format, since a cell format
+        replaces the column's.
+        """
+        kind = "currency" if column in CURRENCY_COLUMNS else "date" if column in DATE_COLUMNS else "text"
+        key = (style, banded, kind)
+        if key not in self._cell_formats:
+            colours = TABLE_STYLES[style]
+            properties = {"border": 1, "border_color": colours["border"]}
+            if banded and colours["band"]:
+                properties["bg_color"] = colours["band"]
+            if kind == "currency":
+                properties.update(num_format='₹ #,##0.00', align="right")
+            elif kind == "date":
+                properties.update(num_format="dd-mm-yyyy", align="right")
+            self._cell_formats[key] = self.workbook.add_format(properties)
+        return self._cell_formats[key]
+
+    def add_sheet(self, name: str, tables: List[SheetTable]):
+        """
+        Write ``tables`` to a new sheet, streaming their rows in row order.
+        """
+        worksheet = self.workbook.add_worksheet(name)
+
+        # Column formats are kept apart from the row data, so they can be set first
+        for table in tables:
+            for col_index, col_name in enumerate(table.columns):
+                if col_name in CURRENCY_COLUMNS:
+                    worksheet.set_column(table.startcol + col_index, table.startcol + col_index, 18, self.currency_format)
+
+        def positioned(position: int, table: SheetTable):
+            for row_number, offset, values in table.positioned_rows():
+                yield row_number, position, offset, values
+
+        # Formats of each table's data cells, by column, for odd and even rows
+        row_formats = [
+            [[self.cell_format(table.style, banded, column) for column in table.columns] for banded in (False, True)]
+            for table in tables
+        ]
+        last_rows = [table.startrow for table in tables]
+        streams = [positioned(position, table) for position, table in enumerate(tables)]
+        for row_number, position, offset, values in heapq.merge(*streams, key=lambda item: (item[0], item[1])):
+            table = tables[position]
+            if offset == 0:
+                worksheet.write_row(row_number, table.startcol, table.columns, self.header_format(table.style))
+            else:
+                # Like an Excel table, the first data row is banded
+                formats = row_formats[position][offset % 2]
+                self._write_values(worksheet, row_number, table.startcol, values, formats)
+            last_rows[position] = row_number
+
+        # The filter range is only stored until the workbook closes, so it can
+        # be set after the rows, sized to what was actually written
+        for table, last_row in zip(tables, last_rows):
+            if table.autofilter:
+                worksheet.autofilter(table.startrow, table.startcol, last_row, table.startcol + len(table.columns) - 1)
+        return worksheet
+
+    @staticmethod
+    def _write_values(worksheet, row_number: int, startcol: int, values: Sequence[Any], formats: Sequence[Any]) -> None:
+        for col_offset, (value, cell_format) in enumerate(zip(values, formats)):
+            if value is None or value == '' or (isinstance(value, float) and pd.isna(value)):
+                # Empty cells still carry the table's borders and band
+                worksheet.write_blank(row_number, startcol + col_offset, None, cell_format)
+                continue
+            if hasattr(value, "item"):  # numpy scalars from DataFrame rows
+                value = value.item()
+            worksheet.write(row_number, startcol + col_offset, value, cell_format)
+
+    def close(self):
+        """
+        Finish the workbook and return the file, rewound for reading.
+        """
+        self.workbook.close()
+        self.output.seek(0)
+        return self.output
+
+
+def monthly_report_tables(sections: MonthlyReportSections) -> List[SheetTable]:
+    """
+    Lay out the monthly report: transactions in A-I, the expense summary in
+    K-N with the expense pivot below it, and the account summary in P-T.
+    """
+    expense_pivot_df = expense_pivot_frame(sections.expense_pivot)
+    expense_pivot_start_row = len(sections.expense_summary) + 4 + 5  # Add padding of 5 rows
+    return [
+        SheetTable(TRANSACTION_REPORT_COLUMNS, sections.transactions, startrow=0, startcol=0, autofilter=True,
+                   style="Table Style Light 9"),
+        SheetTable.from_frame(sections.expense_summary, startrow=4, startcol=10),
+        SheetTable.from_frame(expense_pivot_df, startrow=expense_pivot_start_row, startcol=10),
+        SheetTable.from_frame(sections.account_summary, startrow=4, startcol=15),
+    ]
+
+
+def add_monthly_report_sheet(book: ReportWorkbook, name: str, sections: MonthlyReportSections):
+    worksheet = book.add_sheet(name, monthly_report_tables(sections))
+    worksheet.set_zoom(117)
+    worksheet.set_column("A:A", 12, book.date_format)
+    for columns, width in MONTHLY_REPORT_COLUMN_WIDTHS:
+        worksheet.set_column(columns, width)
+    return worksheet
+
+
+def build_monthly_report_workbook(month: int, year: int):
+    """
+    Build the complete monthly report and return it as a rewound file object.
+    """
+    book = ReportWorkbook()
+    sections = fetch_monthly_report_sections(month, year)
+    _timed(f"Monthly report {year}-{month:02d}", "transactions and workbook",
+           lambda: add_monthly_report_sheet(book, "Report", sections))
+    return book.close()
+
+
+class MonthPartitions:
+    """
+    Splits one date-ordered stream of ``TRANSACTION_REPORT_COLUMNS`` rows
+    into per-month iterators, handed out in month order as the sheets are
+    written. Each month's rows must be consumed before asking for the next.
+    """
+
+    def __init__(self, rows: Iterable[Sequence[Any]]):
+        self._groups = groupby(rows, key=lambda row: (row[0].year, row[0].month))
+        self._current = None
+        self._advance = True
+
+    def rows(self, year: int, month: int) -> Iterator[Sequence[Any]]:
+        if self._advance:
+            self._current = next(self._groups, None)
+            self._advance = False
+        while self._current is not None and self._current[0] < (year, month):
+            self._current = next(self._groups, None)
+        if self._current is None or self._current[0] != (year, month):
+            return iter(())
+        self._advance = True
+        return self._current[1]
+
+
+class PeriodReportSections:
+    """
+    The sections of every month from ``start`` to ``end``, each summary
+    keyed by (year, month); ``transactions`` streams the whole period.
+    """
+
+    def __init__(self, start: date, end: date, transactions: Iterable[Sequence[Any]],
+                 transaction_counts: Dict[Tuple[int, int], int],
+                 expense_summaries: Dict[Tuple[int, int], List[Dict[str, Any]]],
+                 expense_pivots: Dict[Tuple[int, int], Dict[str, Any]],
+                 account_summaries: List[Dict[str, Any]]):
+        self.months = list(iter_months(start, end))
+        self.transactions = MonthPartitions(transactions)
+        self.transaction_counts = transaction_counts
+        self.expense_summaries = expense_summaries
+        self.expense_pivots = expense_pivots
+        self.account_summaries = {
+            (month.year, month.month): period["accounts"] for month, period in zip(self.months, account_summaries)
+        }
+
+    def month_sections(self, month: date) -> MonthlyReportSections:
+        key = (month.year, month.month)
+        return MonthlyReportSections(
+            transactions=self.transactions.rows(*key),
+            expense_summary=expense_summary_frame(self.expense_summaries[key]),
+            expense_pivot=self.expense_pivots[key],
+            account_summary=account_summary_frame(self.account_summaries[key]),
+        )
+
+
+def fetch_period_report_sections(start: date, end: date) -> PeriodReportSections:
+    """
+    Fetch every month's sections with one grouped query per section, run
+    concurrently, instead of one set of queries per month. The transactions
+    are read in a single pass while the month sheets are written.
+    """
+    start, end = start.replace(day=1), end.replace(day=1)
+    sections = fetch_sections(f"Period report {start:{MONTH_FORMAT}}..{end:{MONTH_FORMAT}}", {
+        "transaction_counts": lambda: transaction_counts_by_month(start, end),
+        "expense_summaries": lambda: expense_summary_range_data(start, end),
+        "expense_pivots": lambda: categorised_expense_summary_range_data(start, end),
+        "account_summaries": lambda: get_account_summary_range_data(start, end),
+    })
+    return PeriodReportSections(start, end, transactions=transaction_report_period_rows(start, end), **sections)
+
+
+def period_summary_tables(sections: PeriodReportSections) -> List[SheetTable]:
+    """
+    Lay out the summary sheet: one row per month in A-G, and each account's
+    opening balance, movements and closing balance over the whole period in
+    I-M.
+    """
+    monthly_rows = []
+    account_totals: Dict[str, Dict[str, Any]] = {}
+    for month in sections.months:
+        key = (month.year, month.month)
+        expenses = sections.expense_summaries[key]
+        accounts = sections.account_summaries[key]
+        expense_debit = sum(row["debit"] for row in expenses)
+        expense_credit = sum(row["credit"] for row in expenses)
+        monthly_rows.append([
+            month.strftime(MONTH_FORMAT),
+            sections.transaction_counts.get(key, 0),
+            expense_debit,
+            expense_credit,
+            expense_debit - expense_credit,
+            sum(row["opening_balance"] for row in accounts),
+            sum(row["closing_balance"] for row in accounts),
+        ])
+
+        # An account missing from a month had a zero balance and no movement in it
+        for name in account_totals:
+            account_totals[name]["closing_balance"] = Decimal("0.00")
+        for row in accounts:
+            totals = account_totals.setdefault(row["account_name"], {
+                "account_name": row["account_name"],
+                "opening_balance": row["opening_balance"] if month == sections.months[0] else Decimal("0.00"),
+                "debit": Decimal("0.00"),
+                "credit": Decimal("0.00"),
+            })
+            totals["debit"] += row["debit"]
+            totals["credit"] += row["credit"]
+            totals["closing_balance"] = row["closing_balance"]
+
+    account_df = account_summary_frame(sorted(account_totals.values(), key=lambda row: row["account_name"] or ""))
+    return [
+        SheetTable(PERIOD_SUMMARY_COLUMNS, monthly_rows, startrow=0, startcol=0, autofilter=True),
+        SheetTable.from_frame(account_df, startrow=0, startcol=len(PERIOD_SUMMARY_COLUMNS) + 1),
+    ]
+
+
+def build_period_report_workbook(start: date, end: date):
+    """
+    Build one workbook for every month from ``start`` to ``end``: a summary
+    sheet followed by a sheet per month in the monthly report's layout.
+    Return it as a rewound file object.
+    """
+    book = ReportWorkbook()
+    sections = fetch_period_report_sections(start, end)
+
+    worksheet = book.add_sheet("Summary", period_summary_tables(sections))
+    worksheet.set_column("A:B", 14)
+    worksheet.set_column("I:I", 20)
+
+    for month in sections.months:
+        _timed(f"Period report {month:{MONTH_FORMAT}}", "transactions and workbook",
+               lambda: add_monthly_report_sheet(book, month.strftime("%b %Y"), sections.month_sections(month)))
+    return book.close()
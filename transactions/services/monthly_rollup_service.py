@@ -0,0 +1,163 @@
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from transactions.models import MonthlyRollup, Transaction
+from utils.db_utils import month_filter
+
+# Fields of a transaction that decide which rollup row it counts towards, plus its amounts.
+ROLLUP_SOURCE_FIELDS = (
+    "date", "personal_account_id", "nominal_account", "category_id", "sub_category_id",
+    "debit_amount", "credit_amount",
+)
+
+# (year, month, personal_account_id, nominal_account, category_id, sub_category_id)
+RollupKey = Tuple[int, int, int, str, Optional[int], Optional[int]]
+Month = Tuple[int, int]
+
+
+def rollup_key(values: Dict) -> RollupKey:
+    """
+    Rollup row of a transaction, given its ``ROLLUP_SOURCE_FIELDS`` values.
+    """
+    day = Transaction._meta.get_field("date").to_python(values["date"])
+    return (day.year, day.month, values["personal_account_id"], values["nominal_account"],
+            values["category_id"], values["sub_category_id"])
+
+
+def rollup_values(transaction: Transaction) -> Dict:
+    """
+    ``ROLLUP_SOURCE_FIELDS`` values of an in-memory transaction.
+    """
+    return {field: getattr(transaction, field) for field in ROLLUP_SOURCE_FIELDS}
+
+
+def _key_filter(key: RollupKey) -> Dict:
+    year, month, account_id, nominal, category_id, sub_category_id = key
+    return {
+        "year": year,
+        "month": month,
+        "personal_account_id": account_id,
+        "nominal_account": nominal,
+        "category_id": category_id,
+        "sub_category_id": sub_category_id,
+    }
+
+
+def apply_rollup_delta(values: Dict, sign: int = 1) -> None:
+    """
+    Add (``sign=1``) or remove (``sign=-1``) one transaction's amounts to or
+    from its rollup row.
+
+    A row that drops to zero transactions is deleted. Removing from a row that
+    does not exist is a no-op, which covers transactions deleted by a cascade
+    that has already removed their rollup rows. When a concurrent writer
+    creates the row first, the unique rollup key rejects the second insert
+    and the amounts are added to the winner's row instead.
+    """
+    debit = Decimal(str(values["debit_amount"] or 0)) * sign
+    credit = Decimal(str(values["credit_amount"] or 0)) * sign
+    key = _key_filter(rollup_key(values))
+    rows = MonthlyRollup.objects.filter(**key)
+    delta = {
+        "debit_total": F("debit_total") + debit,
+        "credit_total": F("credit_total") + credit,
+        "transaction_count": F("transaction_count") + sign,
+    }
+
+    updated = rows.update(**delta)
+    if not updated and sign > 0:
+        try:
+            with transaction.atomic():
+                MonthlyRollup.objects.create(**key, debit_total=debit, credit_total=credit, transaction_count=1)
+        except IntegrityError:
+            rows.update(**delta)
+    elif sign < 0:
+        rows.filter(transaction_count__lte=0).delete()
+
+
+def apply_rollup_update(old_values: Dict, new_values: Dict) -> None:
+    """
+    Move an edited transaction's contribution from its old rollup row to its new one.
+    """
+    if old_values == new_values:
+        return
+    apply_rollup_delta(old_values, sign=-1)
+    apply_rollup_delta(new_values, sign=1)
+
+
+def rollup_period_filter(start: date, end: date) -> Q:
+    """
+    Rollup rows from the month of ``start`` to the month of ``end``, both included.
+    """
+    after_start = Q(year__gt=start.year) | Q(year=start.year, month__gte=start.month)
+    before_end = Q(year__lt=end.year) | Q(year=end.year, month__lte=end.month)
+    return after_start & before_end
+
+
+def months_touched(transactions: Iterable[Transaction]) -> Set[Month]:
+    """
+    (year, month) pairs of a batch of transactions.
+    """
+    date_field = Transaction._meta.get_field("date")
+    months = set()
+    for row in transactions:
+        day = date_field.to_python(row.date)
+        months.add((day.year, day.month))
+    return months
+
+
+def refresh_rollups(months: Optional[Iterable[Month]] = None) -> int:
+    """
+    Recompute the rollup rows of the given months from the transactions table.
+
+    Used after bulk writes, which send no signals: the months are rebuilt with
+    one grouped query instead of one delta per row.
+
+    Args:
+        months (Iterable[Month], optional): (year, month) pairs to rebuild.
+            ``None`` rebuilds every month.
+
+    Returns:
+        int: Number of rollup rows written.
+    """
+    rollups = MonthlyRollup.objects.all()
+    transactions = Transaction.objects.all()
+    if months is not None:
+        months = set(months)
+        if not months:
+            return 0
+        period, rollup_period = Q(), Q()
+        for year, month in months:
+            period |= month_filter(year, month)
+            rollup_period |= Q(year=year, month=month)
+        transactions = transactions.filter(period)
+        rollups = rollups.filter(rollup_period)
+
+    grouped = (
+        transactions.annotate(year=ExtractYear("date"), month=ExtractMonth("date"))
+        .values("year", "month", "personal_account_id", "nominal_account", "category_id", "sub_category_id")
+        .annotate(
+            debit_total=Sum("debit_amount", default=0),
+            credit_total=Sum("credit_amount", default=0),
+            transaction_count=Count("id"),
+        )
+        .order_by()
+    )
+
+    rollups.delete()
+    created = MonthlyRollup.objects.bulk_create(
+        [MonthlyRollup(**row) for row in grouped.iterator()], batch_size=1000
+    )
+    return len(created)
+
+
+def rebuild_rollups() -> int:
+    """
+    Rebuild the whole rollup table from the transactions table.
+    """
+    return refresh_rollups()
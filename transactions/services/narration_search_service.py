@@ -0,0 +1,191 @@
+import re
+from typing import List, Optional, Tuple
+
+from django.db import connections, router
+from django.db.models import BooleanField, F, FloatField, Func, Lookup, Q, QuerySet, TextField, Value
+
+from transactions.models import NarrationSearchEntry, Transaction
+
+# A search term: its tokens, matched as a phrase, and whether the last one is a prefix.
+SearchTerm = Tuple[List[str], bool]
+
+FTS_TABLE = NarrationSearchEntry._meta.db_table
+TSVECTOR_INDEX = "txn_narration_tsv_idx"
+
+_TERM_PATTERN = re.compile(r'"([^"]*)"(\*?)|(\S+)')
+
+_SQLITE_INDEX_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        narration, content='transactions_transaction', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON transactions_transaction BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, narration) VALUES (new.id, new.narration);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON transactions_transaction BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, narration) VALUES ('delete', old.id, old.narration);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF narration ON transactions_transaction BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, narration) VALUES ('delete', old.id, old.narration);
+        INSERT INTO {FTS_TABLE}(rowid, narration) VALUES (new.id, new.narration);
+    END""",
+]
+
+_POSTGRES_INDEX_SQL = [
+    f"""CREATE INDEX IF NOT EXISTS {TSVECTOR_INDEX} ON transactions_transaction
+        USING GIN (to_tsvector('simple'::regconfig, narration))""",
+]
+
+
+class Fts5Match(Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+NarrationSearchEntry._meta.get_field("narration").register_lookup(Fts5Match)
+
+
+class NarrationVector(Func):
+    # Must stay identical to the indexed expression for the GIN index to apply
+    template = "to_tsvector('simple'::regconfig, %(expressions)s)"
+    output_field = TextField()
+
+
+class NarrationQuery(Func):
+    template = "to_tsquery('simple'::regconfig, %(expressions)s)"
+    output_field = TextField()
+
+
+class TsMatch(Func):
+    arg_joiner = " @@ "
+    template = "(%(expressions)s)"
+    output_field = BooleanField()
+
+
+class TsRank(Func):
+    function = "ts_rank"
+    output_field = FloatField()
+
+
+def parse_search_query(text: str) -> List[SearchTerm]:
+    """
+    Split a search box query into terms that must all match: bare words,
+    ``"quoted phrases"``, and either with a trailing ``*`` for a prefix
+    match, e.g. ``swig* "salary credit"``.
+    """
+    terms = []
+    for phrase, phrase_prefix, word in _TERM_PATTERN.findall(text or ""):
+        tokens = [token.lower() for token in re.findall(r"\w+", phrase if phrase else word)]
+        if tokens:
+            terms.append((tokens, bool(phrase_prefix) if phrase else word.endswith("*")))
+    return terms
+
+
+def fts5_query(terms: List[SearchTerm]) -> str:
+    # Tokens are plain word characters, so quoting them needs no escaping
+    return " ".join(f'"{" ".join(tokens)}"' + ("*" if prefix else "") for tokens, prefix in terms)
+
+
+def tsquery(terms: List[SearchTerm]) -> str:
+    return " & ".join(
+        "(" + " <-> ".join(tokens[:-1] + [tokens[-1] + (":*" if prefix else "")]) + ")"
+        for tokens, prefix in terms
+    )
+
+
+def _vendor() -> str:
+    return connections[router.db_for_read(Transaction)].vendor
+
+
+def narration_match(text: str) -> Q:
+    """
+    Transactions whose narration matches ``text`` (see ``parse_search_query``),
+    answered from the narration index. Combines with other conditions,
+    including with ``|``.
+    """
+    terms = parse_search_query(text)
+    if not terms:
+        return Q(pk__in=[])
+
+    vendor = _vendor()
+    if vendor == "sqlite":
+        return Q(pk__in=NarrationSearchEntry.objects.filter(narration__match=fts5_query(terms)).values("transaction_id"))
+    if vendor == "postgresql":
+        return Q(TsMatch(NarrationVector(F("narration")), NarrationQuery(Value(tsquery(terms)))))
+
+    # No index on other backends; every token must appear somewhere
+    condition = Q()
+    for tokens, _ in terms:
+        for token in tokens:
+            condition &= Q(narration__icontains=token)
+    return condition
+
+
+def search_transactions(text: str, queryset: Optional[QuerySet] = None) -> QuerySet:
+    """
+    Transactions of ``queryset`` (all by default) whose narration matches
+    ``text``, annotated with ``relevance`` (higher is better) and ordered by
+    it, then by (date, id).
+    """
+    queryset = Transaction.objects.all() if queryset is None else queryset
+    terms = parse_search_query(text)
+    if not terms:
+        return queryset.none()
+
+    vendor = _vendor()
+    if vendor == "sqlite":
+        # Joining the index lets FTS5 drive the query and score each match
+        queryset = queryset.filter(narration_search__narration__match=fts5_query(terms)).annotate(
+            relevance=-F("narration_search__rank")
+        )
+    elif vendor == "postgresql":
+        query = NarrationQuery(Value(tsquery(terms)))
+        vector = NarrationVector(F("narration"))
+        queryset = queryset.filter(TsMatch(vector, query)).annotate(relevance=TsRank(vector, query))
+    else:
+        queryset = queryset.filter(narration_match(text)).annotate(relevance=Value(0.0, output_field=FloatField()))
+    return queryset.order_by("-relevance", "date", "id")
+
+
+def ensure_narration_search_index(using: str = "default") -> bool:
+    """
+    Create the narration index for database ``using`` if it is missing, and
+    fill it from the existing transactions. Returns whether it was created.
+
+    SQLite gets an external-content FTS5 table kept in sync by triggers on
+    the transactions table, so saves, bulk uploads and deletes all update it;
+    PostgreSQL gets a GIN index on the narration's tsvector, which the
+    database maintains itself.
+    """
+    connection = connections[using]
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            created = FTS_TABLE not in connection.introspection.table_names(cursor)
+            for sql in _SQLITE_INDEX_SQL:
+                cursor.execute(sql)
+            if created:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        return created
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = %s", [TSVECTOR_INDEX])
+            created = cursor.fetchone() is None
+            for sql in _POSTGRES_INDEX_SQL:
+                cursor.execute(sql)
+        return created
+    return False
+
+
+def rebuild_narration_search_index(using: str = "default") -> None:
+    """Rebuild the narration index from the transactions table."""
+    connection = connections[using]
+    ensure_narration_search_index(using)
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        elif connection.vendor == "postgresql":
+            cursor.execute(f"REINDEX INDEX {TSVECTOR_INDEX}")
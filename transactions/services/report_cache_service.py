@@ -0,0 +1,177 @@
+import functools
+import inspect
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from django.core.cache import caches
+from django.db import transaction
+
+from utils.datetime_utils import MONTH_FORMAT
+
+# Cache alias holding report results, see CACHES in settings.
+REPORT_CACHE_ALIAS = "reports"
+
+Period = Tuple[date, date]
+
+# Report name -> whether its figures depend on every month before the period.
+REGISTERED_REPORTS: Dict[str, bool] = {}
+
+
+def _cache():
+    return caches[REPORT_CACHE_ALIAS]
+
+
+def _index_key(report: str) -> str:
+    return f"report-cache:{report}:index"
+
+
+def _entry_key(report: str, period: Period) -> str:
+    start, end = period
+    return f"report-cache:{report}:{start:{MONTH_FORMAT}}:{end:{MONTH_FORMAT}}"
+
+
+def _generation_key(report: str) -> str:
+    return f"report-cache:{report}:generation"
+
+
+def _stat_key(report: str, outcome: str) -> str:
+    return f"report-cache:{report}:{outcome}"
+
+
+def _incr(key: str) -> None:
+    cache = _cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def month_period(year: int, month: int) -> Period:
+    """The period of a single-month report."""
+    first_day = date(int(year), int(month), 1)
+    return first_day, first_day
+
+
+def cached_report(report: str, period: Callable[..., Period], balance_dependent: bool = False):
+    """
+    Cache a report function's result per period.
+
+    ``period`` receives the report function's arguments by name and returns
+    the (first month, last month) the result covers. Results are dropped by
+    ``invalidate_report_months`` when a month inside the period is written
+    to, or, for ``balance_dependent`` reports whose opening balances carry
+    every earlier month, when any month up to the period's end is.
+    """
+    REGISTERED_REPORTS[report] = balance_dependent
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            start, end = period(**bound.arguments)
+            key = _entry_key(report, (start.replace(day=1), end.replace(day=1)))
+
+            # An entry only counts while the index lists it: invalidation
+            # works through the index, so one missing from it may be stale
+            cache = _cache()
+            found = cache.get_many([key, _index_key(report), _generation_key(report)])
+            if key in found and key in found.get(_index_key(report), {}):
+                _incr(_stat_key(report, "hits"))
+                return found[key]
+
+            _incr(_stat_key(report, "misses"))
+            result = func(*args, **kwargs)
+            # Skip caching when an invalidation ran while the report was being
+            # built; the result may already miss the write that caused it
+            if cache.get(_generation_key(report)) == found.get(_generation_key(report)):
+                cache.set(key, result)
+                _remember(report, key, (start.replace(day=1), end.replace(day=1)))
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def _remember(report: str, key: str, period: Period) -> None:
+    # Read-modify-write of a small per-report index of cached periods; an
+    # update lost to another worker only turns that entry into a miss
+    cache = _cache()
+    index: Dict[str, Period] = cache.get(_index_key(report)) or {}
+    index[key] = period
+    cache.set(_index_key(report), index, timeout=None)
+
+
+def _drop(report: str, should_drop: Callable[[Period], bool]) -> int:
+    cache = _cache()
+    _incr(_generation_key(report))
+    index: Dict[str, Period] = cache.get(_index_key(report)) or {}
+    stale = [key for key, period in index.items() if should_drop(period)]
+    if stale:
+        cache.delete_many(stale)
+        cache.set(_index_key(report), {key: period for key, period in index.items() if key not in stale}, timeout=None)
+    return len(stale)
+
+
+def _invalidate_now(months: Iterable[date]) -> int:
+    months = {month.replace(day=1) for month in months}
+    if not months:
+        return 0
+    earliest = min(months)
+
+    dropped = 0
+    for report, balance_dependent in REGISTERED_REPORTS.items():
+        if balance_dependent:
+            dropped += _drop(report, lambda period: earliest <= period[1])
+        else:
+            dropped += _drop(report, lambda period: any(period[0] <= month <= period[1] for month in months))
+    return dropped
+
+
+def invalidate_report_months(months: Iterable[date]) -> None:
+    """
+    Drop cached reports affected by writes to ``months`` (any day of each
+    month), once the surrounding transaction commits.
+
+    Reports covering one of the months are dropped; balance-dependent reports
+    are also dropped for every later period.
+    """
+    months = list(months)
+    if months:
+        transaction.on_commit(lambda: _invalidate_now(months))
+
+
+def invalidate_all_reports() -> None:
+    """
+    Drop every cached report once the surrounding transaction commits, e.g.
+    after an account or category rename changes names shown in all of them.
+    """
+    def drop_all():
+        for report in REGISTERED_REPORTS:
+            _drop(report, lambda period: True)
+
+    transaction.on_commit(drop_all)
+
+
+def report_cache_stats(report: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Hit and miss counters per report, since the cache was last cleared.
+    """
+    reports = [report] if report else sorted(REGISTERED_REPORTS)
+    cache = _cache()
+    stats = {}
+    for name in reports:
+        hits = cache.get(_stat_key(name, "hits"), 0)
+        misses = cache.get(_stat_key(name, "misses"), 0)
+        stats[name] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+            "cached_periods": len(cache.get(_index_key(name)) or {}),
+            "balance_dependent": REGISTERED_REPORTS.get(name, False),
+        }
+    return stats
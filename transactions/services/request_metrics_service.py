@@ -0,0 +1,247 @@
+import heapq
+import logging
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Histogram bucket upper bounds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500, 1000)
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 ** 2, 10 * 1024 ** 2, 100 * 1024 ** 2)
+MEMORY_BUCKETS = (1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2, 256 * 1024 ** 2, 1024 ** 3)
+
+# Characters of a statement kept for the slow-request log.
+SLOW_SQL_MAX_LENGTH = 500
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """A Prometheus histogram; the bucket counts are made cumulative when rendered."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricFamily:
+    """One named metric and its value per label set."""
+
+    def __init__(self, name: str, kind: str, help_text: str, buckets: Optional[Sequence[float]] = None):
+        self.name = name
+        self.kind = kind
+        self.help_text = help_text
+        self.buckets = buckets
+        self.samples: Dict[Labels, object] = {}
+
+    def observe(self, labels: Labels, value: float) -> None:
+        if self.kind == "histogram":
+            histogram = self.samples.get(labels)
+            if histogram is None:
+                histogram = self.samples[labels] = Histogram(self.buckets)
+            histogram.observe(value)
+        else:
+            self.samples[labels] = self.samples.get(labels, 0) + value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for labels, sample in sorted(self.samples.items()):
+            if self.kind != "histogram":
+                yield f"{self.name}{_label_text(labels)} {_number(sample)}"
+                continue
+            cumulative = 0
+            for bound, count in zip([*self.buckets, "+Inf"], sample.counts):
+                cumulative += count
+                yield f"{self.name}_bucket{_label_text(labels + (('le', _number(bound)),))} {cumulative}"
+            yield f"{self.name}_sum{_label_text(labels)} {_number(sample.sum)}"
+            yield f"{self.name}_count{_label_text(labels)} {sample.count}"
+
+
+def _label_text(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value) -> str:
+    if isinstance(value, str):
+        return value
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class RequestMetrics:
+    """
+    The per-view request metrics of this process, rendered in the Prometheus
+    text format. Each worker process keeps its own; scrape every worker, or
+    aggregate them, when running several.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = MetricFamily(
+                "pepperpie_requests_total", "counter", "Requests served, per view and status code.")
+            self.latency = MetricFamily(
+                "pepperpie_request_duration_seconds", "histogram",
+                "Request latency including streaming the body, per view.", LATENCY_BUCKETS)
+            self.queries = MetricFamily(
+                "pepperpie_request_sql_queries", "histogram",
+                "SQL statements run on the request's connection, per request and view.", QUERY_COUNT_BUCKETS)
+            self.sql_seconds = MetricFamily(
+                "pepperpie_sql_duration_seconds_total", "counter", "Time spent in SQL statements, per view.")
+            self.response_size = MetricFamily(
+                "pepperpie_response_size_bytes", "histogram", "Response body size, per view.", SIZE_BUCKETS)
+            self.peak_memory = MetricFamily(
+                "pepperpie_request_peak_memory_bytes", "histogram",
+                "Peak Python memory allocated while serving the request (tracemalloc), per view.", MEMORY_BUCKETS)
+
+    @property
+    def families(self) -> List[MetricFamily]:
+        return [self.requests, self.latency, self.queries, self.sql_seconds, self.response_size, self.peak_memory]
+
+    def record(self, view: str, method: str, status: int, seconds: float, queries: int, sql_seconds: float,
+               size: int, peak_memory: Optional[int] = None) -> None:
+        labels = (("view", view),)
+        with self._lock:
+            self.requests.observe(labels + (("method", method), ("status", str(status))), 1)
+            self.latency.observe(labels, seconds)
+            self.queries.observe(labels, queries)
+            self.sql_seconds.observe(labels, sql_seconds)
+            self.response_size.observe(labels, size)
+            if peak_memory is not None:
+                self.peak_memory.observe(labels, peak_memory)
+
+    def render(self) -> str:
+        with self._lock:
+            return "\n".join(line for family in self.families for line in family.render()) + "\n"
+
+
+request_metrics = RequestMetrics()
+
+
+class RequestRecorder:
+    """
+    Measures one request: an execute wrapper on the request thread's
+    connection counts and times its SQL statements and keeps the slowest
+    few for the slow-request log. ``start()`` installs it and ``finish()``,
+    called once the body has been produced, removes it and records the
+    request in ``request_metrics``. The report section workers install the
+    request's wrappers on their own connections too, so the recorder may be
+    called from several threads at once.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self._top_queries = settings.SLOW_REQUEST_TOP_QUERIES
+        self._slowest: List[Tuple[float, int, str]] = []
+        self._started = 0.0
+        self._memory_baseline: Optional[int] = None
+        self._finished = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.queries += 1
+                self.sql_seconds += elapsed
+                if self._top_queries > 0:
+                    entry = (elapsed, self.queries, sql)
+                    if len(self._slowest) < self._top_queries:
+                        heapq.heappush(self._slowest, entry)
+                    elif elapsed > self._slowest[0][0]:
+                        heapq.heapreplace(self._slowest, entry)
+
+    def start(self) -> None:
+        if tracemalloc.is_tracing():
+            # The peak is process wide, so concurrent requests inflate each other's
+            tracemalloc.reset_peak()
+            self._memory_baseline = tracemalloc.get_traced_memory()[0]
+        connection.execute_wrappers.append(self)
+        self._started = time.perf_counter()
+
+    def abandon(self) -> None:
+        """Remove the wrapper without recording, e.g. when the view raised."""
+        self._finished = True
+        if self in connection.execute_wrappers:
+            connection.execute_wrappers.remove(self)
+
+    def finish(self, response, size: int) -> None:
+        if self._finished:
+            return
+        seconds = time.perf_counter() - self._started
+        self.abandon()
+        peak_memory = None
+        if self._memory_baseline is not None and tracemalloc.is_tracing():
+            peak_memory = max(tracemalloc.get_traced_memory()[1] - self._memory_baseline, 0)
+
+        match = self.request.resolver_match
+        view = match.view_name if match else "unmatched"
+        request_metrics.record(view, self.request.method, response.status_code, seconds,
+                               self.queries, self.sql_seconds, size, peak_memory)
+        if seconds * 1000 >= settings.SLOW_REQUEST_THRESHOLD_MS:
+            self._log_slow_request(view, response, seconds)
+
+    def _log_slow_request(self, view: str, response, seconds: float) -> None:
+        slowest = "".join(
+            f"\n  {elapsed * 1000:.1f} ms: {sql[:SLOW_SQL_MAX_LENGTH]}"
+            for elapsed, _, sql in sorted(self._slowest, reverse=True)
+        )
+        logger.warning(
+            "Slow request %s %s (%s) -> %s in %.1f ms, %d SQL statements in %.1f ms%s",
+            self.request.method, self.request.get_full_path(), view, response.status_code,
+            seconds * 1000, self.queries, self.sql_seconds * 1000,
+            f"; slowest:{slowest}" if slowest else "",
+        )
+
+
+class MeasuredContent:
+    """
+    A streaming body passed through while its bytes are counted. A streaming
+    response registers the ``close()`` of its content as a resource closer,
+    and the server calls it once the body has been sent or abandoned, so the
+    recording is finished even when the body is never read.
+    """
+
+    def __init__(self, content: Iterable[bytes], recorder: RequestRecorder, response):
+        self._content = content
+        self._recorder = recorder
+        self._response = response
+        self.size = 0
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self._content:
+            self.size += len(chunk)
+            yield chunk
+
+    def close(self) -> None:
+        self._recorder.finish(self._response, self.size)
@@ -0,0 +1,227 @@
+import cProfile
+import functools
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from transactions.models import ProfileCapture
+
+# Request header (X-Profile) or query parameter asking for a profile: a true
+# value for the default profiler, or the name of one.
+PROFILE_REQUEST_HEADER = "HTTP_X_PROFILE"
+PROFILE_QUERY_PARAM = "profile"
+
+# Response header naming the capture of a profiled request.
+PROFILE_CAPTURE_HEADER = "X-Profile-Capture"
+
+# cProfile call paths worth less than this share of the request are left out
+# of the collapsed stacks, which keeps them readable and bounded.
+COLLAPSED_MIN_SHARE = 1e-4
+
+FunctionKey = Tuple[str, int, str]
+
+
+def requested_profiler(request) -> Optional[str]:
+    """
+    The profiler a request asks for, or None when it asks for none or may
+    not profile; only active staff users may.
+    """
+    flag = (request.META.get(PROFILE_REQUEST_HEADER) or request.GET.get(PROFILE_QUERY_PARAM) or "").strip().lower()
+    if not flag or flag in ("0", "false", "no"):
+        return None
+    user = getattr(request, "user", None)
+    if user is None or not user.is_active or not user.is_staff:
+        return None
+    if flag in dict(ProfileCapture.PROFILER_CHOICES):
+        return flag
+    return settings.REQUEST_PROFILER if flag in ("1", "true", "yes") else None
+
+
+@functools.lru_cache(maxsize=4096)
+def _short_path(filename: str) -> str:
+    for root in sorted({str(settings.BASE_DIR), *sys.path}, key=len, reverse=True):
+        if root and filename.startswith(root + os.sep):
+            return filename[len(root) + 1:]
+    return filename
+
+
+def _frame_label(filename: str, lineno: int, name: str) -> str:
+    # ";" separates frames in the collapsed format; the count follows the last space
+    return f"{name} ({_short_path(filename)}:{lineno})".replace(";", ":")
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of the thread that started it every ``interval``
+    seconds from a helper thread and counts identical stacks. Only the
+    sampled thread pays for it, through the GIL hand-offs.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._target = None
+
+    def start(self) -> None:
+        self._target = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(_frame_label(code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> Dict[str, int]:
+        return dict(self.stacks)
+
+
+def collapsed_stacks(stats: pstats.Stats) -> Dict[str, int]:
+    """
+    Approximate collapsed stacks (microseconds per call path) from cProfile
+    statistics, which only record caller -> callee edges: a function's time
+    along a path is its time under that caller, scaled by the share of the
+    caller's time the path accounts for.
+    """
+    entries = stats.stats
+    callees: Dict[FunctionKey, List[Tuple[FunctionKey, float]]] = {}
+    for callee, (_, _, _, _, callers) in entries.items():
+        for caller, (_, _, _, edge_time) in callers.items():
+            callees.setdefault(caller, []).append((callee, edge_time))
+
+    roots = [key for key, (_, _, _, _, callers) in entries.items() if not callers]
+    total = sum(entries[key][3] for key in roots) or 1.0
+    stacks: Counter = Counter()
+
+    pending = [((_frame_label(*root),), (root,), entries[root][3]) for root in roots]
+    while pending:
+        labels, path, share = pending.pop()
+        key = path[-1]
+        _, _, own_time, cumulative, _ = entries[key]
+        if cumulative <= 0:
+            continue
+        stacks[";".join(labels)] += share * own_time / cumulative * 1_000_000
+        for callee, edge_time in callees.get(key, ()):
+            child_share = share * edge_time / cumulative
+            if callee in path or child_share < total * COLLAPSED_MIN_SHARE:
+                continue
+            pending.append((labels + (_frame_label(*callee),), path + (callee,), child_share))
+
+    return {stack: round(micros) for stack, micros in stacks.items() if round(micros) > 0}
+
+
+class RequestProfile:
+    """One profiler run: cProfile or ``SamplingProfiler`` on the calling thread."""
+
+    def __init__(self, profiler: str):
+        self.profiler = profiler
+        if profiler == ProfileCapture.SAMPLING:
+            self._profile = SamplingProfiler(settings.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+        else:
+            self._profile = cProfile.Profile()
+
+    def start(self) -> None:
+        if self.profiler == ProfileCapture.SAMPLING:
+            self._profile.start()
+        else:
+            self._profile.enable()
+
+    def stop(self) -> None:
+        if self.profiler == ProfileCapture.SAMPLING:
+            self._profile.stop()
+        else:
+            self._profile.disable()
+
+    def save(self, base_path: str) -> Tuple[str, str]:
+        """Write the profile files next to ``base_path``; returns (profile file, collapsed file)."""
+        profile_file = ""
+        if self.profiler == ProfileCapture.SAMPLING:
+            stacks = self._profile.collapsed()
+        else:
+            stats = pstats.Stats(self._profile)
+            profile_file = f"{base_path}.prof"
+            stats.dump_stats(profile_file)
+            stacks = collapsed_stacks(stats)
+
+        collapsed_file = f"{base_path}.collapsed"
+        with open(collapsed_file, "w") as handle:
+            for stack, count in sorted(stacks.items()):
+                handle.write(f"{stack} {count}\n")
+        return profile_file, collapsed_file
+
+
+def profile_request(request, get_response, profiler: str):
+    """
+    Serve ``request`` under ``profiler`` and keep the result as a
+    ``ProfileCapture``. A streaming body is produced inside the profile,
+    since that is where workbooks and exports do their work, and held in
+    memory until sent. Only the request's thread is profiled, not the
+    report section workers it may hand queries to.
+    """
+    run = RequestProfile(profiler)
+    started = time.perf_counter()
+    run.start()
+    try:
+        response = get_response(request)
+        if response.streaming:
+            response.streaming_content = list(response.streaming_content)
+    finally:
+        run.stop()
+    duration_ms = (time.perf_counter() - started) * 1000
+
+    match = request.resolver_match
+    view_name = match.view_name if match else ""
+    os.makedirs(settings.PROFILES_DIR, exist_ok=True)
+    slug = re.sub(r"[^\w.-]+", "_", view_name or "unmatched")
+    base_path = os.path.join(
+        settings.PROFILES_DIR, f"{timezone.now():%Y%m%d-%H%M%S-%f}_{slug}_{profiler}"
+    )
+    profile_file, collapsed_file = run.save(base_path)
+
+    capture = ProfileCapture.objects.create(
+        method=request.method,
+        path=request.get_full_path()[:2000],
+        view_name=view_name,
+        user=request.user if request.user.is_authenticated else None,
+        status_code=response.status_code,
+        duration_ms=duration_ms,
+        profiler=profiler,
+        profile_file=profile_file,
+        collapsed_file=collapsed_file,
+    )
+    prune_profile_captures(settings.PROFILE_CAPTURES_KEEP)
+    response[PROFILE_CAPTURE_HEADER] = str(capture.pk)
+    return response
+
+
+def delete_profile_files(capture: ProfileCapture) -> None:
+    for file_path in (capture.profile_file, capture.collapsed_file):
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+
+
+def prune_profile_captures(keep: int) -> int:
+    """Delete all but the ``keep`` newest captures; their files go with them."""
+    stale = ProfileCapture.objects.order_by("-created_at", "-id").values_list("id", flat=True)[keep:]
+    deleted, _ = ProfileCapture.objects.filter(id__in=list(stale)).delete()
+    return deleted
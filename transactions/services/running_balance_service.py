@@ -0,0 +1,172 @@
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.db.models import Q
+from django.utils import timezone
+
+from transactions.models import Transaction
+
+# Number of rows read and written per round trip while re-balancing an account.
+BALANCE_BATCH_SIZE = 2000
+
+LedgerKey = Tuple[date, int]
+
+
+def ledger_key(value, pk: Optional[int]) -> LedgerKey:
+    """
+    Build the (date, id) position of a transaction in its account's ledger.
+
+    A missing ``pk`` sorts before every row of that date, which is what an
+    "everything from this day onwards" recompute wants.
+    """
+    return Transaction._meta.get_field("date").to_python(value), pk or 0
+
+
+def _balance_before(account_id: int, key: LedgerKey) -> Decimal:
+    """
+    Running balance of the last row strictly before ``key`` in the account,
+    or zero when ``key`` is the start of the ledger.
+    """
+    day, pk = key
+    balance = (
+        Transaction.objects.filter(personal_account_id=account_id)
+        .filter(Q(date__lt=day) | Q(date=day, id__lt=pk))
+        .order_by("-date", "-id")
+        .values_list("running_balance", flat=True)
+        .first()
+    )
+    return balance or Decimal(0)
+
+
+def recalculate_running_balance_from(account_id: int, key: Optional[LedgerKey] = None) -> int:
+    """
+    Recompute running balances of one account from the ``key`` position onwards.
+
+    The balance of the row just before ``key`` is taken as the starting point,
+    rows from ``key`` onwards are walked in (date, id) order in keyset pages and
+    only rows whose balance actually changes are written back with
+    ``bulk_update``. ``bulk_update`` does not send ``post_save``, so no signal
+    juggling is needed; it does not apply ``auto_now`` either, so
+    ``updated_at`` is set here.
+
+    Args:
+        account_id (int): The personal account to re-balance.
+        key (LedgerKey, optional): First (date, id) position to recompute.
+            ``None`` recomputes the whole account.
+
+    Returns:
+        int: Number of rows whose running balance was rewritten.
+    """
+    rows = Transaction.objects.filter(personal_account_id=account_id)
+    if key is None:
+        running_balance = Decimal(0)
+    else:
+        running_balance = _balance_before(account_id, key)
+        day, pk = key
+        rows = rows.filter(Q(date__gt=day) | Q(date=day, id__gte=pk))
+
+    rows = rows.order_by("date", "id").values_list("date", "id", "debit_amount", "credit_amount", "running_balance")
+
+    updated = 0
+    now = timezone.now()
+    page = rows[:BALANCE_BATCH_SIZE]
+    while True:
+        batch = list(page)
+        if not batch:
+            break
+
+        changed = []
+        for _, pk, debit, credit, stored_balance in batch:
+            if debit:
+                running_balance -= debit
+            if credit:
+                running_balance += credit
+            if stored_balance != running_balance:
+                changed.append(Transaction(id=pk, running_balance=running_balance, updated_at=now))
+
+        if changed:
+            Transaction.objects.bulk_update(changed, ["running_balance", "updated_at"], batch_size=BALANCE_BATCH_SIZE)
+            updated += len(changed)
+
+        if len(batch) < BALANCE_BATCH_SIZE:
+            break
+        last_date, last_id = batch[-1][0], batch[-1][1]
+        page = rows.filter(Q(date__gt=last_date) | Q(date=last_date, id__gt=last_id))[:BALANCE_BATCH_SIZE]
+
+    return updated
+
+
+def recalculate_running_balance(account) -> int:
+    """
+    Recalculate the running balance for all transactions of a given account.
+    """
+    account_id = getattr(account, "pk", account)
+    return recalculate_running_balance_from(account_id)
+
+
+def apply_transaction_insert(transaction: Transaction) -> int:
+    """
+    Re-balance the account of a newly inserted transaction from its position on.
+    """
+    return recalculate_running_balance_from(
+        transaction.personal_account_id, ledger_key(transaction.date, transaction.pk)
+    )
+
+
+def apply_transaction_update(transaction: Transaction, old_account_id: int, old_date) -> int:
+    """
+    Re-balance after an edit, including a move to another date or account.
+
+    The recompute starts at whichever of the old and new positions comes first,
+    so a row moved later in time still fixes the rows it used to precede.
+    """
+    new_key = ledger_key(transaction.date, transaction.pk)
+    old_key = ledger_key(old_date, transaction.pk)
+
+    if old_account_id != transaction.personal_account_id:
+        updated = recalculate_running_balance_from(old_account_id, old_key)
+        return updated + recalculate_running_balance_from(transaction.personal_account_id, new_key)
+
+    return recalculate_running_balance_from(transaction.personal_account_id, min(old_key, new_key))
+
+
+def apply_transaction_delete(account_id: int, old_date, pk: int) -> int:
+    """
+    Re-balance the rows that followed a deleted transaction.
+    """
+    return recalculate_running_balance_from(account_id, ledger_key(old_date, pk))
+
+
+def earliest_dates_by_account(transactions: Iterable[Transaction]) -> Dict[int, date]:
+    """
+    Find the accounts touched by a batch of transactions and the earliest date
+    touched in each of them.
+    """
+    earliest: Dict[int, date] = {}
+    for row in transactions:
+        day = ledger_key(row.date, None)[0]
+        account_id = row.personal_account_id
+        if account_id not in earliest or day < earliest[account_id]:
+            earliest[account_id] = day
+    return earliest
+
+
+def materialize_running_balances(earliest: Dict[int, date]) -> int:
+    """
+    Fill in running balances after a bulk insert.
+
+    ``bulk_create`` does not send ``post_save``, so each affected account is
+    re-balanced once, in a single ordered pass from the start of the earliest
+    day touched, instead of once per inserted row.
+
+    Args:
+        earliest (Dict[int, date]): Earliest touched date per personal account id.
+
+    Returns:
+        int: Number of rows whose running balance was rewritten.
+    """
+    return sum(
+        recalculate_running_balance_from(account_id, ledger_key(day, None))
+        for account_id, day in earliest.items()
+    )
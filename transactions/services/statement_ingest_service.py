@@ -0,0 +1,381 @@
+import hashlib
+import os
+import uuid
+from datetime import date
+from decimal import Decimal
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import pandas as pd
+import xlsxwriter
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from transactions.models import Transaction
+from transactions.serializers import TransactionSerializer, TransactionFrameSerializer, build_transactions
+from transactions.services.balance_checkpoint_service import refresh_checkpoints
+from transactions.services.categorization_service import categorize_transactions
+from transactions.services.lookup_cache_service import category_lookup, sub_category_lookup
+from transactions.services.monthly_rollup_service import months_touched, refresh_rollups
+from transactions.services.report_cache_service import invalidate_report_months
+from transactions.services.running_balance_service import earliest_dates_by_account, materialize_running_balances
+from utils.string_utils import snake_case
+
+# Rows per INSERT statement when a chunk is bulk created.
+INSERT_BATCH_SIZE = 1000
+
+SUPPORTED_EXTENSIONS = (".csv", ".xlsx")
+
+
+class StatementSource:
+    """
+    A re-readable uploaded statement.
+
+    ``chunks()`` yields DataFrames of at most ``chunk_size`` rows straight from
+    the uploaded file object, so the whole statement is never held in memory;
+    with ``chunk_size=None`` the file is read in one go. Row labels run on
+    across chunks, which lets errors be keyed by row and matched up again when
+    the error file is written on a second pass.
+    """
+
+    def __init__(self, file, name: str, chunk_size: Optional[int] = None):
+        self.file = file
+        self.name = name
+        self.chunk_size = chunk_size
+
+    @property
+    def is_excel(self) -> bool:
+        return self.name.endswith(".xlsx")
+
+    def chunks(self) -> Iterator[pd.DataFrame]:
+        self.file.seek(0)
+        if self.is_excel:
+            if self.chunk_size:
+                yield from self._excel_chunks()
+            else:
+                yield pd.read_excel(self.file)
+        elif self.chunk_size:
+            yield from pd.read_csv(self.file, chunksize=self.chunk_size)
+        else:
+            yield pd.read_csv(self.file)
+
+    def _excel_chunks(self) -> Iterator[pd.DataFrame]:
+        workbook = load_workbook(self.file, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = [
+                name if name is not None else f"Unnamed: {position}"
+                for position, name in enumerate(next(rows, ()))
+            ]
+            batch: List[tuple] = []
+            offset = 0
+            for row in rows:
+                if all(value is None for value in row):
+                    continue
+                batch.append(row[:len(header)])
+                if len(batch) == self.chunk_size:
+                    yield pd.DataFrame(batch, columns=header, index=range(offset, offset + len(batch)))
+                    offset += len(batch)
+                    batch = []
+            if batch or not offset:
+                yield pd.DataFrame(batch, columns=header, index=range(offset, offset + len(batch)))
+        finally:
+            workbook.close()
+
+
+class IngestResult:
+    """
+    Counters and per-row errors of one statement ingest.
+    """
+
+    def __init__(self):
+        self.rows_parsed = 0
+        self.rows_validated = 0
+        self.rows_inserted = 0
+        self.rows_skipped = 0
+        self.rows_updated = 0
+        self.errors: Dict[int, str] = {}
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "rows_parsed": self.rows_parsed,
+            "rows_validated": self.rows_validated,
+            "rows_inserted": self.rows_inserted,
+            "rows_skipped": self.rows_skipped,
+            "rows_updated": self.rows_updated,
+            "rows_with_errors": len(self.errors),
+        }
+
+
+def validate_columns(chunk: pd.DataFrame) -> Tuple[Dict[int, str], List[Transaction]]:
+    """
+    Validate a chunk with ``TransactionFrameSerializer``.
+    """
+    serializer = TransactionFrameSerializer(data=chunk)
+    if not serializer.is_valid():
+        return serializer.errors.map(str).to_dict(), []
+    return {}, build_transactions(serializer.validated_data)
+
+
+def validate_rows(chunk: pd.DataFrame) -> Tuple[Dict[int, str], List[Transaction]]:
+    """
+    Validate a chunk one row at a time with ``TransactionSerializer``.
+    """
+    errors: Dict[int, str] = {}
+    valid_rows = []
+
+    def nan_safe(value):
+        return None if pd.isna(value) else value
+
+    for idx, row in chunk.iterrows():
+        cleaned_row = {
+            snake_case(key): value.strip() if isinstance(value, str) else nan_safe(value)
+            for key, value in row.to_dict().items()
+        }
+
+        # Use the serializer for validation and resolution
+        serializer = TransactionSerializer(data=cleaned_row)
+        if serializer.is_valid():
+            valid_rows.append(serializer.validated_data)
+        else:
+            errors[idx] = str(serializer.errors)
+
+    if errors:
+        return errors, []
+
+    transaction_objects = [
+        Transaction(
+            date=data['date'],
+            narration=data['narration'],
+            debit_amount=data['debit_amount'] or 0.0,
+            credit_amount=data['credit_amount'] or 0.0,
+            category=data['category'],  # Resolved by the serializer
+            sub_category=data['sub_category'],  # Resolved by the serializer
+            personal_account=data['personal_account'],  # Resolved by the serializer
+            nominal_account=data['nominal_account'],
+            running_balance=0.00  # Filled in by materialize_running_balances
+        )
+        for data in valid_rows
+    ]
+    return errors, transaction_objects
+
+
+def transaction_fingerprint(narration: str, personal_account_id: int, day, debit, credit) -> str:
+    """
+    Stable fingerprint over the fields of the ``unique_narration_nominal_date_except_transfer``
+    constraint. Empty amounts and zero hash alike, since uploads store a missing side as 0.
+    """
+    def amount(value) -> str:
+        return str(Decimal(value or 0).quantize(Decimal("0.01")))
+
+    day = Transaction._meta.get_field("date").to_python(day)
+    key = "\x1f".join([narration, str(personal_account_id), day.isoformat(), amount(debit), amount(credit)])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def _row_fingerprint(row: Transaction) -> str:
+    return transaction_fingerprint(row.narration, row.personal_account_id, row.date, row.debit_amount, row.credit_amount)
+
+
+def _merge_uploaded(row: Transaction, category_id: Optional[int], sub_category_id: Optional[int],
+                    nominal: str) -> Tuple[Optional[int], Optional[int], str]:
+    """
+    (category, sub category, nominal account) of a stored row once the
+    uploaded duplicate ``row`` has been applied over it.
+    """
+    if row.category_id is not None:
+        if row.sub_category_id is None and row.category_id != category_id:
+            sub_category_id = None
+        category_id = row.category_id
+    if row.sub_category_id is not None:
+        sub_category_id = row.sub_category_id
+    return category_id, sub_category_id, row.nominal_account or nominal
+
+
+def split_duplicates(
+    transaction_objects: List[Transaction], on_duplicate: str = "skip"
+) -> Tuple[List[Transaction], int, List[Transaction]]:
+    """
+    Drop rows that already exist, in the database or earlier in the upload.
+
+    Existing rows are found with one set-based query per chunk, bounded by the
+    chunk's accounts and date range, and compared by fingerprint. With
+    ``on_duplicate="update"`` the category, sub category and nominal account of
+    an existing row are overwritten by the uploaded ones when they differ; a
+    field the upload leaves empty keeps its stored value, except that the sub
+    category is dropped when the category changes without one.
+
+    Returns:
+        Tuple[List[Transaction], int, List[Transaction]]: Rows to insert, number of
+        rows skipped and the rows updated (carrying id, date and the new values).
+    """
+    if not transaction_objects:
+        return [], 0, []
+
+    dates = [Transaction._meta.get_field("date").to_python(row.date) for row in transaction_objects]
+    existing_rows = Transaction.objects.filter(
+        personal_account_id__in={row.personal_account_id for row in transaction_objects},
+        date__gte=min(dates),
+        date__lte=max(dates),
+    ).values_list(
+        "id", "narration", "personal_account_id", "date", "debit_amount", "credit_amount",
+        "category_id", "sub_category_id", "nominal_account",
+    )
+    existing = {
+        transaction_fingerprint(narration, account_id, day, debit, credit): (pk, day, category_id, sub_category_id, nominal)
+        for pk, narration, account_id, day, debit, credit, category_id, sub_category_id, nominal in existing_rows
+    }
+
+    new_rows: List[Transaction] = []
+    changed: List[Transaction] = []
+    now = timezone.now()
+    seen = set()
+    skipped = 0
+    for row in transaction_objects:
+        fingerprint = _row_fingerprint(row)
+        if fingerprint in seen:
+            skipped += 1
+            continue
+        seen.add(fingerprint)
+
+        match = existing.get(fingerprint)
+        if match is None:
+            new_rows.append(row)
+            continue
+
+        stored = match[2:]
+        uploaded = _merge_uploaded(row, *stored)
+        if on_duplicate == "update" and uploaded != stored:
+            category_id, sub_category_id, nominal = uploaded
+            changed.append(Transaction(id=match[0], date=match[1], category_id=category_id, sub_category_id=sub_category_id,
+                                       nominal_account=nominal, updated_at=now))
+        else:
+            skipped += 1
+
+    if changed:
+        Transaction.objects.bulk_update(changed, ["category", "sub_category", "nominal_account", "updated_at"],
+                                        batch_size=INSERT_BATCH_SIZE)
+
+    return new_rows, skipped, changed
+
+
+VALIDATORS: Dict[str, Callable[[pd.DataFrame], Tuple[Dict[int, str], List[Transaction]]]] = {
+    "columnar": validate_columns,
+    "row": validate_rows,
+}
+
+
+def ingest_statement(
+    source: StatementSource,
+    validation: str = "columnar",
+    on_progress: Optional[Callable[[IngestResult], None]] = None,
+    on_duplicate: str = "skip",
+) -> IngestResult:
+    """
+    Validate and insert a statement chunk by chunk in one atomic operation.
+
+    Every chunk is validated; chunks are only inserted while no error has been
+    seen, and any error rolls the whole upload back once all rows have been
+    checked, so the error file lists every problem in one go. Running balances
+    and balance checkpoints are materialized once at the end for each touched
+    account, and the monthly rollups once for each touched month. New rows
+    without a category are categorized by the active ``CategorizationRule``
+    rows, a chunk at a time.
+
+    Rows that repeat an earlier statement are not inserted again, so
+    re-uploading an overlapping period is idempotent; see ``split_duplicates``.
+
+    Args:
+        source (StatementSource): The uploaded statement.
+        validation (str): ``"columnar"`` or ``"row"``.
+        on_progress (Callable, optional): Called with the result after each chunk.
+        on_duplicate (str): ``"skip"`` or ``"update"`` rows that already exist.
+
+    Returns:
+        IngestResult: Row counters and per-row errors keyed by row label.
+    """
+    validate = VALIDATORS[validation]
+    result = IngestResult()
+    earliest: Dict[int, date] = {}
+    months: Set[Tuple[int, int]] = set()
+
+    with transaction.atomic():
+        for chunk in source.chunks():
+            result.rows_parsed += len(chunk)
+            errors, transaction_objects = validate(chunk)
+            result.rows_validated += len(chunk)
+            result.errors.update(errors)
+
+            if not result.errors:
+                # Rows the statement left without a category get one from the
+                # rules, before duplicates are compared with the stored rows
+                categorize_transactions(transaction_objects)
+                transaction_objects, skipped, updated = split_duplicates(transaction_objects, on_duplicate)
+                Transaction.objects.bulk_create(transaction_objects, batch_size=INSERT_BATCH_SIZE)
+                result.rows_inserted += len(transaction_objects)
+                result.rows_skipped += skipped
+                result.rows_updated += len(updated)
+                months |= months_touched(transaction_objects) | months_touched(updated)
+                for account_id, day in earliest_dates_by_account(transaction_objects).items():
+                    earliest[account_id] = min(day, earliest.get(account_id, day))
+
+            if on_progress:
+                on_progress(result)
+
+        if result.errors:
+            transaction.set_rollback(True)
+            result.rows_inserted = result.rows_skipped = result.rows_updated = 0
+        else:
+            # bulk_create skips post_save, so re-balance every touched account once
+            materialize_running_balances(earliest)
+            refresh_checkpoints(earliest)
+            refresh_rollups(months)
+            invalidate_report_months(date(year, month, 1) for year, month in months)
+
+    if result.errors:
+        # Names created during validation were rolled back with the upload
+        category_lookup.invalidate()
+        sub_category_lookup.invalidate()
+
+    return result
+
+
+def generate_error_file(source: StatementSource, errors: Dict[int, str], error_file_name: Optional[str] = None) -> str:
+    """
+    Write the statement again with an Error column and return the file path.
+
+    The source is re-read chunk by chunk, so building the error file does not
+    need the whole statement in memory either. Without ``error_file_name``
+    the name gets a random part, so concurrent uploads of the same file
+    never overwrite each other's errors.
+    """
+    error_file_name = error_file_name or f"errors_{uuid.uuid4().hex}_{os.path.basename(source.name)}"
+    error_file_path = os.path.join(settings.MEDIA_ROOT, error_file_name)
+    os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+
+    if source.is_excel:
+        # Rows are written in order, so xlsxwriter can flush each one as it goes
+        workbook = xlsxwriter.Workbook(error_file_path, {
+            "constant_memory": True,
+            "default_date_format": "dd-mm-yyyy",
+        })
+        worksheet = workbook.add_worksheet()
+        row_number = 0
+        for chunk in source.chunks():
+            chunk["Error"] = chunk.index.map(errors)
+            if row_number == 0:
+                worksheet.write_row(row_number, 0, [str(column) for column in chunk.columns])
+                row_number += 1
+            for values in chunk.astype(object).itertuples(index=False):
+                worksheet.write_row(row_number, 0, [None if pd.isna(value) else value for value in values])
+                row_number += 1
+        workbook.close()
+    else:
+        header = True
+        for chunk in source.chunks():
+            chunk["Error"] = chunk.index.map(errors)
+            chunk.to_csv(error_file_path, index=False, header=header, mode="w" if header else "a")
+            header = False
+
+    return error_file_path
@@ -1,27 +1,117 @@
+from datetime import date
+from typing import Dict, Iterator, List, Tuple
+
 import pandas as pd
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
 from transactions.models import Transaction
+from transactions.services.lookup_cache_service import (
+    category_lookup,
+    personal_account_lookup,
+    sub_category_lookup,
+)
+from utils.db_utils import period_filter
+from utils.frame_utils import FrameColumn, queryset_frame
 from utils.string_utils import sentence_case
 
+TRANSACTION_REPORT_COLUMNS = [
+    "Date", "Narration", "Debit Amount", "Credit Amount", "Category",
+    "Sub Category", "Personal Account", "Nominal Account", "Running Balance",
+]
 
-def transaction_report(month: int, year: int) -> pd.DataFrame:
-    transactions = Transaction.objects.filter(
-        date__year=year,
-        date__month=month
-    ).order_by('date')
-    formatted_data = [
-        {
-            "Date": row.date,
-            "Narration": row.narration,
-            "Debit Amount": row.debit_amount if row.debit_amount != 0 else '',
-            "Credit Amount": row.credit_amount if row.credit_amount != 0 else '',
-            "Category": row.category,
-            "Sub Category": getattr(row.sub_category, 'name', ''),
-            "Personal Account": row.personal_account.name,
-            "Nominal Account": sentence_case(row.nominal_account),
-            "Running Balance": row.running_balance,
-        }
-        for row in transactions
+# Rows fetched per round trip while streaming a month's transactions.
+REPORT_ITERATOR_CHUNK_SIZE = 2000
+
+
+def transaction_report_period_queryset(start: date, end: date):
+    return Transaction.objects.filter(period_filter(start, end)).order_by('date', 'id')
+
+
+def transaction_report_queryset(month: int, year: int):
+    first_day = date(year, month, 1)
+    return transaction_report_period_queryset(first_day, first_day)
+
+
+def transaction_counts_by_month(start: date, end: date) -> Dict[Tuple[int, int], int]:
+    """
+    Number of transactions of every month from ``start`` to ``end``, keyed by
+    (year, month), from one grouped query. Months without any are left out.
+    """
+    counts = (
+        Transaction.objects.filter(period_filter(start, end))
+        .annotate(period=TruncMonth("date"))
+        .values("period")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    return {(row["period"].year, row["period"].month): row["count"] for row in counts}
+
+
+def _report_rows(queryset) -> Iterator[List]:
+    rows = queryset.values_list(
+        "date", "narration", "debit_amount", "credit_amount", "category_id",
+        "sub_category_id", "personal_account_id", "nominal_account", "running_balance",
+    ).iterator(chunk_size=REPORT_ITERATOR_CHUNK_SIZE)
+
+    category_names = category_lookup.names()
+    sub_category_names = sub_category_lookup.names()
+    account_names = personal_account_lookup.names()
+    for day, narration, debit, credit, category_id, sub_category_id, account_id, nominal, balance in rows:
+        yield [
+            day,
+            narration,
+            debit if debit != 0 else '',
+            credit if credit != 0 else '',
+            category_names.get(category_id),
+            sub_category_names.get(sub_category_id, ''),
+            account_names.get(account_id),
+            sentence_case(nominal),
+            balance,
+        ]
+
+
+def transaction_report_rows(month: int, year: int) -> Iterator[List]:
+    """
+    Yield the month's transactions as rows of ``TRANSACTION_REPORT_COLUMNS``,
+    reading them from the database in chunks rather than all at once.
+    """
+    return _report_rows(transaction_report_queryset(month, year))
+
+
+def transaction_report_period_rows(start: date, end: date) -> Iterator[List]:
+    """
+    Yield the transactions of every month from ``start`` to ``end`` as rows of
+    ``TRANSACTION_REPORT_COLUMNS``, in date order, from one chunked query.
+    """
+    return _report_rows(transaction_report_period_queryset(start, end))
+
+
+def transaction_report_frame_columns() -> List[FrameColumn]:
+    """``TRANSACTION_REPORT_COLUMNS`` as typed frame columns, names resolved through the lookup caches."""
+    return [
+        FrameColumn("Date", "date", "date"),
+        FrameColumn("Narration", "narration"),
+        FrameColumn("Debit Amount", "debit_amount", "float"),
+        FrameColumn("Credit Amount", "credit_amount", "float"),
+        FrameColumn("Category", "category_id", labels=category_lookup.names()),
+        FrameColumn("Sub Category", "sub_category_id", labels=sub_category_lookup.names()),
+        FrameColumn("Personal Account", "personal_account_id", labels=personal_account_lookup.names()),
+        FrameColumn("Nominal Account", "nominal_account",
+                    labels={value: sentence_case(value) for value, _ in Transaction.NOMINAL_ACCOUNT_CHOICES}),
+        FrameColumn("Running Balance", "running_balance", "float"),
     ]
-    # Generate an Excel file
-    return pd.DataFrame(formatted_data)
-    
\ No newline at end of file
+
+
+def transaction_report(month: int, year: int) -> pd.DataFrame:
+    """
+    The month's transactions as a typed DataFrame of ``TRANSACTION_REPORT_COLUMNS``,
+    built column-wise from one chunked query. Zero amounts are left blank.
+
+    For analysis in the shell and the benchmark suite; the report workbooks
+    stream ``transaction_report_rows`` instead of holding a month in a frame.
+    """
+    df = queryset_frame(transaction_report_queryset(month, year), transaction_report_frame_columns(),
+                        chunk_size=REPORT_ITERATOR_CHUNK_SIZE)
+    amounts = ["Debit Amount", "Credit Amount"]
+    df[amounts] = df[amounts].mask(df[amounts] == 0)
+    return df
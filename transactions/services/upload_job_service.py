@@ -0,0 +1,147 @@
+import logging
+import os
+import socket
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.storage import FileSystemStorage
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from transactions.models import UploadJob
+from transactions.services.statement_ingest_service import (
+    IngestResult,
+    StatementSource,
+    generate_error_file,
+    ingest_statement,
+)
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+PROGRESS_TIMEOUT = 24 * 60 * 60
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.UPLOAD_JOB_WORKERS, thread_name_prefix="upload-job"
+            )
+        return _executor
+
+
+def _progress_key(job_id: int) -> str:
+    return f"upload-job:{job_id}:progress"
+
+
+def submit_upload_job(file, validation: str = "columnar", on_duplicate: str = "skip") -> UploadJob:
+    """
+    Store the uploaded file and queue its ingest on the local worker pool.
+
+    Returns:
+        UploadJob: The persisted job, still ``PENDING``.
+    """
+    storage = FileSystemStorage(location=os.path.join(settings.MEDIA_ROOT, "uploads"))
+    stored_name = storage.save(file.name, file)
+
+    job = UploadJob.objects.create(
+        file_name=file.name,
+        file_path=storage.path(stored_name),
+        validation=validation,
+        on_duplicate=on_duplicate,
+        worker=WORKER_ID,
+    )
+    transaction.on_commit(lambda: _get_executor().submit(run_upload_job, job.pk))
+    return job
+
+
+def run_upload_job(job_id: int) -> None:
+    """
+    Run one queued upload: ingest the stored file chunk by chunk, publish
+    progress after every chunk and persist the outcome on the job row.
+    """
+    close_old_connections()
+    job = UploadJob.objects.get(pk=job_id)
+    UploadJob.objects.filter(pk=job_id).update(status=UploadJob.RUNNING, worker=WORKER_ID, started_at=timezone.now())
+
+    # The ingest runs in one transaction, so progress goes through the shared
+    # upload_progress cache rather than the job row, whose updates would stay
+    # invisible until commit.
+    def publish(result: IngestResult) -> None:
+        caches["upload_progress"].set(_progress_key(job_id), result.as_dict(), timeout=PROGRESS_TIMEOUT)
+
+    outcome: Dict[str, Any] = {}
+    try:
+        with open(job.file_path, "rb") as file:
+            source = StatementSource(file, job.file_name, chunk_size=settings.UPLOAD_CHUNK_SIZE)
+            result = ingest_statement(source, validation=job.validation, on_progress=publish,
+                                      on_duplicate=job.on_duplicate)
+            outcome.update(result.as_dict())
+
+            if result.errors:
+                error_file_path = generate_error_file(
+                    source, result.errors, error_file_name=f"errors_{job_id}_{os.path.basename(job.file_name)}"
+                )
+                outcome.update(status=UploadJob.INVALID, error_file=error_file_path,
+                               message=f"{len(result.errors)} rows failed validation; nothing was inserted.")
+            else:
+                outcome.update(status=UploadJob.COMPLETED, message="Transactions uploaded successfully.")
+    except Exception as e:
+        logger.exception("Upload job %s failed", job_id)
+        outcome.update(status=UploadJob.FAILED, message=f"{e}\n{traceback.format_exc()}")
+    finally:
+        UploadJob.objects.filter(pk=job_id).update(finished_at=timezone.now(), **outcome)
+        caches["upload_progress"].delete(_progress_key(job_id))
+        if os.path.exists(job.file_path):
+            os.remove(job.file_path)
+        # Worker threads own their connection; don't leave it open in the pool
+        connection.close()
+
+
+def get_upload_job(job_id: int) -> Optional[UploadJob]:
+    """
+    Fetch a job with its live progress merged in.
+
+    Jobs left ``PENDING``/``RUNNING`` by a process on this host that no longer
+    exists are marked ``INTERRUPTED``, so a restarted server reports what
+    happened instead of a job that runs forever.
+    """
+    job = UploadJob.objects.filter(pk=job_id).first()
+    if job is None or job.status not in UploadJob.ACTIVE_STATUSES:
+        return job
+
+    if not _worker_alive(job.worker):
+        UploadJob.objects.filter(pk=job.pk, status__in=UploadJob.ACTIVE_STATUSES).update(
+            status=UploadJob.INTERRUPTED,
+            finished_at=timezone.now(),
+            message=f"Worker {job.worker} stopped before the job finished; nothing was inserted.",
+        )
+        job.refresh_from_db()
+        return job
+
+    for field, value in (caches["upload_progress"].get(_progress_key(job.pk)) or {}).items():
+        setattr(job, field, value)
+    return job
+
+
+def _worker_alive(worker: str) -> bool:
+    """Whether ``worker`` ("hostname:pid") is still running; unknown hosts count as alive."""
+    host, _, pid = worker.rpartition(":")
+    if worker == WORKER_ID or host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
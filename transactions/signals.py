@@ -1,31 +1,182 @@
-from decimal import Decimal
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
 from django.dispatch import receiver
-from transactions.models import Transaction
+from accounts.models import PersonalAccount
+from transactions.models import CategorizationRule, Category, ProfileCapture, SubCategory, Transaction
+from transactions.services.balance_checkpoint_service import (
+    apply_checkpoint_delta,
+    apply_checkpoint_update,
+    month_start,
+    transaction_amount,
+)
+from transactions.services.categorization_service import rule_matcher
+from transactions.services.lookup_cache_service import LOOKUPS_BY_MODEL
+from transactions.services.monthly_rollup_service import (
+    ROLLUP_SOURCE_FIELDS,
+    apply_rollup_delta,
+    apply_rollup_update,
+    rollup_values,
+)
+from transactions.services.narration_search_service import ensure_narration_search_index
+from transactions.services.report_cache_service import invalidate_all_reports, invalidate_report_months
+from transactions.services.request_profiling_service import delete_profile_files
+from transactions.services.running_balance_service import (
+    apply_transaction_delete,
+    apply_transaction_insert,
+    apply_transaction_update,
+)
 
-def recalculate_running_balance(account):
+
+def _is_balance_only_save(update_fields) -> bool:
+    return update_fields is not None and set(update_fields) == {"running_balance"}
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_ledger_position(sender, instance, update_fields=None, **kwargs):
     """
-    Recalculate the running balance for all transactions of a given account.
+    Keep the stored (date, account) of an edited transaction so the running
+    balance can be fixed from its old position as well as its new one, along
+    with the amounts and categories its monthly rollup row was built from.
     """
-    transactions = Transaction.objects.filter(personal_account=account).order_by('date', 'id')
+    instance._ledger_origin = None
+    if instance.pk is None or _is_balance_only_save(update_fields):
+        return
+    instance._ledger_origin = (
+        Transaction.objects.filter(pk=instance.pk).values(*ROLLUP_SOURCE_FIELDS).first()
+    )
+
 
-    running_balance: Decimal = Decimal(0)
-    for transaction in transactions:
-        if transaction.debit_amount:
-            running_balance -= transaction.debit_amount
-        if transaction.credit_amount:
-            running_balance += transaction.credit_amount
+@receiver(post_save, sender=Transaction)
+def update_running_balance_on_save(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Update running balance after a transaction is saved.
+    """
+    if _is_balance_only_save(update_fields):
+        return
 
-        # Temporarily disconnect signal to prevent recursion
-        post_save.disconnect(update_running_balance_on_save, sender=Transaction)
-        transaction.running_balance = running_balance
-        transaction.save(update_fields=['running_balance'])
-        post_save.connect(update_running_balance_on_save, sender=Transaction)
+    origin = getattr(instance, "_ledger_origin", None)
+    if created or origin is None:
+        apply_transaction_insert(instance)
+    else:
+        apply_transaction_update(instance, origin["personal_account_id"], origin["date"])
 
 
 @receiver(post_save, sender=Transaction)
-def update_running_balance_on_save(sender, instance, **kwargs):
+def update_monthly_rollup_on_save(sender, instance, created, update_fields=None, **kwargs):
     """
-    Update running balance after a transaction is saved.
+    Add a new transaction to its monthly rollup, or move an edited one.
+    """
+    if _is_balance_only_save(update_fields):
+        return
+
+    origin = getattr(instance, "_ledger_origin", None)
+    if created or origin is None:
+        apply_rollup_delta(rollup_values(instance))
+    else:
+        apply_rollup_update(origin, rollup_values(instance))
+
+
+@receiver(post_save, sender=Transaction)
+def update_balance_checkpoints_on_save(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Shift the month-end balance checkpoints by a new or edited transaction.
+    """
+    if _is_balance_only_save(update_fields):
+        return
+
+    origin = getattr(instance, "_ledger_origin", None)
+    values = rollup_values(instance)
+    if created or origin is None:
+        apply_checkpoint_delta(instance.personal_account_id, instance.date, transaction_amount(values))
+    else:
+        apply_checkpoint_update(origin, values)
+
+
+@receiver(post_delete, sender=Transaction)
+def update_running_balance_on_delete(sender, instance, **kwargs):
+    """
+    Update running balance of the rows that followed a deleted transaction.
+    """
+    apply_transaction_delete(instance.personal_account_id, instance.date, instance.pk)
+
+
+@receiver(post_save, sender=Transaction)
+def invalidate_reports_on_save(sender, instance, update_fields=None, **kwargs):
+    """
+    Drop cached reports of the month a transaction was saved in, and of the
+    month it was moved out of.
+    """
+    if _is_balance_only_save(update_fields):
+        return
+
+    origin = getattr(instance, "_ledger_origin", None)
+    months = [month_start(instance.date)]
+    if origin is not None:
+        months.append(month_start(origin["date"]))
+    invalidate_report_months(months)
+
+
+@receiver(post_delete, sender=Transaction)
+def update_monthly_rollup_on_delete(sender, instance, **kwargs):
+    """
+    Take a deleted transaction out of its monthly rollup.
+    """
+    apply_rollup_delta(rollup_values(instance), sign=-1)
+
+
+@receiver(post_delete, sender=Transaction)
+def update_balance_checkpoints_on_delete(sender, instance, **kwargs):
+    """
+    Take a deleted transaction's amount out of the month-end balance checkpoints.
+    """
+    amount = transaction_amount(rollup_values(instance))
+    apply_checkpoint_delta(instance.personal_account_id, instance.date, -amount, create=False)
+
+
+@receiver(post_delete, sender=Transaction)
+def invalidate_reports_on_delete(sender, instance, **kwargs):
+    """
+    Drop cached reports of a deleted transaction's month.
+    """
+    invalidate_report_months([month_start(instance.date)])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=SubCategory)
+@receiver(post_delete, sender=SubCategory)
+@receiver(post_save, sender=PersonalAccount)
+@receiver(post_delete, sender=PersonalAccount)
+def invalidate_lookup_cache(sender, **kwargs):
+    """
+    Drop cached names of a lookup table whenever one of its rows changes,
+    along with the cached reports showing them.
+    """
+    LOOKUPS_BY_MODEL[sender].invalidate()
+    invalidate_all_reports()
+
+
+@receiver(post_save, sender=CategorizationRule)
+@receiver(post_delete, sender=CategorizationRule)
+def invalidate_rule_matcher(sender, **kwargs):
+    """
+    Recompile the categorization rules on next use whenever one changes.
+    """
+    rule_matcher.invalidate()
+
+
+@receiver(post_delete, sender=ProfileCapture)
+def remove_profile_files(sender, instance, **kwargs):
+    """
+    Remove a deleted profile capture's files from PROFILES_DIR.
+    """
+    delete_profile_files(instance)
+
+
+@receiver(post_migrate)
+def create_narration_search_index(sender, using="default", **kwargs):
+    """
+    Create the narration search index once the transactions table exists;
+    it is raw SQL per database backend, so no migration carries it.
     """
-    recalculate_running_balance(instance.personal_account)
\ No newline at end of file
+    if sender.name == "transactions":
+        ensure_narration_search_index(using)
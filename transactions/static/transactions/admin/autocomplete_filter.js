@@ -0,0 +1,12 @@
+'use strict';
+{
+    // Apply an autocomplete list filter as soon as a value is picked
+    const $ = django.jQuery;
+    $(function() {
+        $('select[data-filter-url]').on('change', function() {
+            if (this.value) {
+                window.location.href = this.dataset.filterUrl.replace('__value__', encodeURIComponent(this.value));
+            }
+        });
+    });
+}
@@ -1,3 +1,952 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import pandas as pd
+from openpyxl import load_workbook
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import PersonalAccount
+from transactions.models import (
+    AccountBalanceCheckpoint, CategorizationRule, Category, MonthlyRollup, ProfileCapture, SubCategory, Transaction,
+    UploadJob,
+)
+from transactions.serializers import TransactionListSerializer, TransactionSerializer
+from transactions.services import balance_checkpoint_service
+from transactions.services.balance_checkpoint_service import opening_balances, verify_checkpoints
+from transactions.services.categorization_service import recategorize_uncategorized
+from transactions.services.ledger_export_service import LEDGER_EXPORT_COLUMNS
+from transactions.services.lookup_cache_service import category_lookup
+from transactions.services.narration_search_service import search_transactions
+from transactions.services.request_profiling_service import PROFILE_CAPTURE_HEADER, prune_profile_captures
+from transactions.services import upload_job_service
+from transactions.services.monthly_report_workbook_service import (
+    MonthPartitions, PeriodReportSections, build_monthly_report_workbook, period_summary_tables,
+)
+from transactions.services.statement_ingest_service import StatementSource, ingest_statement, validate_columns, validate_rows
+from transactions.services.running_balance_service import recalculate_running_balance
+from utils.admin_utils import EstimatedCountPaginator, IndexedDatesQuerySet
+from utils.db_utils import month_filter
+from utils.frame_utils import FrameColumn, queryset_frame
+
+
+class QueryPlanTests(TestCase):
+    """
+    The report queries filter on plain date ranges, so the database can
+    answer them from the composite indexes on Transaction.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.account = PersonalAccount.objects.create(name="Savings")
+        other = PersonalAccount.objects.create(name="Credit Card")
+        start = date(2024, 1, 1)
+        Transaction.objects.bulk_create([
+            Transaction(
+                date=start + timedelta(days=i % 366),
+                narration=f"Row {i}",
+                debit_amount=Decimal("10.00"),
+                credit_amount=Decimal("0.00"),
+                personal_account=cls.account if i % 2 else other,
+                nominal_account="EXPENSE" if i % 3 else "INCOME",
+            )
+            for i in range(500)
+        ])
+
+    def setUp(self):
+        if connection.vendor == "postgresql":
+            # Tiny test tables make a sequential scan cheapest; only check that the index applies
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan TO off")
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, msg=plan)
+
+    def test_month_filter_is_a_date_range(self):
+        sql = str(Transaction.objects.filter(month_filter(2024, 12)).query)
+        self.assertNotIn("EXTRACT", sql.upper())
+        self.assertNotIn("DJANGO_DATE_EXTRACT", sql.upper())
+        self.assertEqual(
+            Transaction.objects.filter(month_filter(2024, 12)).count(),
+            Transaction.objects.filter(date__year=2024, date__month=12).count(),
+        )
+
+    def test_monthly_listing_uses_date_index(self):
+        self.assertUsesIndex(Transaction.objects.filter(month_filter(2024, 3)).order_by("date"), "txn_date_idx")
+
+    def test_account_ledger_uses_account_date_id_index(self):
+        queryset = (
+            Transaction.objects.filter(personal_account=self.account, date__gte=date(2024, 6, 1))
+            .order_by("date", "id")
+            .values_list("date", "id", "debit_amount", "credit_amount", "running_balance")
+        )
+        self.assertUsesIndex(queryset, "txn_account_date_id_idx")
+
+    def test_nominal_account_period_uses_nominal_date_index(self):
+        queryset = Transaction.objects.filter(month_filter(2024, 3), nominal_account="EXPENSE")
+        self.assertUsesIndex(queryset, "txn_nominal_date_idx")
+
+    def test_keyset_page_seeks_date_id_index(self):
+        queryset = (
+            Transaction.objects.filter(Q(date__gt=date(2024, 6, 1)) | Q(date=date(2024, 6, 1), id__gt=250),
+                                       date__gte=date(2024, 6, 1))
+            .order_by("date", "id")[:100]
+        )
+        self.assertUsesIndex(queryset, "txn_date_idx")
+
+
+class TransactionListingTests(TestCase):
+    """
+    Transaction listings read names through joins, so the number of queries
+    does not depend on the number of rows.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.account = PersonalAccount.objects.create(name="Savings")
+        category = Category.objects.create(name="Food")
+        sub_category = SubCategory.objects.create(name="Groceries", category=category)
+        Transaction.objects.bulk_create([
+            Transaction(
+                date=date(2024, 3, 1) + timedelta(days=i % 31),
+                narration=f"Row {i}",
+                debit_amount=Decimal("12.50") if i % 2 else None,
+                credit_amount=None if i % 2 else Decimal("7.00"),
+                category=category if i % 3 else None,
+                sub_category=sub_category if i % 6 == 1 else None,
+                personal_account=cls.account,
+                nominal_account="EXPENSE",
+                running_balance=Decimal(i),
+            )
+            for i in range(60)
+        ])
+
+    def add_rows(self, count):
+        Transaction.objects.bulk_create([
+            Transaction(date=date(2024, 3, 15), narration=f"Extra {i}", debit_amount=Decimal("1.00"),
+                        personal_account=self.account, nominal_account="EXPENSE")
+            for i in range(count)
+        ])
+
+    def test_month_listing_query_count_is_constant(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/transactions/", {"month": 3, "year": 2024})
+        self.assertEqual(len(response.json()), 60)
+
+        self.add_rows(200)
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/transactions/", {"month": 3, "year": 2024})
+        self.assertEqual(len(response.json()), 260)
+
+    def test_page_query_count_is_constant(self):
+        for page_size in (10, 50):
+            with self.assertNumQueries(1):
+                response = self.client.get("/api/transactions/", {"page_size": page_size})
+            self.assertEqual(len(response.json()["results"]), page_size)
+
+    def test_listing_matches_transaction_serializer(self):
+        expected = TransactionSerializer(
+            Transaction.objects.filter(month_filter(2024, 3)).order_by("date", "id"), many=True
+        ).data
+        response = self.client.get("/api/transactions/", {"month": 3, "year": 2024})
+        self.assertEqual(response.json(), [dict(row) for row in expected])
+
+
+class MonthParameterTests(TestCase):
+    def test_month_outside_the_year_is_rejected(self):
+        for name in ("expense-summary", "categorised-expense-summary", "monthly-report",
+                     "monthly_transactions", "monthly-reports-excel"):
+            for month in (0, 13):
+                with self.subTest(name, month=month):
+                    response = self.client.get(reverse(name), {"month": month, "year": 2024})
+                    self.assertEqual(response.status_code, 400)
+
+
+@override_settings(REPORT_SECTION_WORKERS=1)
+class MonthlyReportWorkbookTests(TestCase):
+    def setUp(self):
+        account = PersonalAccount.objects.create(name="Savings")
+        for day, debit in ((5, "12.00"), (6, None), (7, "3.50")):
+            Transaction.objects.create(
+                date=date(2024, 1, day), narration=f"Entry {day}", debit_amount=debit and Decimal(debit),
+                credit_amount=None if debit else Decimal("40.00"), personal_account=account, nominal_account="EXPENSE",
+            )
+
+    def test_tables_keep_their_style(self):
+        sheet = load_workbook(build_monthly_report_workbook(1, 2024)).active
+
+        header = sheet["A1"]
+        self.assertTrue(header.font.b)
+        self.assertEqual(header.fill.fgColor.rgb, "FF4472C4")
+        self.assertEqual(sheet.auto_filter.ref, "A1:I4")
+        # The transactions table is unbanded, with borders on blank cells too
+        self.assertEqual(sheet["C3"].fill.fill_type, None)
+        self.assertEqual(sheet["C3"].border.left.style, "thin")
+        self.assertEqual(sheet["C2"].number_format, '₹ #,##0.00')
+        self.assertEqual(sheet["A2"].number_format, "dd-mm-yyyy")
+        # The summaries band every other row, starting with the first
+        self.assertEqual(sheet["P5"].value, "Account Summary")
+        self.assertEqual(sheet["P6"].fill.fgColor.rgb, "FFD9E1F2")
+
+
+class PeriodReportTests(TestCase):
+    def account(self, name, opening, debit, credit):
+        return {"account_name": name, "opening_balance": Decimal(opening), "debit": Decimal(debit),
+                "credit": Decimal(credit), "closing_balance": Decimal(opening) - Decimal(debit) + Decimal(credit)}
+
+    def test_month_partitions_hand_out_each_month_once(self):
+        rows = [(date(2024, 1, 3), "a"), (date(2024, 1, 9), "b"), (date(2024, 3, 1), "c"), (date(2024, 5, 2), "d")]
+        partitions = MonthPartitions(iter(rows))
+
+        self.assertEqual(list(partitions.rows(2024, 1)), rows[:2])
+        self.assertEqual(list(partitions.rows(2024, 2)), [])
+        self.assertEqual(list(partitions.rows(2024, 3)), [rows[2]])
+        # Rows of a month nobody asked for are skipped
+        self.assertEqual(list(partitions.rows(2024, 6)), [])
+        self.assertEqual(list(partitions.rows(2024, 7)), [])
+
+    def test_summary_covers_missing_accounts_and_empty_months(self):
+        sections = PeriodReportSections(
+            date(2024, 1, 1), date(2024, 3, 1), transactions=[],
+            transaction_counts={(2024, 1): 3, (2024, 2): 1},
+            expense_summaries={
+                (2024, 1): [{"debit": Decimal("15.00"), "credit": Decimal("0.00")}],
+                (2024, 2): [{"debit": Decimal("0.00"), "credit": Decimal("20.00")}],
+                (2024, 3): [],
+            },
+            expense_pivots={},
+            account_summaries=[
+                {"accounts": [self.account("Savings", "100.00", "10.00", "0.00"),
+                              self.account("Card", "0.00", "5.00", "5.00")]},
+                {"accounts": [self.account("Loan", "0.00", "0.00", "30.00"),
+                              self.account("Savings", "90.00", "0.00", "20.00")]},
+                {"accounts": [self.account("Loan", "30.00", "0.00", "0.00"),
+                              self.account("Savings", "110.00", "0.00", "0.00")]},
+            ],
+        )
+        months, accounts = period_summary_tables(sections)
+
+        self.assertEqual([row[:2] for row in months.rows], [["2024-01", 3], ["2024-02", 1], ["2024-03", 0]])
+        self.assertEqual(months.rows[2][2:], [0, 0, 0, Decimal("140.00"), Decimal("140.00")])
+        self.assertEqual([list(row) for row in accounts.rows], [
+            ["Card", Decimal("0.00"), Decimal("5.00"), Decimal("5.00"), Decimal("0.00")],
+            ["Loan", Decimal("0.00"), Decimal("0.00"), Decimal("30.00"), Decimal("30.00")],
+            ["Savings", Decimal("100.00"), Decimal("10.00"), Decimal("20.00"), Decimal("110.00")],
+            ["Total", "", "", "", Decimal("140.00")],
+        ])
+
+    @override_settings(REPORT_MAX_PERIOD_MONTHS=3, REPORT_SECTION_WORKERS=1)
+    def test_period_is_capped(self):
+        for name, params in (("period-reports-excel", {}), ("monthly-report", {"format": "json"})):
+            with self.subTest(name):
+                response = self.client.get(reverse(name), {"from": "2024-01", "to": "2024-04", **params})
+                self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse("period-reports-excel"), {"from": "2024-01", "to": "2024-03"})
+        self.assertEqual(response.status_code, 200)
+
+
+class QuerysetFrameTests(TestCase):
+    def setUp(self):
+        self.savings = PersonalAccount.objects.create(name="Savings")
+        self.card = PersonalAccount.objects.create(name="Card")
+        for i, account in enumerate([self.savings, self.card, self.savings, self.card, self.savings]):
+            Transaction.objects.create(
+                date=date(2024, 1, i + 1), narration=f"Row {i}", debit_amount=Decimal(i) if i % 2 else None,
+                credit_amount=Decimal("2.50"), personal_account=account, nominal_account="EXPENSE",
+            )
+        Transaction.objects.update(running_balance=None)
+
+    def frame(self, labels, chunk_size=2):
+        return queryset_frame(Transaction.objects.order_by("date"), [
+            FrameColumn("Date", "date", "date"),
+            FrameColumn("Narration", "narration"),
+            FrameColumn("Debit", "debit_amount", "float"),
+            FrameColumn("Balance", "running_balance", "float"),
+            FrameColumn("Account", "personal_account_id", labels=labels),
+        ], chunk_size=chunk_size)
+
+    def test_columns_are_typed_across_chunks(self):
+        df = self.frame({self.savings.pk: "Savings", self.card.pk: "Card"})
+
+        self.assertEqual([str(dtype) for dtype in df.dtypes],
+                         ["datetime64[ns]", "object", "float64", "float64", "category"])
+        self.assertEqual(list(df["Date"].dt.day), [1, 2, 3, 4, 5])
+        self.assertEqual(list(df["Narration"]), [f"Row {i}" for i in range(5)])
+        self.assertEqual(df["Debit"].isna().tolist(), [True, False, True, False, True])
+        self.assertTrue(df["Balance"].isna().all())
+        self.assertEqual(list(df["Account"]), ["Savings", "Card", "Savings", "Card", "Savings"])
+
+    def test_unknown_label_values_are_missing(self):
+        df = self.frame({self.savings.pk: "Savings"})
+        self.assertEqual(df["Account"].isna().tolist(), [False, True, False, True, False])
+        self.assertEqual(list(df["Account"].cat.categories), ["Savings"])
+
+    def test_missing_dates_are_nat(self):
+        column = FrameColumn("Date", "date", "date")
+        series = column.series([column.chunk([date(2024, 1, 1), None])])
+        self.assertTrue(pd.isna(series[1]))
+
+    def test_empty_queryset_keeps_the_dtypes(self):
+        Transaction.objects.all().delete()
+        df = self.frame({})
+        self.assertEqual(len(df), 0)
+        self.assertEqual([str(dtype) for dtype in df.dtypes],
+                         ["datetime64[ns]", "object", "float64", "float64", "category"])
+
+
+@override_settings(LEDGER_EXPORT_CHUNK_SIZE=2)
+class LedgerExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        savings = PersonalAccount.objects.create(name="Savings")
+        card = PersonalAccount.objects.create(name="Card")
+        food = Category.objects.create(name="Food")
+        rows = [
+            (date(2024, 1, 5), 'Lunch, "cafe"', "12.50", None, savings, food),
+            (date(2024, 1, 20), "Salary – January", None, "100.00", savings, None),
+            (date(2024, 2, 3), "Groceries", "40.10", None, card, food),
+            (date(2024, 3, 1), "Refund", None, "5.00", card, None),
+        ]
+        for day, narration, debit, credit, account, category in rows:
+            Transaction.objects.create(
+                date=day, narration=narration, debit_amount=debit and Decimal(debit),
+                credit_amount=credit and Decimal(credit), personal_account=account, category=category,
+                nominal_account="EXPENSE",
+            )
+
+    def export(self, **params):
+        response = self.client.get(reverse("ledger-export"), params)
+        self.assertEqual(response.status_code, 200)
+        return response, b"".join(response.streaming_content)
+
+    def listing(self, queryset):
+        rows = TransactionListSerializer.select(queryset.order_by("date", "id"))
+        return [{"id": row["id"], **TransactionListSerializer.to_representation(row)} for row in rows]
+
+    def test_ndjson_matches_the_listing(self):
+        response, content = self.export(format="ndjson")
+
+        self.assertTrue(response["Content-Type"].startswith("application/x-ndjson"))
+        records = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(records, self.listing(Transaction.objects.all()))
+
+    def test_csv_applies_the_filters(self):
+        response, content = self.export(**{"from": "2024-01-10", "to": "2024-02-29", "account": "Savings"})
+
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="ledger_2024-01-10_2024-02-29.csv"')
+        header, *rows = csv.reader(io.StringIO(content.decode()))
+        self.assertEqual(header, list(LEDGER_EXPORT_COLUMNS))
+        expected = self.listing(Transaction.objects.filter(narration="Salary – January"))
+        self.assertEqual([dict(zip(header, row)) for row in rows],
+                         [{field: "" if value is None else str(value) for field, value in row.items()}
+                          for row in expected])
+
+    def test_gzip_round_trip(self):
+        _, plain = self.export(format="ndjson")
+        response, compressed = self.export(format="ndjson", gzip="true")
+
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertTrue(response["Content-Disposition"].endswith('.ndjson.gz"'))
+        self.assertEqual(gzip.decompress(compressed), plain)
+        _, plain_csv = self.export()
+        self.assertEqual(gzip.decompress(self.export(gzip="1")[1]), plain_csv)
+        # Quotes and commas in narrations survive the CSV round trip
+        self.assertEqual(list(csv.reader(io.StringIO(plain_csv.decode())))[1][2], 'Lunch, "cafe"')
+
+    def test_bad_parameters_are_rejected(self):
+        for params in ({"format": "xml"}, {"from": "2024-13-01"}, {"account": "Unknown"}):
+            with self.subTest(**params):
+                self.assertEqual(self.client.get(reverse("ledger-export"), params).status_code, 400)
+
+
+class NarrationSearchTests(TestCase):
+    def setUp(self):
+        self.account = PersonalAccount.objects.create(name="Savings")
+        for narration in ("Salary credit from Acme", "Credit card salary refund", "Swiggy order 1234",
+                          "Swiggy Instamart groceries", "Electricity bill"):
+            self.create(narration)
+
+    def create(self, narration, **fields):
+        return Transaction.objects.create(
+            date=date(2024, 1, 5), narration=narration, debit_amount=Decimal("10.00"),
+            personal_account=self.account, nominal_account="EXPENSE", **fields,
+        )
+
+    def search(self, query, **params):
+        response = self.client.get(reverse("transaction-search"), {"q": query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def narrations(self, query):
+        return sorted(row["narration"] for row in self.search(query)["results"])
+
+    def test_words_phrases_and_prefixes(self):
+        self.assertEqual(self.narrations("salary credit"), ["Credit card salary refund", "Salary credit from Acme"])
+        self.assertEqual(self.narrations('"salary credit"'), ["Salary credit from Acme"])
+        self.assertEqual(self.narrations("swig*"), ["Swiggy Instamart groceries", "Swiggy order 1234"])
+        self.assertEqual(self.narrations('"swiggy inst"*'), ["Swiggy Instamart groceries"])
+        self.assertEqual(self.narrations("swig"), [])
+
+    def test_pages_are_bounded(self):
+        first = self.search("swiggy", page_size=1)
+        self.assertEqual((len(first["results"]), first["next_page"]), (1, 2))
+        self.assertIsNone(self.search("swiggy", page_size=1, page=2)["next_page"])
+        for page in ("0", "abc", "99999999999999999999"):
+            with self.subTest(page=page):
+                response = self.client.get(reverse("transaction-search"), {"q": "swiggy", "page": page})
+                self.assertEqual(response.status_code, 400)
+
+    def test_index_follows_bulk_writes(self):
+        Transaction.objects.bulk_create([
+            Transaction(date=date(2024, 1, 6), narration=f"Zomato order {i}", debit_amount=Decimal("5.00"),
+                        personal_account=self.account, nominal_account="EXPENSE")
+            for i in range(3)
+        ])
+        self.assertEqual(search_transactions("zomato").count(), 3)
+
+        Transaction.objects.filter(narration="Zomato order 0").update(narration="Dinner out")
+        self.assertEqual(search_transactions("zomato").count(), 2)
+        self.assertEqual(search_transactions("dinner").count(), 1)
+
+        Transaction.objects.filter(narration__startswith="Zomato").delete()
+        self.assertEqual(search_transactions("zomato").count(), 0)
+        self.assertEqual(search_transactions("order").count(), 1)
+
+    def test_admin_search_uses_the_index_and_names(self):
+        utilities = Category.objects.create(name="Utilities")
+        self.create("Water board", category=utilities)
+        model_admin = admin.site._registry[Transaction]
+
+        def found(term):
+            queryset, may_have_duplicates = model_admin.get_search_results(None, Transaction.objects.all(), term)
+            self.assertFalse(may_have_duplicates)
+            return sorted(queryset.values_list("narration", flat=True))
+
+        self.assertEqual(found("electricity"), ["Electricity bill"])
+        self.assertEqual(found("utilit"), ["Water board"])
+        self.assertEqual(found("  "), sorted(Transaction.objects.values_list("narration", flat=True)))
+
+
+class RunningBalanceEngineTests(TestCase):
+    """
+    Saves and deletes re-balance only the affected part of a ledger; the
+    result must be what a full recompute of every account gives.
+    """
+
+    def setUp(self):
+        self.savings = PersonalAccount.objects.create(name="Savings")
+        self.card = PersonalAccount.objects.create(name="Credit Card")
+        self.rows = []
+        for i in range(12):
+            row = Transaction(
+                date=date(2024, 1, 1) + timedelta(days=3 * i),
+                narration=f"Row {i}",
+                debit_amount=Decimal("25.00") if i % 3 else Decimal("0.00"),
+                credit_amount=Decimal("0.00") if i % 3 else Decimal("100.00"),
+                personal_account=self.savings if i % 4 else self.card,
+                nominal_account="EXPENSE" if i % 3 else "INCOME",
+            )
+            row.save()
+            self.rows.append(row)
+        self.assertMatchesFullRecompute()
+
+    def balances(self):
+        return dict(Transaction.objects.values_list("id", "running_balance"))
+
+    def assertMatchesFullRecompute(self):
+        incremental = self.balances()
+        rewritten = sum(recalculate_running_balance(account) for account in (self.savings, self.card))
+        self.assertEqual(rewritten, 0)
+        self.assertEqual(self.balances(), incremental)
+
+    def test_insert_in_the_middle_of_the_ledger(self):
+        Transaction.objects.create(
+            date=date(2024, 1, 10), narration="Late entry", debit_amount=Decimal("40.00"),
+            credit_amount=Decimal("0.00"), personal_account=self.savings, nominal_account="EXPENSE",
+        )
+        self.assertMatchesFullRecompute()
+
+    def test_edit_moving_the_date(self):
+        row = self.rows[9]
+        row.date = date(2024, 1, 2)
+        row.save()
+        self.assertMatchesFullRecompute()
+
+        row.date = date(2024, 3, 1)
+        row.save()
+        self.assertMatchesFullRecompute()
+
+    def test_edit_changing_the_account(self):
+        row = self.rows[5]
+        row.personal_account = self.card
+        row.save()
+        self.assertMatchesFullRecompute()
+
+    def test_amount_change(self):
+        row = self.rows[2]
+        row.debit_amount = Decimal("999.99")
+        row.save()
+        self.assertMatchesFullRecompute()
+
+    def test_rebalanced_rows_are_stamped(self):
+        later = self.rows[8]
+        Transaction.objects.filter(pk=later.pk).update(updated_at=timezone.now() - timedelta(days=1))
+        before = Transaction.objects.get(pk=later.pk).updated_at
+        row = self.rows[0]
+        row.credit_amount = Decimal("150.00")
+        row.save()
+        self.assertGreater(Transaction.objects.get(pk=later.pk).updated_at, before)
+
+    def test_delete(self):
+        self.rows[1].delete()
+        self.rows[6].delete()
+        self.assertMatchesFullRecompute()
+
+
+class MonthlyRollupTests(TestCase):
+    def setUp(self):
+        self.account = PersonalAccount.objects.create(name="Savings")
+        self.key = dict(year=2024, month=1, personal_account=self.account, nominal_account="EXPENSE")
+
+    def test_rollup_key_is_unique_without_a_category(self):
+        MonthlyRollup.objects.create(**self.key)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            MonthlyRollup.objects.create(**self.key)
+
+    def test_uncategorized_transactions_share_one_row(self):
+        for amount in ("10.00", "15.50"):
+            Transaction.objects.create(
+                date=date(2024, 1, 5), narration="Coffee", debit_amount=Decimal(amount),
+                credit_amount=Decimal("0.00"), personal_account=self.account, nominal_account="EXPENSE",
+            )
+        rollup = MonthlyRollup.objects.get(**self.key)
+        self.assertEqual((rollup.transaction_count, rollup.debit_total), (2, Decimal("25.50")))
+
+
+class BalanceCheckpointTests(TestCase):
+    def setUp(self):
+        self.account = PersonalAccount.objects.create(name="Savings")
+
+    def create(self, day, debit="0.00", credit="0.00"):
+        return Transaction.objects.create(
+            date=day, narration="Entry", debit_amount=Decimal(debit), credit_amount=Decimal(credit),
+            personal_account=self.account, nominal_account="EXPENSE",
+        )
+
+    def test_zero_amount_transaction_opens_its_month(self):
+        self.create(date(2024, 1, 5), credit="50.00")
+        self.create(date(2024, 2, 5))
+        self.assertEqual(verify_checkpoints(), [])
+
+    def test_edits_and_deletes_stay_consistent(self):
+        first = self.create(date(2024, 1, 5), credit="50.00")
+        second = self.create(date(2024, 3, 5), debit="20.00")
+        second.date = date(2024, 2, 10)
+        second.save()
+        first.debit_amount, first.credit_amount = Decimal("5.00"), Decimal("0.00")
+        first.save()
+        self.create(date(2024, 4, 1)).delete()
+        self.assertEqual(verify_checkpoints(), [])
+
+    def test_missing_checkpoints_are_built_on_first_use(self):
+        Transaction.objects.bulk_create([
+            Transaction(date=date(2024, 1, 5), narration="Salary", debit_amount=Decimal("0.00"),
+                        credit_amount=Decimal("100.00"), personal_account=self.account, nominal_account="INCOME"),
+            Transaction(date=date(2024, 2, 5), narration="Rent", debit_amount=Decimal("30.00"),
+                        credit_amount=Decimal("0.00"), personal_account=self.account, nominal_account="EXPENSE"),
+        ])
+        self.addCleanup(setattr, balance_checkpoint_service, "_checkpoints_ready", False)
+        balance_checkpoint_service._checkpoints_ready = False
+
+        self.assertEqual(opening_balances(date(2024, 3, 1))[self.account.pk], Decimal("70.00"))
+        self.assertEqual(verify_checkpoints(), [])
+
+    def test_checkpoint_created_concurrently_still_gets_the_amount(self):
+        self.create(date(2024, 1, 5), credit="50.00")
+
+        def created_elsewhere(account_id, month):
+            # Another writer inserts the month between the check and the create
+            AccountBalanceCheckpoint.objects.create(
+                personal_account_id=account_id, month=month, closing_balance=Decimal("50.00"),
+            )
+            return Decimal("50.00")
+
+        with mock.patch.object(balance_checkpoint_service, "closing_balance_before", side_effect=created_elsewhere):
+            self.create(date(2024, 2, 5), credit="10.00")
+        self.assertEqual(verify_checkpoints(), [])
+
+
+class RecategorizeTests(TestCase):
+    def setUp(self):
+        self.account = PersonalAccount.objects.create(name="Savings")
+        self.food = Category.objects.create(name="Food")
+        self.snacks = SubCategory.objects.create(name="Snacks", category=self.food)
+
+    def create(self, narration, **fields):
+        return Transaction.objects.create(
+            date=date(2024, 1, 5), narration=narration, debit_amount=Decimal("12.00"),
+            credit_amount=Decimal("0.00"), personal_account=self.account, nominal_account="EXPENSE", **fields,
+        )
+
+    def test_nominal_only_rule_keeps_the_sub_category(self):
+        row = self.create("Refund from store", sub_category=self.snacks)
+        CategorizationRule.objects.create(name="Refunds", pattern="refund", nominal_account="INCOME")
+
+        self.assertEqual(recategorize_uncategorized(), (1, 1))
+        row.refresh_from_db()
+        self.assertEqual((row.nominal_account, row.sub_category_id), ("INCOME", self.snacks.pk))
+
+    def test_each_batch_refreshes_the_rollups(self):
+        for i in range(3):
+            self.create(f"Pizza place {i}")
+        CategorizationRule.objects.create(name="Pizza", pattern="pizza", sub_category=self.snacks)
+
+        self.assertEqual(recategorize_uncategorized(batch_size=2), (3, 3))
+        rollup = MonthlyRollup.objects.get()
+        self.assertEqual((rollup.category_id, rollup.sub_category_id, rollup.transaction_count),
+                         (self.food.pk, self.snacks.pk, 3))
+
+
+class StatementValidationTests(TestCase):
+    """The columnar and the per-row upload validation accept the same rows the same way."""
+
+    def setUp(self):
+        PersonalAccount.objects.create(name="Savings")
+
+    def chunk(self, debits, credits):
+        return pd.DataFrame({
+            "Date": pd.to_datetime(["2024-01-05"] * len(debits)),
+            "Narration": [f"Row {i}" for i in range(len(debits))],
+            "Debit Amount": debits,
+            "Credit Amount": credits,
+            "Category": ["Food", None, "Food"][:len(debits)],
+            "Sub Category": [None] * len(debits),
+            "Personal Account": ["Savings"] * len(debits),
+            "Nominal Account": ["expense"] * len(debits),
+        })
+
+    @staticmethod
+    def fields(rows):
+        return [
+            (row.date, row.narration, Decimal(row.debit_amount), Decimal(row.credit_amount),
+             row.category_id, row.personal_account_id, row.nominal_account)
+            for row in rows
+        ]
+
+    def test_paths_agree_on_text_amounts(self):
+        chunk = self.chunk(["12.50", 20, None], [5.25, None, "abc"])
+        column_errors, column_rows = validate_columns(chunk)
+        row_errors, row_rows = validate_rows(chunk)
+
+        self.assertEqual(sorted(column_errors), sorted(row_errors))
+        self.assertEqual(sorted(column_errors), [2])
+
+    def test_paths_agree_on_valid_rows(self):
+        chunk = self.chunk(["12.50", 20.456, None], [5.25, None, 7])
+        column_errors, column_rows = validate_columns(chunk)
+        row_errors, row_rows = validate_rows(chunk)
+
+        self.assertEqual((column_errors, row_errors), ({}, {}))
+        self.assertEqual(self.fields(column_rows), self.fields(row_rows))
+        self.assertEqual(self.fields(column_rows)[0][2:4], (Decimal("0"), Decimal("5.25")))
+
+
+class NameLookupTests(TestCase):
+    def test_rolled_back_names_are_not_cached(self):
+        category_lookup.ids()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Category.objects.create(name="Ghost")
+            self.assertIsNotNone(category_lookup.id_for("Ghost"))
+            raise RuntimeError
+        self.assertIsNone(category_lookup.id_for("Ghost"))
+
+    def test_savepoint_rollback_keeps_the_outer_transaction_names(self):
+        kept = Category.objects.create(name="Kept")
+        self.assertEqual(category_lookup.id_for("Kept"), kept.pk)
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Category.objects.create(name="Ghost")
+            category_lookup.ids()
+            raise RuntimeError
+        self.assertEqual(category_lookup.ids(), {"Kept": kept.pk})
+
+
+STATEMENT_HEADER = "Date,Narration,Debit Amount,Credit Amount,Category,Sub Category,Personal Account,Nominal Account\n"
+
+
+class UploadJobTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, UPLOAD_CHUNK_SIZE=1)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        PersonalAccount.objects.create(name="Savings")
+
+    def submit(self, *lines):
+        content = (STATEMENT_HEADER + "".join(line + "\n" for line in lines)).encode()
+        return upload_job_service.submit_upload_job(SimpleUploadedFile("statement.csv", content))
+
+    def status(self, job):
+        return self.client.get(reverse("upload-job-detail", args=[job.pk])).json()
+
+    def test_completed_job(self):
+        job = self.submit(
+            "05-01-2024,Salary,,1000,,,Savings,Income",
+            "06-01-2024,Groceries,40.5,,Food,,Savings,Expense",
+        )
+        self.assertEqual(job.status, UploadJob.PENDING)
+        self.assertTrue(os.path.exists(job.file_path))
+
+        progress = caches["upload_progress"]
+        with mock.patch.object(progress, "set", wraps=progress.set) as publish:
+            upload_job_service.run_upload_job(job.pk)
+        self.assertEqual([call.args[1]["rows_parsed"] for call in publish.call_args_list], [1, 2])
+
+        body = self.status(job)
+        self.assertEqual((body["status"], body["rows_inserted"], body["error_file_url"]), (UploadJob.COMPLETED, 2, None))
+        self.assertIsNotNone(body["finished_at"])
+        self.assertFalse(os.path.exists(job.file_path))
+        self.assertEqual(Transaction.objects.count(), 2)
+
+    def test_invalid_job_serves_its_error_file(self):
+        job = self.submit("05-01-2024,Salary,,1000,,,Savings,Income", "bad date,Groceries,40.5,,,,Savings,Expense")
+        upload_job_service.run_upload_job(job.pk)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_with_errors, job.rows_inserted), (UploadJob.INVALID, 1, 0))
+        self.assertEqual(Transaction.objects.count(), 0)
+
+        response = self.client.get(reverse("upload-job-errors", args=[job.pk]))
+        self.assertEqual(response.status_code, 200)
+        content = b"".join(response.streaming_content).decode()
+        self.assertIn("Date has wrong format", content)
+        response.close()
+
+    def test_error_file_missing(self):
+        job = self.submit("05-01-2024,Salary,,1000,,,Savings,Income")
+        response = self.client.get(reverse("upload-job-errors", args=[job.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_running_job_reports_live_progress(self):
+        job = self.submit("05-01-2024,Salary,,1000,,,Savings,Income")
+        UploadJob.objects.filter(pk=job.pk).update(status=UploadJob.RUNNING)
+        caches["upload_progress"].set(upload_job_service._progress_key(job.pk), {"rows_parsed": 7, "rows_validated": 5})
+        self.addCleanup(caches["upload_progress"].delete, upload_job_service._progress_key(job.pk))
+
+        body = self.status(job)
+        self.assertEqual((body["status"], body["rows_parsed"], body["rows_validated"]), (UploadJob.RUNNING, 7, 5))
+
+    def test_job_of_a_dead_worker_is_interrupted(self):
+        finished = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+        host = upload_job_service.WORKER_ID.rpartition(":")[0]
+        job = self.submit("05-01-2024,Salary,,1000,,,Savings,Income")
+        UploadJob.objects.filter(pk=job.pk).update(status=UploadJob.RUNNING, worker=f"{host}:{finished.stdout.strip()}")
+
+        body = self.status(job)
+        self.assertEqual(body["status"], UploadJob.INTERRUPTED)
+        self.assertIn("stopped before the job finished", body["message"])
+
+    def test_list_limit_must_be_positive(self):
+        response = self.client.get(reverse("upload-jobs"), {"limit": 0})
+        self.assertEqual(response.status_code, 400)
+
+
+class DuplicateUploadTests(TestCase):
+    def setUp(self):
+        self.account = PersonalAccount.objects.create(name="Savings")
+        self.food = Category.objects.create(name="Food")
+        self.snacks = SubCategory.objects.create(name="Snacks", category=self.food)
+
+    def upload(self, *lines, on_duplicate="skip", header=STATEMENT_HEADER):
+        content = (header + "".join(line + "\n" for line in lines)).encode()
+        return ingest_statement(StatementSource(io.BytesIO(content), "statement.csv"), on_duplicate=on_duplicate)
+
+    def test_repeated_rows_are_skipped(self):
+        first = self.upload("05-01-2024,Pizza,12.5,,,,Savings,Expense", "06-01-2024,Salary,,900,,,Savings,Income")
+        again = self.upload(
+            "05-01-2024,Pizza,12.5,,,,Savings,Expense",
+            "06-01-2024,Salary,,900,,,Savings,Income",
+            "07-01-2024,Bus,2,,,,Savings,Expense",
+            "07-01-2024,Bus,2,,,,Savings,Expense",
+        )
+        self.assertEqual((first.rows_inserted, first.rows_skipped), (2, 0))
+        self.assertEqual((again.rows_inserted, again.rows_skipped, again.rows_updated), (1, 3, 0))
+        self.assertEqual(Transaction.objects.count(), 3)
+
+    def test_update_keeps_what_the_upload_leaves_empty(self):
+        self.upload("05-01-2024,Pizza,12.5,,Food,Snacks,Savings,Expense")
+        row = Transaction.objects.get()
+        Transaction.objects.filter(pk=row.pk).update(updated_at=timezone.now() - timedelta(days=1))
+        header = "Date,Narration,Debit Amount,Credit Amount,Personal Account,Nominal Account\n"
+
+        unchanged = self.upload("05-01-2024,Pizza,12.5,,Savings,Expense", on_duplicate="update", header=header)
+        self.assertEqual((unchanged.rows_updated, unchanged.rows_skipped), (0, 1))
+
+        moved = self.upload("05-01-2024,Pizza,12.5,,Savings,Home", on_duplicate="update", header=header)
+        self.assertEqual((moved.rows_updated, moved.rows_skipped), (1, 0))
+        stored = Transaction.objects.get()
+        self.assertEqual((stored.category_id, stored.sub_category_id, stored.nominal_account),
+                         (self.food.pk, self.snacks.pk, "HOME"))
+        self.assertGreater(stored.updated_at, row.updated_at)
+
+    def test_update_applies_rules_before_comparing(self):
+        self.upload("05-01-2024,Pizza place,12.5,,,,Savings,Expense")
+        CategorizationRule.objects.create(name="Pizza", pattern="pizza", sub_category=self.snacks)
+
+        result = self.upload("05-01-2024,Pizza place,12.5,,,,Savings,Expense", on_duplicate="update")
+        self.assertEqual(result.rows_updated, 1)
+        stored = Transaction.objects.get()
+        self.assertEqual((stored.category_id, stored.sub_category_id), (self.food.pk, self.snacks.pk))
+
+
+class RequestProfilingTests(TestCase):
+    def setUp(self):
+        self.profiles_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profiles_dir, ignore_errors=True)
+        settings_override = override_settings(
+            REQUEST_PROFILING_ENABLED=True, PROFILES_DIR=self.profiles_dir, PROFILE_CAPTURES_KEEP=2,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def login(self, is_staff):
+        user = User.objects.create_user("user", password="secret", is_staff=is_staff)
+        self.client.force_login(user)
+        return user
+
+    def get(self, **extra):
+        return self.client.get(reverse("monthly_transactions"), {"month": 1, "year": 2024, **extra.pop("params", {})},
+                               **extra)
+
+    def test_only_staff_may_profile(self):
+        self.assertNotIn(PROFILE_CAPTURE_HEADER, self.get(params={"profile": "1"}))
+        self.login(is_staff=False)
+        self.assertNotIn(PROFILE_CAPTURE_HEADER, self.get(HTTP_X_PROFILE="1"))
+        self.assertFalse(ProfileCapture.objects.exists())
+
+    def test_profiled_request_is_captured(self):
+        user = self.login(is_staff=True)
+        self.assertNotIn(PROFILE_CAPTURE_HEADER, self.get(params={"profile": "no"}))
+
+        response = self.get(params={"profile": "1"})
+        self.assertEqual(response.status_code, 200)
+        capture = ProfileCapture.objects.get(pk=response[PROFILE_CAPTURE_HEADER])
+        self.assertEqual((capture.view_name, capture.user, capture.status_code, capture.profiler),
+                         ("monthly_transactions", user, 200, ProfileCapture.CPROFILE))
+        self.assertTrue(os.path.exists(capture.profile_file))
+        with open(capture.collapsed_file) as handle:
+            self.assertIn("monthly_transactions", handle.read())
+
+        capture = ProfileCapture.objects.get(pk=self.get(HTTP_X_PROFILE="sampling")[PROFILE_CAPTURE_HEADER])
+        self.assertEqual((capture.profiler, capture.profile_file), (ProfileCapture.SAMPLING, ""))
+        self.assertTrue(os.path.exists(capture.collapsed_file))
+
+    def test_old_captures_are_pruned_with_their_files(self):
+        self.login(is_staff=True)
+        captures = [ProfileCapture.objects.get(pk=self.get(params={"profile": "1"})[PROFILE_CAPTURE_HEADER])
+                    for _ in range(3)]
+
+        self.assertEqual(list(ProfileCapture.objects.order_by("id")), captures[1:])
+        self.assertFalse(os.path.exists(captures[0].profile_file))
+        self.assertFalse(os.path.exists(captures[0].collapsed_file))
+
+        self.assertEqual(prune_profile_captures(0), 2)
+        self.assertEqual(os.listdir(self.profiles_dir), [])
+
+
+class TransactionAdminTests(TestCase):
+    def setUp(self):
+        self.savings = PersonalAccount.objects.create(name="Savings")
+        self.card = PersonalAccount.objects.create(name="Card")
+        # Without signals, so no running balance is set
+        Transaction.objects.bulk_create([
+            Transaction(date=day, narration=f"Row {i}", debit_amount=Decimal("5.00") if i % 2 else None,
+                        credit_amount=None if i % 2 else Decimal("20.00"),
+                        personal_account=self.card if i % 3 == 2 else self.savings, nominal_account="EXPENSE")
+            for i, day in enumerate([date(2023, 1, 9), date(2024, 3, 1), date(2024, 3, 2), date(2024, 3, 20),
+                                     date(2024, 4, 5), date(2024, 4, 6), date(2024, 4, 7), date(2024, 4, 8)])
+        ])
+        self.admin = User.objects.create_superuser("admin", password="secret")
+
+    def paginator(self, queryset, current_page=1, pages_ahead=1):
+        paginator = EstimatedCountPaginator(queryset.order_by("-date", "-id"), 2, current_page=current_page)
+        paginator.pages_ahead = pages_ahead
+        return paginator
+
+    def test_count_is_exact_within_the_window(self):
+        paginator = self.paginator(Transaction.objects.all(), current_page=3)
+        self.assertEqual((paginator.count, paginator.count_bound), (8, EstimatedCountPaginator.EXACT))
+        self.assertEqual(len(paginator.page(4).object_list), 2)
+
+    def test_long_unfiltered_count_is_the_largest_key(self):
+        Transaction.objects.filter(narration="Row 3").delete()
+        paginator = self.paginator(Transaction.objects.all())
+
+        last = Transaction.objects.order_by("-pk").first().pk
+        self.assertEqual((paginator.count, paginator.count_bound), (last, EstimatedCountPaginator.AT_MOST))
+        self.assertEqual(len(paginator.page(3).object_list), 2)
+
+    def test_long_filtered_count_grows_with_the_page(self):
+        queryset = Transaction.objects.filter(nominal_account="EXPENSE")
+        paginator = self.paginator(queryset)
+        self.assertEqual((paginator.count, paginator.count_bound), (5, EstimatedCountPaginator.AT_LEAST))
+        # The last page in reach is a full one, not the one row past the window
+        self.assertEqual([row.narration for row in paginator.page(3).object_list], ["Row 3", "Row 2"])
+
+        paginator = self.paginator(queryset, current_page=3)
+        self.assertEqual((paginator.count, paginator.count_bound), (8, EstimatedCountPaginator.EXACT))
+
+    def test_changelist_labels_the_count(self):
+        self.client.force_login(self.admin)
+        url = reverse("admin:transactions_transaction_changelist")
+        with mock.patch.object(admin.site._registry[Transaction], "list_per_page", 2), \
+                mock.patch.object(EstimatedCountPaginator, "pages_ahead", 1):
+            self.assertContains(self.client.get(url, {"nominal_account__exact": "EXPENSE"}), "at least 5 transactions")
+            self.assertContains(self.client.get(url, {"nominal_account__exact": "EXPENSE", "p": 3}), "\n8 transactions")
+
+    def test_dates_are_probed_per_period(self):
+        queryset = IndexedDatesQuerySet(model=Transaction)
+        for kind in ("year", "month"):
+            for order in ("ASC", "DESC"):
+                with self.subTest(kind=kind, order=order):
+                    self.assertEqual(queryset.dates("date", kind, order),
+                                     list(Transaction.objects.dates("date", kind, order)))
+        # The bounds, then one existence check per month from January 2023 to April 2024
+        with self.assertNumQueries(1 + 16):
+            self.assertEqual(len(queryset.dates("date", "month")), 3)
+        self.assertEqual(queryset.filter(narration="None such").dates("date", "month"), [])
+
+    def test_recalculate_balances_action(self):
+        Transaction.objects.filter(narration="Row 0").update(running_balance=Decimal("20.00"))
+        selected = Transaction.objects.filter(personal_account=self.savings, date__gte=date(2024, 3, 1))
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse("admin:transactions_transaction_changelist"), {
+            "action": "recalculate_balances", "_selected_action": list(selected.values_list("pk", flat=True)),
+        })
+        self.assertEqual(response.status_code, 302)
+
+        balances = Transaction.objects.filter(personal_account=self.savings).order_by("date", "id")
+        # Carried on from the balance before the earliest selected date
+        self.assertEqual([row.running_balance for row in balances],
+                         [Decimal("20.00"), Decimal("15.00"), Decimal("10.00"), Decimal("30.00"), Decimal("50.00"),
+                          Decimal("45.00")])
+        self.assertFalse(Transaction.objects.filter(personal_account=self.card).exclude(running_balance=None).exists())
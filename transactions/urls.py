@@ -1,14 +1,22 @@
 from django.urls import path
 
 from .views import upload_transactions, account_summary_report,  \
-monthly_transactions, expense_summary, categorised_expense_summary, \
-monthly_reports_excel
+monthly_transactions, transaction_search, expense_summary, categorised_expense_summary, \
+monthly_reports_excel, period_reports_excel, upload_jobs, upload_job_detail, upload_job_errors, report_cache, ledger_export, metrics
 
 urlpatterns = [
     path('api/upload-transactions/', upload_transactions, name='upload-transactions'),
+    path('api/upload-jobs/', upload_jobs, name='upload-jobs'),
+    path('api/upload-jobs/<int:job_id>/', upload_job_detail, name='upload-job-detail'),
+    path('api/upload-jobs/<int:job_id>/errors/', upload_job_errors, name='upload-job-errors'),
     path('api/account-summary-report/', account_summary_report, name='monthly-report'),
     path('api/expense-summary/', expense_summary, name='expense-summary'),
     path('api/categorised-expense-summary/', categorised_expense_summary, name='categorised-expense-summary'),
     path('api/transactions/', monthly_transactions, name='monthly_transactions'),
+    path('api/transactions/search/', transaction_search, name='transaction-search'),
     path('api/monthly-reports/', monthly_reports_excel, name='monthly-reports-excel'),
+    path('api/period-reports/', period_reports_excel, name='period-reports-excel'),
+    path('api/report-cache/', report_cache, name='report-cache'),
+    path('api/ledger-export/', ledger_export, name='ledger-export'),
+    path('api/metrics', metrics, name='metrics'),
 ]
\ No newline at end of file
@@ -3,4 +3,8 @@ from .accounts_summary_report_view import *
 from .transactions_view import *
 from .expense_summary_report_view import *
 from .categorised_expense_summary_view import *
-from .complete_report_view import *
\ No newline at end of file
+from .complete_report_view import *
+from .upload_jobs_view import *
+from .report_cache_view import *
+from .ledger_export_view import *
+from .metrics_view import *
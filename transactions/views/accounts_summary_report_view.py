@@ -1,7 +1,14 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from django.conf import settings
 from django.http import HttpResponse
-from ..services.account_summary_service import get_account_summary_report, get_account_summary_report_data
+from ..services.account_summary_service import (
+    get_account_summary_range_data,
+    get_account_summary_range_report,
+    get_account_summary_report,
+    get_account_summary_report_data,
+)
+from utils.datetime_utils import month_count, parse_month
 import pandas as pd
 import io
 
@@ -11,12 +18,22 @@ def account_summary_report(request):
     """
     Generate a monthly report of transactions for each account.
     Returns the report in JSON, Excel, or CSV format based on the 'format' query parameter.
+
+    Pass 'from' and 'to' (YYYY-MM) instead of 'month' and 'year' for every
+    month of a range; JSON then lists the account summaries per month, Excel
+    and CSV add a Month column. The range may cover at most
+    REPORT_MAX_PERIOD_MONTHS months.
     """
     # Get query parameters
     month = request.GET.get("month")
     year = request.GET.get("year")
+    period_from = request.GET.get("from")
+    period_to = request.GET.get("to")
     output_format = request.GET.get("format", "json").lower()  # Default to JSON
 
+    if period_from or period_to:
+        return _account_summary_range_report(period_from, period_to, output_format)
+
     if not month or not year:
         return Response({"error": "Please provide both month and year."}, status=400)
 
@@ -26,6 +43,9 @@ def account_summary_report(request):
     except ValueError:
         return Response({"error": "Month and year must be integers."}, status=400)
 
+    if month_int < 1 or month_int > 12:
+        return Response({"error": "Month should be between 1 and 12"}, status=400)
+
     if output_format == "json":
         # Fetch the data
         report_data = get_account_summary_report_data(month_int, year_int)
@@ -35,9 +55,49 @@ def account_summary_report(request):
             # Return raw keys for JSON
         return Response(report_data, status=200)
 
+    if output_format in ("excel", "csv"):
+        df = get_account_summary_report(month_int, year_int)
+        return _report_file(df, output_format, f"monthly_report_{month}_{year}")
+
+    else:
+        return Response({"error": "Unsupported format. Use 'json', 'excel', or 'csv'."}, status=400)
+
+
+def _account_summary_range_report(period_from, period_to, output_format):
+    if not period_from or not period_to:
+        return Response({"error": "Please provide both from and to."}, status=400)
+
+    try:
+        start = parse_month(period_from)
+        end = parse_month(period_to)
+    except ValueError:
+        return Response({"error": "From and to must be months formatted as YYYY-MM."}, status=400)
+
+    if start > end:
+        return Response({"error": "From must not be after to."}, status=400)
+
+    if month_count(start, end) > settings.REPORT_MAX_PERIOD_MONTHS:
+        return Response(
+            {"error": f"A period may cover at most {settings.REPORT_MAX_PERIOD_MONTHS} months."}, status=400
+        )
+
+    if output_format == "json":
+        report_data = get_account_summary_range_data(start, end)
+
+        if not any(period["accounts"] for period in report_data):
+            return Response({"error": "No data available for the given period."}, status=404)
+        return Response(report_data, status=200)
+
+    if output_format in ("excel", "csv"):
+        df = get_account_summary_range_report(start, end)
+        return _report_file(df, output_format, f"monthly_report_{period_from}_{period_to}")
+
+    return Response({"error": "Unsupported format. Use 'json', 'excel', or 'csv'."}, status=400)
+
+
+def _report_file(df, output_format, file_name):
     if output_format == "excel":
         # Generate an Excel file
-        df = get_account_summary_report(month, year)
         with io.BytesIO() as buffer:
             with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
                 df.to_excel(writer, index=False, sheet_name="Report")
@@ -46,21 +106,16 @@ def account_summary_report(request):
                 buffer,
                 content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             )
-            response["Content-Disposition"] = f'attachment; filename="monthly_report_{month}_{year}.xlsx"'
+            response["Content-Disposition"] = f'attachment; filename="{file_name}.xlsx"'
             return response
 
-    elif output_format == "csv":
-        # Generate a CSV file
-        df = get_account_summary_report(month, year)
-        with io.StringIO() as buffer:
-            df.to_csv(buffer, index=False)
-            buffer.seek(0)
-            response = HttpResponse(
-                buffer,
-                content_type="text/csv",
-            )
-            response["Content-Disposition"] = f'attachment; filename="monthly_report_{month}_{year}.csv"'
-            return response
-
-    else:
-        return Response({"error": "Unsupported format. Use 'json', 'excel', or 'csv'."}, status=400)
\ No newline at end of file
+    # Generate a CSV file
+    with io.StringIO() as buffer:
+        df.to_csv(buffer, index=False)
+        buffer.seek(0)
+        response = HttpResponse(
+            buffer,
+            content_type="text/csv",
+        )
+        response["Content-Disposition"] = f'attachment; filename="{file_name}.csv"'
+        return response
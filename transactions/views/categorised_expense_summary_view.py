@@ -20,6 +20,9 @@ def categorised_expense_summary(request):
         year = int(year)
     except ValueError:
         return JsonResponse({"error": "Month and year must be integers."}, status=400)
+
+    if month < 1 or month > 12:
+        return JsonResponse({"error": "Month should be between 1 and 12"}, status=400)
     
     data = categorised_expense_summary_data(month, year)
 
@@ -22,6 +22,9 @@ def expense_summary(request):
     except ValueError:
         return JsonResponse({"error": "Month and year must be integers."}, status=400)
 
+    if month < 1 or month > 12:
+        return JsonResponse({"error": "Month should be between 1 and 12"}, status=400)
+
     expense_data = expense_summary_data(month, year)
 
     return JsonResponse(expense_data, safe=False)
\ No newline at end of file
@@ -0,0 +1,65 @@
+from datetime import date
+
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework.decorators import api_view
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework import status
+
+from transactions.services.ledger_export_service import (
+    LEDGER_EXPORT_FORMATS,
+    csv_chunks,
+    gzip_chunks,
+    ledger_queryset,
+    ledger_rows,
+    ndjson_chunks,
+)
+from transactions.services.lookup_cache_service import personal_account_lookup
+
+
+@api_view(["GET"])
+def ledger_export(request: Request) -> HttpResponse:
+    """
+    Stream the ledger as CSV or newline-delimited JSON, in (date, id) order.
+
+    Query parameters:
+    - format: 'csv' (default) or 'ndjson'
+    - from, to: optional first and last day (YYYY-MM-DD)
+    - account: personal account name, repeatable; all accounts by default
+    - gzip: 'true' to download a gzip-compressed file
+
+    Rows are read through a chunked cursor and written out as they arrive,
+    so memory stays flat however large the export is.
+    """
+    output_format = request.GET.get("format", "csv").lower()
+    if output_format not in LEDGER_EXPORT_FORMATS:
+        return Response({"error": "Unsupported format. Use 'csv' or 'ndjson'."}, status=status.HTTP_400_BAD_REQUEST)
+
+    period_from = request.GET.get("from")
+    period_to = request.GET.get("to")
+    try:
+        start = date.fromisoformat(period_from) if period_from else None
+        end = date.fromisoformat(period_to) if period_to else None
+    except ValueError:
+        return Response({"error": "From and to must be dates formatted as YYYY-MM-DD."},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    account_ids = []
+    for account in request.GET.getlist("account"):
+        account_id = personal_account_lookup.id_for(account.strip())
+        if account_id is None:
+            return Response({"error": f"Unknown account: {account}."}, status=status.HTTP_400_BAD_REQUEST)
+        account_ids.append(account_id)
+
+    rows = ledger_rows(ledger_queryset(start, end, account_ids))
+    chunks = csv_chunks(rows) if output_format == "csv" else ndjson_chunks(rows)
+    content_type, extension = LEDGER_EXPORT_FORMATS[output_format]
+    file_name = f"ledger_{period_from or 'start'}_{period_to or 'end'}.{extension}"
+
+    if request.GET.get("gzip", "").lower() in ("1", "true", "yes"):
+        response = StreamingHttpResponse(gzip_chunks(chunks), content_type="application/gzip")
+        file_name += ".gz"
+    else:
+        response = StreamingHttpResponse(chunks, content_type=f"{content_type}; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{file_name}"'
+    return response
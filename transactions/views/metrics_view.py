@@ -0,0 +1,14 @@
+from django.http import HttpResponse
+from rest_framework.decorators import api_view
+
+from ..services.request_metrics_service import METRICS_CONTENT_TYPE, request_metrics
+
+
+@api_view(["GET"])
+def metrics(request):
+    """
+    API exposing this process's per-view request metrics (latency, SQL
+    statements and time, response size, peak memory) in the Prometheus text
+    format, for scraping.
+    """
+    return HttpResponse(request_metrics.render(), content_type=METRICS_CONTENT_TYPE)
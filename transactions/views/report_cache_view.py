@@ -0,0 +1,14 @@
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework import status
+
+from ..services.report_cache_service import report_cache_stats
+
+
+@api_view(["GET"])
+def report_cache(request):
+    """
+    API to report hit and miss counters of the report cache, per report.
+    Pass 'report' to get a single report's counters.
+    """
+    return Response(report_cache_stats(request.GET.get("report")), status=status.HTTP_200_OK)
@@ -1,8 +1,20 @@
+from datetime import date
+
+from django.conf import settings
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 from transactions.models import Transaction
-from transactions.serializers import TransactionSerializer
+from transactions.serializers import TransactionListSerializer
+from transactions.serializers.transaction_serializer import NOMINAL_ACCOUNT_MAP
+from transactions.services.lookup_cache_service import category_lookup, personal_account_lookup
+from transactions.services.narration_search_service import parse_search_query, search_transactions
+from transactions.services.transaction_page_service import InvalidCursor, keyset_page
+from utils.db_utils import month_filter
+
+# Query parameters that switch the listing to cursor pagination
+PAGINATION_PARAMS = ("cursor", "page_size", "from", "to", "account", "category", "nominal_account")
+
 
 @api_view(["GET"])
 def monthly_transactions(request):
@@ -10,7 +22,16 @@ def monthly_transactions(request):
     API to fetch transactions for a given month and year.
     Returns columns: Date, Narration, Debit Amount, Credit Amount, Category,
     Sub Category, Personal Account, Nominal Account, and Running Balance.
+
+    With any of 'cursor', 'page_size', 'from', 'to' (YYYY-MM-DD), 'account',
+    'category' or 'nominal_account' the transactions are returned a page at
+    a time in (date, id) order as {"results": [...], "next_cursor": ...};
+    'month' and 'year' are then optional. Pass 'next_cursor' back as 'cursor' for the
+    next page; it is null on the last one.
     """
+    if any(param in request.GET for param in PAGINATION_PARAMS):
+        return _transactions_page(request)
+
     # Extract month and year from query parameters
     month = request.GET.get('month')
     year = request.GET.get('year')
@@ -24,12 +45,133 @@ def monthly_transactions(request):
     except ValueError:
         return Response({"error": "'month' and 'year' must be valid integers."}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Query transactions for the given month and year
-    transactions = Transaction.objects.filter(
-        date__year=year,
-        date__month=month
+    if month < 1 or month > 12:
+        return Response({"error": "Month should be between 1 and 12"}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Query transactions for the given month and year, names joined in
+    transactions = TransactionListSerializer.select(
+        Transaction.objects.filter(month_filter(year, month)).order_by('date', 'id')
     )
 
     # Serialize the data
-    serializer = TransactionSerializer(transactions, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+    serializer = TransactionListSerializer(transactions)
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+def _filter_transactions(request, transactions):
+    """
+    Apply the listing filters in the query parameters to ``transactions``;
+    raises ValueError with the message for the client on a bad value.
+    """
+    month = request.GET.get('month')
+    year = request.GET.get('year')
+    if month or year:
+        try:
+            transactions = transactions.filter(month_filter(int(year), int(month)))
+        except (TypeError, ValueError):
+            raise ValueError("'month' and 'year' must be valid integers.")
+
+    period_from = request.GET.get('from')
+    period_to = request.GET.get('to')
+    try:
+        if period_from:
+            transactions = transactions.filter(date__gte=date.fromisoformat(period_from))
+        if period_to:
+            transactions = transactions.filter(date__lte=date.fromisoformat(period_to))
+    except ValueError:
+        raise ValueError("'from' and 'to' must be dates formatted as YYYY-MM-DD.")
+
+    # Filters take the names shown in the listing
+    account = request.GET.get('account')
+    if account:
+        account_id = personal_account_lookup.id_for(account.strip())
+        if account_id is None:
+            raise ValueError(f"Unknown account: {account}.")
+        transactions = transactions.filter(personal_account_id=account_id)
+
+    category = request.GET.get('category')
+    if category:
+        category_id = category_lookup.id_for(category.strip())
+        if category_id is None:
+            raise ValueError(f"Unknown category: {category}.")
+        transactions = transactions.filter(category_id=category_id)
+
+    nominal_account = request.GET.get('nominal_account')
+    if nominal_account:
+        resolved = NOMINAL_ACCOUNT_MAP.get(nominal_account.strip().lower()) or nominal_account.strip().upper()
+        if resolved not in NOMINAL_ACCOUNT_MAP.values():
+            raise ValueError(f"Invalid nominal account: {nominal_account}.")
+        transactions = transactions.filter(nominal_account=resolved)
+
+    return transactions
+
+
+def _page_size(request) -> int:
+    try:
+        page_size = int(request.GET.get('page_size', settings.TRANSACTIONS_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("'page_size' must be an integer.")
+    if not 1 <= page_size <= settings.TRANSACTIONS_MAX_PAGE_SIZE:
+        raise ValueError(f"'page_size' must be between 1 and {settings.TRANSACTIONS_MAX_PAGE_SIZE}.")
+    return page_size
+
+
+def _page_number(request) -> int:
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        raise ValueError("'page' must be an integer.")
+    if not 1 <= page <= settings.TRANSACTIONS_SEARCH_MAX_PAGE:
+        raise ValueError(f"'page' must be between 1 and {settings.TRANSACTIONS_SEARCH_MAX_PAGE}.")
+    return page
+
+
+def _transactions_page(request):
+    try:
+        transactions = _filter_transactions(request, Transaction.objects.all())
+        page_size = _page_size(request)
+        rows, next_cursor = keyset_page(TransactionListSerializer.select(transactions), request.GET.get('cursor'), page_size)
+    except (InvalidCursor, ValueError) as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = TransactionListSerializer(rows)
+    return Response({"results": serializer.data, "next_cursor": next_cursor}, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+def transaction_search(request):
+    """
+    API to search transaction narrations through the full-text index.
+
+    'q' holds the words that must all appear; quote a "phrase" to match it
+    word for word and end a word or phrase with * to match it as a prefix,
+    e.g. q=swig* "salary credit". Results are ranked by relevance and
+    returned a page at a time as {"results": [...], "page": n, "next_page": ...}.
+    The filters of the transactions listing ('month'/'year', 'from'/'to',
+    'account', 'category', 'nominal_account') and 'page_size' apply too.
+    """
+    query = request.GET.get('q', '')
+    if not parse_search_query(query):
+        return Response({"error": "'q' must contain at least one word."}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        transactions = _filter_transactions(request, Transaction.objects.all())
+        page_size = _page_size(request)
+        page = _page_number(request)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    offset = (page - 1) * page_size
+    # One extra row tells whether another page follows
+    rows = list(
+        TransactionListSerializer.select(search_transactions(query, transactions), "relevance")
+        [offset:offset + page_size + 1]
+    )
+    results = [
+        {**TransactionListSerializer.to_representation(row), "relevance": row["relevance"]}
+        for row in rows[:page_size]
+    ]
+    return Response(
+        {"results": results, "page": page, "next_page": page + 1 if len(rows) > page_size else None},
+        status=status.HTTP_200_OK,
+    )
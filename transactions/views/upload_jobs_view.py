@@ -0,0 +1,52 @@
+import os
+from django.http import FileResponse
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework import status
+
+from transactions.models import UploadJob
+from transactions.serializers import UploadJobSerializer
+from ..services.upload_job_service import get_upload_job
+
+
+@api_view(["GET"])
+def upload_jobs(request):
+    """
+    API to list the most recent background upload jobs.
+    """
+    try:
+        limit = int(request.GET.get("limit", 20))
+        if limit < 1:
+            raise ValueError
+    except ValueError:
+        return Response({"error": "'limit' must be a positive integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+    jobs = UploadJob.objects.all()[:limit]
+    serializer = UploadJobSerializer(jobs, many=True, context={"request": request})
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+def upload_job_detail(request, job_id):
+    """
+    API to report the progress (rows parsed/validated/inserted) and final
+    status of a background upload job.
+    """
+    job = get_upload_job(job_id)
+    if job is None:
+        return Response({"error": "Upload job not found."}, status=status.HTTP_404_NOT_FOUND)
+
+    serializer = UploadJobSerializer(job, context={"request": request})
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+def upload_job_errors(request, job_id):
+    """
+    API to download the error file of an upload job whose rows failed validation.
+    """
+    job = UploadJob.objects.filter(pk=job_id).first()
+    if job is None or not job.error_file or not os.path.exists(job.error_file):
+        return Response({"error": "No error file for this upload job."}, status=status.HTTP_404_NOT_FOUND)
+
+    return FileResponse(open(job.error_file, "rb"), as_attachment=True, filename=os.path.basename(job.error_file))
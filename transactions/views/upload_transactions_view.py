@@ -1,16 +1,19 @@
 import traceback
-from django.http import HttpResponse
-import re
-import pandas as pd
+from django.conf import settings
+from django.http import FileResponse
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from transactions.models import Transaction
-from django.db import transaction  # Import Django's transaction module
 
-from ..serializers import TransactionSerializer
+from ..serializers import UploadJobSerializer
+from ..services.upload_job_service import submit_upload_job
+from ..services.statement_ingest_service import (
+    SUPPORTED_EXTENSIONS,
+    StatementSource,
+    generate_error_file,
+    ingest_statement,
+)
 import os
-from django.core.files.storage import FileSystemStorage
 
 
 @api_view(["POST"])
@@ -18,108 +21,56 @@ def upload_transactions(request):
     """
     API to upload transactions from a CSV/Excel file.
     Validates the data using serializers, creates transactions, or returns file with errors.
+
+    Query parameters:
+        validation: 'columnar' (default) validates whole columns at once, 'row'
+            runs the per-row serializer.
+        mode: 'stream' (default) reads, validates and inserts the file in
+            UPLOAD_CHUNK_SIZE-row chunks, 'buffered' loads it in one go.
+        on_duplicate: 'skip' (default) leaves rows that repeat an earlier
+            statement alone, 'update' overwrites their category, sub category
+            and nominal account.
+        async: 'true' queues the upload on the background worker pool and
+            returns the job at once; poll its status_url for progress.
     """
     if 'file' not in request.FILES:
         return Response({"error": "No file provided."}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Save the file temporarily
     file = request.FILES['file']
-    fs = FileSystemStorage()
-    file_path = fs.save(file.name, file)
-    full_path = fs.path(file_path)
-
-    try:
-        # Load the file using pandas
-        if file.name.endswith(".csv"):
-            df = pd.read_csv(full_path)
-        elif file.name.endswith(".xlsx"):
-            df = pd.read_excel(full_path)
-        else:
-            return Response({"error": "Unsupported file format. Use CSV or Excel."}, status=status.HTTP_400_BAD_REQUEST)
+    if not file.name.endswith(SUPPORTED_EXTENSIONS):
+        return Response({"error": "Unsupported file format. Use CSV or Excel."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Validate rows using the serializer
-        errors = []
-        valid_rows = []
+    validation = request.query_params.get("validation", "columnar").lower()
+    mode = request.query_params.get("mode", "stream").lower()
+    on_duplicate = request.query_params.get("on_duplicate", "skip").lower()
+    if validation not in ("columnar", "row") or mode not in ("stream", "buffered") or on_duplicate not in ("skip", "update"):
+        return Response({"error": "Use validation=columnar|row, mode=stream|buffered and on_duplicate=skip|update."},
+                        status=status.HTTP_400_BAD_REQUEST)
 
-        def to_snake_case(key):
-            """Convert keys to snake_case."""
-            key = key.strip().lower().replace(" ", "_")
-            return re.sub(r'[^a-z0-9_]', '', key)
-        
-        def nan_safe(value):
-            return None if pd.isna(value) else value
-        
-        # Add an Error column to the DataFrame
-        df['Error'] = None
+    if request.query_params.get("async", "false").lower() in ("1", "true", "yes"):
+        job = submit_upload_job(file, validation=validation, on_duplicate=on_duplicate)
+        serializer = UploadJobSerializer(job, context={"request": request})
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
-        for idx, row in df.iterrows():
-            cleaned_row = {
-                to_snake_case(key): value.strip() if isinstance(value, str) else nan_safe(value)
-                for key, value in row.to_dict().items()
-            }
+    # Read straight from the uploaded file; Django already spools large uploads to disk
+    chunk_size = settings.UPLOAD_CHUNK_SIZE if mode == "stream" else None
+    source = StatementSource(file, file.name, chunk_size=chunk_size)
 
-            # Use the serializer for validation and resolution
-            serializer = TransactionSerializer(data=cleaned_row)
-            if serializer.is_valid():
-                validated_data = serializer.validated_data
-                valid_rows.append(validated_data)
-            else:
-                # Add errors to the DataFrame for generating the error file
-                df.at[idx, 'Error'] = str(serializer.errors)
-                errors.append({"row": cleaned_row, "errors": serializer.errors})
+    try:
+        result = ingest_statement(source, validation=validation, on_duplicate=on_duplicate)
 
-        if errors:
+        if result.errors:
             # Return the file with errors as a response
-            df['Error'] = df.get('Error', None)
-            error_file_path = generate_error_file(df, file.name)
-            with open(error_file_path, "rb") as f:
-                response = HttpResponse(f.read(), content_type="application/octet-stream")
-                response['Content-Disposition'] = f'attachment; filename="{os.path.basename(error_file_path)}"'
-                return response
-            
-        transaction_objects = []
-
-        # Save valid rows to the database
-    
-        for data in valid_rows:
-            transaction_objects.append(Transaction(
-                date=data['date'],
-                narration=data['narration'],
-                debit_amount=data['debit_amount'] or 0.0,
-                credit_amount=data['credit_amount'] or 0.0,
-                category=data['category'],  # Resolved by the serializer
-                sub_category=data['sub_category'],  # Resolved by the serializer
-                personal_account=data['personal_account'],  # Resolved by the serializer
-                nominal_account=data['nominal_account'],
-                running_balance=0.00  # Default, signals can update this later
-            ))
-            
-        print("Objects Creation Completed")
-            
-        Transaction.objects.bulk_create(transaction_objects, ignore_conflicts=False)
+            error_file_path = generate_error_file(source, result.errors)
+            return FileResponse(open(error_file_path, "rb"), as_attachment=True,
+                                filename=f"errors_{os.path.basename(file.name)}",
+                                content_type="application/octet-stream")
 
-        return Response({"message": "Transactions uploaded successfully."}, status=status.HTTP_201_CREATED)
+        return Response({"message": "Transactions uploaded successfully.", **result.as_dict()},
+                        status=status.HTTP_201_CREATED)
 
     except Exception as e:
         return Response({
             "error": str(e),
             "traceback": traceback.format_exc()
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    finally:
-        # Clean up temporary file
-        if os.path.exists(full_path):
-            os.remove(full_path)
-
-
-def generate_error_file(df, original_file_name):
-    """
-    Generates a new file with errors included and returns the file path.
-    """
-    error_file_name = f"errors_{original_file_name}"
-    error_file_path = os.path.join("media", error_file_name)
-    if original_file_name.endswith(".xlsx"):
-        df.to_excel(error_file_path, index=False)
-    else:
-        df.to_csv(error_file_path, index=False)
-    return error_file_path
\ No newline at end of file
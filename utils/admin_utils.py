@@ -0,0 +1,95 @@
+from datetime import date
+
+from django.core.paginator import Paginator
+from django.db.models import Max, Min, QuerySet
+from django.utils.functional import cached_property
+
+from utils.datetime_utils import iter_months
+from utils.db_utils import period_filter
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for changelists over very large tables.
+
+    ``count`` never scans past ``pages_ahead`` pages beyond ``current_page``:
+    rows are counted only that far, which is exact for a result that ends
+    within the window. A longer unfiltered queryset with an integer auto
+    primary key is counted as its largest key, one index lookup; keys only
+    grow, so that is an upper bound, exact until rows are deleted. A longer
+    filtered one is counted as the window plus one row, a lower bound that
+    moves on as later pages are visited, so every row stays reachable.
+    ``count_bound`` tells which of the three the count is.
+
+    Pages read just the primary keys of their rows by offset, which the
+    ordering index can answer without touching the table, and then load
+    those rows with their joins by key.
+    """
+
+    EXACT = "exact"
+    AT_MOST = "at most"
+    AT_LEAST = "at least"
+
+    pages_ahead = 10
+
+    def __init__(self, *args, current_page=1, **kwargs):
+        super().__init__(*args, **kwargs)
+        try:
+            self.current_page = max(int(current_page), 1)
+        except (TypeError, ValueError):
+            self.current_page = 1
+
+    @cached_property
+    def _counted(self):
+        queryset = self.object_list.order_by()
+        window = (self.current_page + self.pages_ahead) * self.per_page
+        counted = queryset[:window + 1].count()
+        if counted <= window:
+            return counted, self.EXACT
+        if not queryset.query.where and queryset.model._meta.pk.get_internal_type() in ("AutoField", "BigAutoField"):
+            return queryset.aggregate(last=Max("pk"))["last"], self.AT_MOST
+        return counted, self.AT_LEAST
+
+    @property
+    def count(self) -> int:
+        return self._counted[0]
+
+    @property
+    def count_bound(self) -> str:
+        return self._counted[1]
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        # Orphans can only be folded into the last page when it is known
+        if self.count_bound == self.EXACT and top + self.orphans >= self.count:
+            top = self.count
+
+        pks = list(self.object_list.values_list("pk", flat=True)[bottom:top])
+        rows = {row.pk: row for row in self.object_list.filter(pk__in=pks)}
+        return self._get_page([rows[pk] for pk in pks if pk in rows], number, self)
+
+
+class IndexedDatesQuerySet(QuerySet):
+    """
+    QuerySet whose year and month ``dates()``, used by the admin's date
+    hierarchy, are found by probing each candidate period between the first
+    and last date with an ``exists()`` range seek on the date index, instead
+    of truncating the date of every row and de-duplicating; the day level,
+    within one month, is left to Django.
+    """
+
+    def dates(self, field_name, kind, order="ASC"):
+        if kind not in ("year", "month"):
+            return super().dates(field_name, kind, order)
+
+        bounds = self.aggregate(first=Min(field_name), last=Max(field_name))
+        if bounds["first"] is None:
+            return []
+        if kind == "year":
+            candidates = [(date(year, 1, 1), date(year, 12, 1)) for year in range(bounds["first"].year, bounds["last"].year + 1)]
+        else:
+            candidates = [(month, month) for month in iter_months(bounds["first"], bounds["last"])]
+
+        found = [start for start, end in candidates if self.filter(period_filter(start, end, field_name)).exists()]
+        return found if order == "ASC" else found[::-1]
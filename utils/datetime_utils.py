@@ -1 +1,28 @@
-DEFAULT_DATE_FORMAT = "%d-%m-%Y"
\ No newline at end of file
+from datetime import date, datetime
+from typing import Iterator
+
+DEFAULT_DATE_FORMAT = "%d-%m-%Y"
+MONTH_FORMAT = "%Y-%m"
+
+
+def parse_month(value: str) -> date:
+    """Parse 'YYYY-MM' into the first day of that month; raises ValueError."""
+    return datetime.strptime(value, MONTH_FORMAT).date()
+
+
+def next_month(month: date) -> date:
+    """First day of the month after ``month``."""
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def month_count(start: date, end: date) -> int:
+    """Number of months from ``start`` to ``end``, both included."""
+    return (end.year - start.year) * 12 + end.month - start.month + 1
+
+
+def iter_months(start: date, end: date) -> Iterator[date]:
+    """First days of the months from ``start`` to ``end``, both included."""
+    month = start.replace(day=1)
+    while month <= end:
+        yield month
+        month = next_month(month)
@@ -1,7 +1,32 @@
+from datetime import date
+
+from django.db.models import Q
 from django.db.models.expressions import Func
 
+from utils.datetime_utils import next_month
+
+
 class Round(Func):
     # ref: https://stackoverflow.com/a/55905983/5132337
     function = 'ROUND'
     arity = 2
-    arg_joiner = '::numeric, '
\ No newline at end of file
+    arg_joiner = '::numeric, '
+
+
+def period_filter(start: date, end: date, field: str = "date") -> Q:
+    """
+    Rows from the month of ``start`` to the month of ``end``, both included,
+    as a plain ``field >= first day AND field < first day after`` range.
+
+    Unlike ``__year``/``__month`` lookups, which compile to EXTRACT() on the
+    column, the range can be served by an index on ``field``.
+    """
+    return Q(**{f"{field}__gte": start.replace(day=1), f"{field}__lt": next_month(end)})
+
+
+def month_filter(year: int, month: int, field: str = "date") -> Q:
+    """
+    Rows of one month; see ``period_filter``.
+    """
+    first_day = date(year, month, 1)
+    return period_filter(first_day, first_day, field)
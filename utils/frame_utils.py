@@ -0,0 +1,85 @@
+from itertools import islice
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from django.db.models import QuerySet
+
+# Rows read per round trip while building a frame.
+FRAME_CHUNK_SIZE = 2000
+
+# Column kind -> numpy dtype each chunk is converted to.
+_CHUNK_DTYPES = {
+    "date": "datetime64[D]",
+    "float": np.float64,
+    "object": object,
+}
+
+
+class FrameColumn:
+    """
+    One DataFrame column read from ``field`` of a queryset.
+
+    ``kind`` is one of:
+
+    - ``"date"``: datetime64 (missing dates become NaT)
+    - ``"float"``: float64, e.g. for decimal amounts (None becomes NaN)
+    - ``"object"``: values as read
+
+    With ``labels`` (value -> label, e.g. id -> name from a lookup cache) the
+    column is a categorical of the labels built from integer codes, so no
+    label string is created per row and no join is needed to read it.
+    """
+
+    def __init__(self, name: str, field: str, kind: str = "object", labels: Optional[Dict[Any, str]] = None):
+        if kind not in _CHUNK_DTYPES:
+            raise ValueError(f"Unknown column kind: {kind}")
+        self.name = name
+        self.field = field
+        self.kind = kind
+        self.labels = labels
+        if labels is not None:
+            # Labels shared by several values (e.g. equal names) form one category
+            self.categories = list(dict.fromkeys(labels.values()))
+            positions = {label: code for code, label in enumerate(self.categories)}
+            self.codes = {value: positions[label] for value, label in labels.items()}
+
+    def chunk(self, values: Sequence[Any]) -> np.ndarray:
+        if self.labels is not None:
+            # Unknown values get code -1, i.e. a missing value
+            codes = self.codes
+            return np.fromiter((codes.get(value, -1) for value in values), dtype=np.int32, count=len(values))
+        if self.kind == "object":
+            array = np.empty(len(values), dtype=object)
+            array[:] = values
+            return array
+        return np.array(values, dtype=_CHUNK_DTYPES[self.kind])
+
+    def series(self, chunks: List[np.ndarray]) -> pd.Series:
+        if self.labels is not None:
+            codes = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int32)
+            return pd.Series(pd.Categorical.from_codes(codes, categories=self.categories), name=self.name)
+        array = np.concatenate(chunks) if chunks else np.empty(0, dtype=_CHUNK_DTYPES[self.kind])
+        if self.kind == "date":
+            return pd.Series(array.astype("datetime64[ns]"), name=self.name)
+        return pd.Series(array, name=self.name)
+
+
+def queryset_frame(queryset: QuerySet, columns: Sequence[FrameColumn], chunk_size: int = FRAME_CHUNK_SIZE) -> pd.DataFrame:
+    """
+    Build a DataFrame from one ``values_list`` query over ``queryset``.
+
+    Rows are read from the cursor ``chunk_size`` at a time and each chunk is
+    turned into one typed numpy array per column, which are joined at the
+    end; no model instance or per-row dict is ever created.
+    """
+    rows = queryset.values_list(*(column.field for column in columns)).iterator(chunk_size=chunk_size)
+    chunks: List[List[np.ndarray]] = [[] for _ in columns]
+    while True:
+        batch = list(islice(rows, chunk_size))
+        if not batch:
+            break
+        for column, values, column_chunks in zip(columns, zip(*batch), chunks):
+            column_chunks.append(column.chunk(values))
+
+    return pd.DataFrame({column.name: column.series(column_chunks) for column, column_chunks in zip(columns, chunks)})
@@ -1,2 +1,11 @@
+import re
+
+
 def sentence_case(name: str) -> str:
-    return name.capitalize().replace('_', ' ').replace('-', ' ')
\ No newline at end of file
+    return name.capitalize().replace('_', ' ').replace('-', ' ')
+
+
+def snake_case(key: str) -> str:
+    """Convert a column header such as 'Debit Amount' to 'debit_amount'."""
+    key = str(key).strip().lower().replace(" ", "_")
+    return re.sub(r'[^a-z0-9_]', '', key)
\ No newline at end of file